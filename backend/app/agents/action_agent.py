@@ -1,77 +1,163 @@
+from typing import Any, Dict
+
 from app.graph.state import PharmacyState
-from app.db.database import SessionLocal
-from app.db.models import Medicine
+from app.db.unit_of_work import request_scope, RequestScope
+from app.rules.dose_windows import ingredient_mg, record_doses
+from app.rules.engine import compiled_rules
+from app.services.inventory_service import InsufficientStock, reserve_stock
 from app.services.order_service import create_order
 from app.services.webhook_service import trigger_warehouse_webhook, send_order_confirmation
 import asyncio
 
 
-def action_agent(state: PharmacyState) -> PharmacyState:
+def action_agent(state: PharmacyState) -> Dict[str, Any]:
     # 🚨 HARD ASSERTION
     assert isinstance(state, dict), f"STATE CORRUPTED in action_agent: {type(state)}"
 
     if not state.get("safety", {}).get("approved"):
-        return state
+        return {}
+
+    with request_scope() as scope:
+        try:
+            order, order_items = _place_order(state, scope)
+        except InsufficientStock as exc:
+            return _stock_conflict(state, scope, exc)
+
+        # Sync path (graph.invoke): no running loop in this worker thread
+        webhook_result = asyncio.run(trigger_warehouse_webhook(
+            order_id=order.id,
+            medicines=state["extraction"]["medicines"],
+            customer_id=state["customer"]["id"]
+        ))
+
+        return _confirm_order(state, order, order_items, webhook_result)
+
+
+async def action_agent_async(state: PharmacyState) -> Dict[str, Any]:
+    """
+    Async twin used by graph.ainvoke: the webhook is awaited on the
+    server's event loop instead of spinning up a new loop per order.
+    DB work stays sync and is pushed off the loop.
+    """
+    assert isinstance(state, dict), f"STATE CORRUPTED in action_agent: {type(state)}"
+
+    if not state.get("safety", {}).get("approved"):
+        return {}
+
+    with request_scope() as scope:
+        try:
+            order, order_items = await asyncio.to_thread(_place_order, state, scope)
+        except InsufficientStock as exc:
+            return _stock_conflict(state, scope, exc)
+
+        webhook_result = await trigger_warehouse_webhook(
+            order_id=order.id,
+            medicines=state["extraction"]["medicines"],
+            customer_id=state["customer"]["id"]
+        )
+
+        return await asyncio.to_thread(
+            _confirm_order, state, order, order_items, webhook_result
+        )
 
-    db = SessionLocal()
-    try:
-        customer_id = state["customer"]["id"]
-        medicines = state["extraction"]["medicines"]
 
+def _place_order(state: PharmacyState, scope: RequestScope):
+    """Reserve stock and create the order in one short, committed transaction"""
+    customer_id = state["customer"]["id"]
+    medicines = state["extraction"]["medicines"]
+
+    with scope.write() as db:
         order_items = []
+        lines = []
+        quantities = {}
+
+        catalog = scope.catalog()
+        rules = compiled_rules(catalog)
 
         for item in medicines:
-            medicine = (
-                db.query(Medicine)
-                .filter(Medicine.name.ilike(f"%{item['name']}%"))
-                .with_for_update()
-                .first()
+            # Resolve through the catalog index safety_agent already used
+            needle = item["name"].lower()
+            entry = catalog.lookup(item["name"]) or next(
+                (e for e in catalog.entries if needle in e.name.lower()), None
             )
+            if entry is None:
+                raise ValueError(f"Medicine not found at execution: {item['name']}")
 
-            medicine.stock_quantity -= item["quantity"]
-
+            quantities[entry.id] = quantities.get(entry.id, 0) + item["quantity"]
+            lines.append((rules.get(entry), item["quantity"]))
             order_items.append({
-                "medicine_id": medicine.id,
+                "medicine_id": entry.id,
                 "quantity": item["quantity"],
                 "dosage": item.get("dosage", ""),
             })
 
+        # One conditional UPDATE per medicine, all or nothing: stock may have
+        # moved since safety_agent read it (concurrent orders on hot SKUs)
+        reserve_stock(db, quantities)
+
         order = create_order(db, customer_id, order_items)
 
-        # Trigger warehouse webhook
-        webhook_result = asyncio.run(trigger_warehouse_webhook(
-            order_id=order.id,
-            medicines=medicines,
-            customer_id=customer_id
-        ))
-        
-        # Send order confirmation
-        confirmation_result = send_order_confirmation(
-            customer_id=customer_id,
-            order_id=order.id,
-            medicines=medicines
-        )
+        # Rolling 24h / 7 day dose windows move with the order, same transaction
+        record_doses(db, customer_id, ingredient_mg(lines))
 
-        state["execution"] = {
-            "order_id": order.id,
-            "actions": ["order_created", "inventory_updated", "webhook_triggered", "confirmation_sent"],
-            "webhook_status": webhook_result.get("status"),
-            "confirmation_status": confirmation_result.get("status")
-        }
+    # Committed: the webhook and everything after it run without the write lock
+    return order, order_items
 
-        state["decision_trace"].append({
+
+def _stock_conflict(state: PharmacyState, scope: RequestScope, exc: InsufficientStock) -> Dict[str, Any]:
+    """Approved, but the stock was gone by the time we reserved it: block, no order"""
+    catalog = scope.catalog()
+    violations = []
+    for shortfall in exc.shortfalls:
+        entry = catalog.get(shortfall["medicine_id"])
+        name = entry.name if entry else f"medicine #{shortfall['medicine_id']}"
+        violations.append(
+            f"Insufficient stock for {name} "
+            f"(available: {shortfall['available']}, requested: {shortfall['requested']})"
+        )
+
+    safety = {
+        "approved": False,
+        "decision": "blocked",
+        "reason": "Not enough stock to place this order",
+        "violations": violations,
+        "clarification_questions": [],
+        "error_type": "STOCK_CONFLICT",
+    }
+    return {
+        "safety": safety,
+        "decision_trace": [{
             "agent": "action_agent",
-            "input": order_items,
-            "decision": "executed",
-            "output": state["execution"],
-        })
+            "input": state["extraction"]["medicines"],
+            "reasoning": ["❌ Stock reservation failed: sold out since the safety check; nothing was reserved"],
+            "decision": "blocked",
+            "output": safety,
+        }],
+    }
 
-        db.commit()
-        return state
 
-    except Exception as e:
-        db.rollback()
-        raise e
+def _confirm_order(state: PharmacyState, order, order_items: list, webhook_result: dict) -> Dict[str, Any]:
+    """Send the confirmation and record the execution result + trace"""
+    # Send order confirmation
+    confirmation_result = send_order_confirmation(
+        customer_id=state["customer"]["id"],
+        order_id=order.id,
+        medicines=state["extraction"]["medicines"]
+    )
 
-    finally:
-        db.close()
+    execution = {
+        "order_id": order.id,
+        "actions": ["order_created", "inventory_updated", "webhook_triggered", "confirmation_sent"],
+        "webhook_status": webhook_result.get("status"),
+        "confirmation_status": confirmation_result.get("status")
+    }
+
+    return {
+        "execution": execution,
+        "decision_trace": [{
+            "agent": "action_agent",
+            "input": order_items,
+            "decision": "executed",
+            "output": execution,
+        }],
+    }
@@ -1,68 +1,90 @@
 # backend/app/agents/conversation_agent.py
 
+from typing import Any, Dict
+
 from app.graph.state import PharmacyState
-import re
+from app.db.unit_of_work import request_scope
+from app.extraction.cache import cached_extraction
+from app.extraction.extractor import extract_tiered
+from app.extraction.languages import DEFAULT_LANGUAGE, resolve_language, rules_for
 
-def conversation_agent(state: PharmacyState) -> PharmacyState:
+def conversation_agent(state: PharmacyState) -> Dict[str, Any]:
     assert isinstance(state, dict), f"STATE CORRUPTED: {type(state)}"
 
     message = state["conversation"]["message"].lower()
+    language = _customer_language(state)
 
-    medicines = []
+    # Same phrasing + language + alias catalog → same extraction (LRU, app/extraction/cache.py)
+    result = cached_extraction(message, lambda text: _extract(text, language), language)
+    extraction = result["extraction"]
 
-    # Medicine extraction rules (deterministic, production-safe)
-    # Format: message_keyword → {name: db_name, dosage: default_dosage, otc: is_otc}
-    medicine_rules = {
-        "paracetamol": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
-        "acetaminophen": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
-        "tylenol": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
-        "ibuprofen": {"name": "Ibuprofen 200mg", "dosage": "200mg", "otc": True},
-        "advil": {"name": "Ibuprofen 200mg", "dosage": "200mg", "otc": True},
-        "motrin": {"name": "Ibuprofen 200mg", "dosage": "200mg", "otc": True},
-        "amoxicillin": {"name": "Amoxicillin 500mg", "dosage": "500mg", "otc": False},
-        "augmentin": {"name": "Amoxicillin 500mg", "dosage": "500mg", "otc": False},
-        "metformin": {"name": "Metformin 500mg", "dosage": "500mg", "otc": False},
-        "glucophage": {"name": "Metformin 500mg", "dosage": "500mg", "otc": False},
-        "lisinopril": {"name": "Lisinopril 10mg", "dosage": "10mg", "otc": False},
-        "zestril": {"name": "Lisinopril 10mg", "dosage": "10mg", "otc": False},
-        "omeprazole": {"name": "Omeprazole 20mg", "dosage": "20mg", "otc": False},
-        "prilosec": {"name": "Omeprazole 20mg", "dosage": "20mg", "otc": False},
-        "vitamin c": {"name": "Vitamin C 500mg", "dosage": "500mg", "otc": True},
-        "ascorbic acid": {"name": "Vitamin C 500mg", "dosage": "500mg", "otc": True},
-        "aspirin": {"name": "Aspirin 81mg", "dosage": "81mg", "otc": True},
-        "cetirizine": {"name": "Cetirizine 10mg", "dosage": "10mg", "otc": True},
-        "zyrtec": {"name": "Cetirizine 10mg", "dosage": "10mg", "otc": True},
-        "ciprofloxacin": {"name": "Ciprofloxacin 500mg", "dosage": "500mg", "otc": False},
-        "cipro": {"name": "Ciprofloxacin 500mg", "dosage": "500mg", "otc": False},
+    # Partial update — runs in parallel with memory_agent
+    return {
+        "extraction": extraction,
+        "decision_trace": [{
+            "agent": "conversation_agent",
+            "input": message,
+            "reasoning": result["reasoning"],
+            "decision": "extracted" if extraction["medicines"] else "no_medicines_found",
+            "output": extraction
+        }],
     }
 
-    # Extract quantity from message (patterns: "5 pills", "five units", "5x", "x5", "5 tablets")
-    quantity_pattern = r'\b(\d+)\s*(?:pills?|units?|tablets?|caps?|x|dosages?|bottles?)'
-    quantity_match = re.search(quantity_pattern, message, re.IGNORECASE)
+
+def _customer_language(state: PharmacyState) -> str:
+    """Customer.preferred_language (identity-mapped per request), else English"""
+    customer = state.get("customer") or {}
+    if customer.get("language"):
+        return resolve_language(customer["language"])
+    if customer.get("id") is None:
+        return DEFAULT_LANGUAGE
+
+    with request_scope() as scope:
+        row = scope.customer(customer["id"])
+        return resolve_language(row.preferred_language if row else None)
+
+
+def _extract(message: str, language: str = DEFAULT_LANGUAGE) -> Dict[str, Any]:
+    medicines = []
+
+    # Extract quantity from message (patterns: "5 pills", "5 tablets", "5x", "3 pastillas", "3片")
+    quantity_match = rules_for(language).quantity.search(message)
     default_quantity = int(quantity_match.group(1)) if quantity_match else 1
 
-    # Extract medicines from message
-    for keyword, details in medicine_rules.items():
-        if keyword in message:
-            medicines.append({
-                "name": details["name"],
-                "quantity": default_quantity,
-                "dosage": details["dosage"],
-                "otc_hint": details["otc"]  # Help with safety checks
-            })
-            # Don't break - user might request multiple medicines
-
-    state["extraction"] = {
+    # Extract medicines from message: precompiled alias automaton for the
+    # customer's language, then a trigram lookup for misspelled words;
+    # low-confidence messages may go to the LLM fallback (app/extraction/)
+    tiered = extract_tiered(message, language)
+    corrections = []
+    for details in tiered["medicines"]:
+        medicines.append({
+            "name": details["name"],
+            "quantity": details.get("quantity") or default_quantity,
+            "dosage": details["dosage"],
+            "otc_hint": details["otc"]  # Help with safety checks
+        })
+        if details["match"] == "fuzzy":
+            corrections.append(f"'{details['term']}' → {details['name']} ({details['score']})")
+
+    extraction = {
         "intent": "order" if medicines else "unknown",
-        "medicines": medicines
+        "medicines": medicines,
+        "language": language,
+        "tier": tiered["tier"],
+        "confidence": tiered["confidence"]
     }
 
-    state["decision_trace"].append({
-        "agent": "conversation_agent",
-        "input": message,
-        "reasoning": f"Extracted {len(medicines)} medicine(s) from message (quantity: {default_quantity})",
-        "decision": "extracted" if medicines else "no_medicines_found",
-        "output": state["extraction"]
-    })
+    reasoning = f"Extracted {len(medicines)} medicine(s) from message (quantity: {default_quantity})"
+    if language != DEFAULT_LANGUAGE:
+        reasoning += f"; language: {language}"
+    if corrections:
+        reasoning += f"; typo-corrected: {', '.join(corrections)}"
+    if tiered["tier"] != "rules":
+        reasoning += f"; tier: {tiered['tier']} (confidence {tiered['confidence']})"
 
-    return state
+    # A rules_fallback result is retried once the LLM is reachable again
+    return {
+        "extraction": extraction,
+        "reasoning": reasoning,
+        "cacheable": tiered["tier"] != "rules_fallback"
+    }
@@ -1,13 +1,14 @@
+from typing import Any, Dict
+
 from app.graph.state import PharmacyState
-from app.db.database import SessionLocal
+from app.db.unit_of_work import request_scope
 from app.db.models import OrderHistory
 
 
-def memory_agent(state: PharmacyState) -> PharmacyState:
+def memory_agent(state: PharmacyState) -> Dict[str, Any]:
     assert isinstance(state, dict), f"STATE CORRUPTED: {type(state)}"
 
-    db = SessionLocal()
-    try:
+    with request_scope() as scope, scope.session() as db:
         customer_id = state["customer"]["id"]
 
         history = (
@@ -27,17 +28,15 @@ def memory_agent(state: PharmacyState) -> PharmacyState:
             for h in history
         ]
 
-        state["meta"]["customer_history"] = history_payload
-
-        state["decision_trace"].append({
+    # Partial update — runs in parallel with conversation_agent
+    return {
+        "meta": {"customer_history": history_payload},
+        "decision_trace": [{
             "agent": "memory_agent",
             "input": {"customer_id": customer_id},
             "reasoning": f"Fetched {len(history_payload)} previous orders",
             "decision": "context_provided",
             "output": history_payload,
-        })
-
-        return state
+        }],
+    }
 
-    finally:
-        db.close()
@@ -1,14 +1,15 @@
 from datetime import datetime
+from typing import Any, Dict
+
 from app.graph.state import PharmacyState
-from app.db.database import SessionLocal
+from app.db.unit_of_work import request_scope
 from app.db.models import OrderHistory
 
 
-def predictive_refill_agent(state: PharmacyState) -> PharmacyState:
+def predictive_refill_agent(state: PharmacyState) -> Dict[str, Any]:
     assert isinstance(state, dict), f"STATE CORRUPTED: {type(state)}"
 
-    db = SessionLocal()
-    try:
+    with request_scope() as scope, scope.session() as db:
         customer_id = state["customer"]["id"]
 
         history = (
@@ -28,15 +29,11 @@ def predictive_refill_agent(state: PharmacyState) -> PharmacyState:
                     "message": "Likely running low",
                 })
 
-        state["meta"]["refill_alerts"] = alerts
-
-        state["decision_trace"].append({
+    return {
+        "meta": {"refill_alerts": alerts},
+        "decision_trace": [{
             "agent": "predictive_refill_agent",
             "decision": "alerts_generated",
             "output": alerts,
-        })
-
-        return state
-
-    finally:
-        db.close()
+        }],
+    }
@@ -1,10 +1,15 @@
+import asyncio
+import json
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 
-from app.db.database import SessionLocal
-from app.db.models import Customer
-from app.graph.pharmacy_workflow import run_workflow
+from app.db.unit_of_work import async_request_scope
+from app.config import CHAT_BATCH_MAX_ITEMS
+from app.graph.pharmacy_workflow import arun_workflow, astream_workflow
+from app.graph.batch import arun_workflow_batch, CUSTOMER_NOT_FOUND, WORKFLOW_FAILED
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -12,7 +17,7 @@ router = APIRouter(prefix="/chat", tags=["chat"])
 # 2️⃣ API RESPONSE SHAPING (Frontend-oriented)
 # ChatResponse now supports:
 # - approved: bool
-# - error_type: VALIDATION, SAFETY, SYSTEM, or None
+# - error_type: VALIDATION, SAFETY, STOCK_CONFLICT, SYSTEM, or None
 # - violations: list of specific errors
 # - clarification_questions: list of missing info to ask user
 
@@ -25,72 +30,199 @@ class ChatResponse(BaseModel):
     approved: bool
     reply: str
     order_id: Optional[int] = None
-    error_type: Optional[str] = None  # VALIDATION, SAFETY, SYSTEM, or None if approved
+    error_type: Optional[str] = None  # VALIDATION, SAFETY, STOCK_CONFLICT, SYSTEM, or None if approved
     violations: Optional[List[str]] = None  # Detailed error information
     clarification_questions: Optional[List[str]] = None  # Missing info to ask user
 
 
+class ChatBatchRequest(BaseModel):
+    items: List[ChatRequest]
+
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatResponse]  # Same order as the request items
+
+
 @router.post("/", response_model=ChatResponse)
-def chat(request: ChatRequest):
+async def chat(request: ChatRequest):
     """
     Chat endpoint with structured error responses.
-    
+
+    Runs natively on the event loop (graph.ainvoke), so concurrent
+    conversations are not capped by the sync thread pool.
+
     Decision types:
     - approved: Order placed
     - clarification_required: Ask user for more info, no violation
     - blocked: Safety violation, cannot proceed
     """
-    db = SessionLocal()
-
-    try:
-        customer = db.query(Customer).filter(
-            Customer.id == request.customer_id
-        ).first()
+    # Request-scoped unit of work: the workflow joins this session, so the
+    # customer row loaded here is reused by the agents
+    async with async_request_scope() as scope:
+        customer = await asyncio.to_thread(scope.customer, request.customer_id)
 
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
 
-        final_state = run_workflow(
+        final_state = await arun_workflow(
             customer_id=customer.id,
             message=request.message
         )
 
-        safety = final_state.get("safety", {})
-        execution = final_state.get("execution", {})
-        decision = safety.get("decision", "blocked")
+        return to_chat_response(final_state)
+
+
+# -------------------------
+# Streaming (Server-Sent Events)
+# -------------------------
+
+# node → (SSE event name, payload builder). Nodes not listed emit nothing.
+_STREAM_EVENTS = {
+    "memory_agent": ("memory", lambda u: {
+        "history_count": len(u.get("meta", {}).get("customer_history", [])),
+    }),
+    "conversation_agent": ("extraction", lambda u: u.get("extraction", {})),
+    "safety_agent": ("safety", lambda u: u.get("safety", {})),
+    "action_agent": ("order", lambda u: u.get("execution", {})),
+    "predictive_refill_agent": ("refill_alerts", lambda u: {
+        "alerts": u.get("meta", {}).get("refill_alerts", []),
+    }),
+    "short_circuit": ("skipped", lambda u: {
+        "skipped": u["decision_trace"][-1]["output"]["skipped"],
+        "safety": u.get("safety"),
+    }),
+}
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _chat_events(customer_id: int, message: str):
+    """One SSE event per finished node, then `done` with the ChatResponse"""
+    final_state = None
+    try:
+        async for node, update, state in astream_workflow(customer_id, message):
+            final_state = state
+            if node in _STREAM_EVENTS:
+                event, payload = _STREAM_EVENTS[node]
+                yield _sse(event, payload(update))
+    except Exception as e:
+        # Details stay in the server log; the client gets a generic message
+        print(f"❌ Chat stream failed for customer {customer_id}: {e!r}")
+        yield _sse("error", {"detail": WORKFLOW_FAILED})
+        return
+
+    # Emitted only after the unit of work has committed
+    yield _sse("done", to_chat_response(final_state).dict())
+
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat (text/event-stream).
+
+    Events, in order as agents finish:
+    - extraction, memory: what was understood / looked up
+    - safety: the verdict (rendered before webhooks and refill prediction)
+    - order: order id + webhook / confirmation status
+    - refill_alerts
+    - skipped: routing short-circuited the rest of the chain
+    - done: the same payload /chat returns
+    - error: workflow failure
+    """
+    # Fail fast with a real 404 before any bytes are streamed
+    async with async_request_scope() as scope:
+        customer = await asyncio.to_thread(scope.customer, request.customer_id)
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        customer_id = customer.id
+
+    return StreamingResponse(
+        _chat_events(customer_id, request.message),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/batch", response_model=ChatBatchResponse)
+async def chat_batch(request: ChatBatchRequest):
+    """
+    Bulk chat for replaying queued SMS / chat backlogs.
+
+    - Bounded concurrency across customers; one customer's messages run in order
+    - Results are returned in request order, one ChatResponse per item
+    - A failing item never fails the batch: unknown customers come back as
+      VALIDATION errors, workflow crashes as SYSTEM errors
+    """
+    if len(request.items) > CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large ({len(request.items)} items, max {CHAT_BATCH_MAX_ITEMS})"
+        )
+
+    outcomes = await arun_workflow_batch(
+        [(item.customer_id, item.message) for item in request.items]
+    )
 
-        # 1C️⃣ CLARIFICATION INSTEAD OF HARD BLOCK
-        # If clarification_required, ask the user
-        if decision == "clarification_required":
-            return ChatResponse(
+    results = []
+    for final_state, error in outcomes:
+        if error is None:
+            results.append(to_chat_response(final_state))
+        elif error == CUSTOMER_NOT_FOUND:
+            results.append(ChatResponse(
                 approved=False,
-                reply="Please provide more information: " + "; ".join(safety.get("clarification_questions", [])),
-                order_id=None,
-                error_type=None,  # Not an error, just missing info
-                violations=None,
-                clarification_questions=safety.get("clarification_questions", [])
-            )
-
-        # If blocked, return structured error
-        if not safety.get("approved"):
-            return ChatResponse(
+                reply=CUSTOMER_NOT_FOUND,
+                error_type="VALIDATION",
+                violations=[CUSTOMER_NOT_FOUND],
+            ))
+        else:
+            # Details stay in the server log (app/graph/batch.py)
+            results.append(ChatResponse(
                 approved=False,
-                reply=safety.get("reason", "Request blocked by safety rules"),
-                order_id=None,
-                error_type=safety.get("error_type", "SAFETY"),
-                violations=safety.get("violations", []),
-                clarification_questions=None
-            )
-
-        # Success
+                reply=WORKFLOW_FAILED,
+                error_type="SYSTEM",
+                violations=[WORKFLOW_FAILED],
+            ))
+
+    return ChatBatchResponse(results=results)
+
+
+def to_chat_response(final_state: dict) -> ChatResponse:
+    """Shape a finished workflow state into the frontend-facing response"""
+    safety = final_state.get("safety", {})
+    execution = final_state.get("execution", {})
+    decision = safety.get("decision", "blocked")
+
+    # 1C️⃣ CLARIFICATION INSTEAD OF HARD BLOCK
+    # If clarification_required, ask the user
+    if decision == "clarification_required":
         return ChatResponse(
-            approved=True,
-            reply="Order placed successfully",
-            order_id=execution.get("order_id"),
-            error_type=None,
+            approved=False,
+            reply="Please provide more information: " + "; ".join(safety.get("clarification_questions", [])),
+            order_id=None,
+            error_type=None,  # Not an error, just missing info
             violations=None,
+            clarification_questions=safety.get("clarification_questions", [])
+        )
+
+    # If blocked, return structured error
+    if not safety.get("approved"):
+        return ChatResponse(
+            approved=False,
+            reply=safety.get("reason", "Request blocked by safety rules"),
+            order_id=None,
+            error_type=safety.get("error_type", "SAFETY"),
+            violations=safety.get("violations", []),
             clarification_questions=None
         )
 
-    finally:
-        db.close()
+    # Success
+    return ChatResponse(
+        approved=True,
+        reply="Order placed successfully",
+        order_id=execution.get("order_id"),
+        error_type=None,
+        violations=None,
+        clarification_questions=None
+    )
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from app.db.database import SessionLocal
-from app.db.models import DecisionTrace
+from app.db.models import DecisionTrace, PackedDecisionTrace
+from app.audit.trace_codec import unpack_rows
 from app.security.admin_auth import admin_auth
 
 """
@@ -10,6 +11,9 @@ Purpose:
 - Expose agent decision traces for judges and auditors
 - Show how the system reasoned step-by-step
 - Read-only by design
+
+Runs stored packed (TRACE_STORAGE_FORMAT=packed) are decoded here and
+returned in the same per-agent row shape, with ids like "p12.3".
 """
 
 router = APIRouter(
@@ -17,6 +21,15 @@ router = APIRouter(
     tags=["admin"]
 )
 
+_COLUMNS = (
+    "id", "request_id", "agent_name", "input", "reasoning",
+    "decision", "output", "duration_ms", "created_at",
+)
+
+
+def _row_dict(trace: DecisionTrace) -> dict:
+    return {column: getattr(trace, column) for column in _COLUMNS}
+
 
 @router.get("/", dependencies=[Depends(admin_auth)])
 def list_decision_traces(limit: int = 50):
@@ -28,28 +41,85 @@ def list_decision_traces(limit: int = 50):
     """
     db = SessionLocal()
     try:
-        traces = (
-            db.query(DecisionTrace)
-            .order_by(DecisionTrace.created_at.desc())
+        rows = [
+            _row_dict(trace)
+            for trace in (
+                db.query(DecisionTrace)
+                .order_by(DecisionTrace.created_at.desc())
+                .limit(limit)
+                .all()
+            )
+        ]
+
+        # A pack holds several steps, so `limit` packs is always enough
+        packs = (
+            db.query(PackedDecisionTrace)
+            .order_by(PackedDecisionTrace.created_at.desc())
             .limit(limit)
             .all()
         )
-        return traces
+        rows.extend(row for pack in packs for row in unpack_rows(pack))
+
+        # Stable sort: steps of one run keep their order
+        rows.sort(key=lambda row: row["created_at"], reverse=True)
+        return rows[:limit]
+    finally:
+        db.close()
+
+
+@router.get("/request/{request_id}", dependencies=[Depends(admin_auth)])
+def get_request_traces(request_id: str):
+    """
+    Every agent step of one workflow run, in execution order.
+    """
+    db = SessionLocal()
+    try:
+        pack = (
+            db.query(PackedDecisionTrace)
+            .filter(PackedDecisionTrace.request_id == request_id)
+            .first()
+        )
+        if pack:
+            return unpack_rows(pack)
+
+        return [
+            _row_dict(trace)
+            for trace in (
+                db.query(DecisionTrace)
+                .filter(DecisionTrace.request_id == request_id)
+                .order_by(DecisionTrace.id)
+                .all()
+            )
+        ]
     finally:
         db.close()
 
 
 @router.get("/{trace_id}", dependencies=[Depends(admin_auth)])
-def get_decision_trace(trace_id: int):
+def get_decision_trace(trace_id: str):
     """
-    Get a single decision trace by ID.
+    Get a single decision trace by ID ("42", or "p12.3" for a packed step).
     """
     db = SessionLocal()
     try:
+        if trace_id.startswith("p"):
+            pack_id, _, step = trace_id[1:].partition(".")
+            pack = (
+                db.get(PackedDecisionTrace, int(pack_id))
+                if pack_id.isdigit() and step.isdigit()
+                else None
+            )
+            rows = unpack_rows(pack) if pack else []
+            if pack and int(step) < len(rows):
+                return rows[int(step)]
+            return {"error": "Decision trace not found"}
+
         trace = (
             db.query(DecisionTrace)
-            .filter(DecisionTrace.id == trace_id)
+            .filter(DecisionTrace.id == int(trace_id))
             .first()
+            if trace_id.isdigit()
+            else None
         )
 
         if not trace:
@@ -0,0 +1,119 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+
+from app.db.database import SessionLocal
+from app.db.models import Medicine, MedicineAlias
+from app.extraction import registry
+from app.extraction.languages import DEFAULT_LANGUAGE, LANGUAGES
+from app.security.admin_auth import admin_auth
+
+"""
+Medicine Aliases Admin API
+
+Purpose:
+- Onboard brand / generic names without a redeploy
+- Aliases belong to a customer language (en / es / zh); the same word may
+  be registered once per language
+- Every change bumps the "aliases" data version; this worker rebuilds its
+  matchers immediately, the others within ALIAS_RELOAD_INTERVAL_SECONDS
+"""
+
+router = APIRouter(
+    prefix="/admin/aliases",
+    tags=["admin"]
+)
+
+
+class AliasCreate(BaseModel):
+    medicine_id: int
+    alias: str
+    language: str = DEFAULT_LANGUAGE
+    default_dosage: Optional[str] = None
+    otc_hint: Optional[bool] = None
+
+
+def _alias_dict(alias: MedicineAlias, medicine: Medicine) -> dict:
+    return {
+        "id": alias.id,
+        "alias": alias.alias,
+        "language": alias.language,
+        "medicine_id": medicine.id,
+        "medicine_name": medicine.name,
+        "default_dosage": alias.default_dosage,
+        "otc_hint": alias.otc_hint,
+    }
+
+
+@router.get("/", dependencies=[Depends(admin_auth)])
+def list_aliases(language: Optional[str] = None):
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(MedicineAlias, Medicine)
+            .join(Medicine, MedicineAlias.medicine_id == Medicine.id)
+        )
+        if language:
+            query = query.filter(MedicineAlias.language == language)
+        rows = query.order_by(MedicineAlias.language, MedicineAlias.alias).all()
+        return {
+            "version": registry.current().version,
+            "aliases": [_alias_dict(alias, medicine) for alias, medicine in rows],
+        }
+    finally:
+        db.close()
+
+
+@router.post("/", dependencies=[Depends(admin_auth)])
+def create_alias(request: AliasCreate):
+    language = request.language.strip().lower()
+    if language not in LANGUAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported language '{request.language}' (supported: {', '.join(sorted(LANGUAGES))})"
+        )
+
+    db = SessionLocal()
+    try:
+        medicine = db.get(Medicine, request.medicine_id)
+        if not medicine:
+            raise HTTPException(status_code=404, detail="Medicine not found")
+
+        alias = MedicineAlias(
+            medicine_id=medicine.id,
+            alias=request.alias.strip().lower(),
+            language=language,
+            default_dosage=request.default_dosage,
+            otc_hint=request.otc_hint,
+        )
+        db.add(alias)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Alias already exists for this language")
+
+        result = _alias_dict(alias, medicine)
+    finally:
+        db.close()
+
+    registry.reload()
+    return result
+
+
+@router.delete("/{alias_id}", dependencies=[Depends(admin_auth)])
+def delete_alias(alias_id: int):
+    db = SessionLocal()
+    try:
+        alias = db.get(MedicineAlias, alias_id)
+        if not alias:
+            raise HTTPException(status_code=404, detail="Alias not found")
+        db.delete(alias)
+        db.commit()
+    finally:
+        db.close()
+
+    registry.reload()
+    return {"deleted": alias_id}
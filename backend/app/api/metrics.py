@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.observability.metrics import render
+
+"""
+Metrics API
+
+Purpose:
+- Prometheus scrape target (text exposition format v0.0.4)
+- Per-node latency / DB usage, request latency by safety decision,
+  trace persistence time, webhook counts
+"""
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,11 +1,462 @@
+import hashlib
+import hmac
 import json
+import mmap
+import os
+import struct
+import threading
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from app.config import (
+    AUDIT_CHECKPOINT_EVERY,
+    AUDIT_FSYNC_BATCH,
+    AUDIT_FSYNC_INTERVAL_MS,
+    AUDIT_HASH_CHAIN,
+    AUDIT_LOG_DIR,
+    AUDIT_SEGMENT_MAX_AGE_SECONDS,
+    AUDIT_SEGMENT_MAX_BYTES,
+    AUDIT_SIGNING_KEY,
+)
 
-LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
+"""
+Decision Audit Log
+
+Purpose:
+- Append-only audit record per workflow run (write_decision_log)
+- Segmented JSONL: decisions-000001.jsonl, decisions-000002.jsonl, ...
+  rotated by size (AUDIT_SEGMENT_MAX_BYTES) or age (AUDIT_SEGMENT_MAX_AGE_SECONDS)
+- Group commit: one fsync covers every record written since the last one;
+  a sync happens every AUDIT_FSYNC_BATCH records or AUDIT_FSYNC_INTERVAL_MS,
+  whichever comes first (AUDIT_FSYNC_BATCH=1 → every record durable on return)
+- Sidecar index per segment (.idx), fixed-size binary entries:
+      run_id (16 bytes) | customer_id | timestamp | offset | length
+  so a run is found by scanning the small index (mmap) and ONE seek into
+  the segment — never a directory scan of JSON files
+
+Tamper evidence (AUDIT_HASH_CHAIN=true):
+- Every record carries `prev_hash` and `hash` = SHA-256 of its canonical
+  JSON (sorted keys, including prev_hash); the chain runs across segments
+- Every AUDIT_CHECKPOINT_EVERY records, and whenever a segment is closed,
+  an HMAC-signed checkpoint line pins the current chain head; checkpoints
+  are always fsynced
+- verify() / verify_segment() stream-check the chain and signatures
+
+Every process start opens a fresh segment; closed segments are never
+rewritten.
+"""
+
+SEGMENT_PREFIX = "decisions-"
+
+# run_id, customer_id (-1 = unknown), unix timestamp, byte offset, byte length
+INDEX_ENTRY = struct.Struct("<16sqdQI")
+
+GENESIS_HASH = "0" * 64
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _sign(signing_key: str, checkpoint: Dict[str, Any]) -> str:
+    return hmac.new(signing_key.encode("utf-8"), _canonical(checkpoint), hashlib.sha256).hexdigest()
+
+
+class AuditLog:
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int = AUDIT_SEGMENT_MAX_BYTES,
+        max_age_seconds: float = AUDIT_SEGMENT_MAX_AGE_SECONDS,
+        fsync_batch: int = AUDIT_FSYNC_BATCH,
+        fsync_interval_ms: int = AUDIT_FSYNC_INTERVAL_MS,
+        chained: bool = AUDIT_HASH_CHAIN,
+        signing_key: str = AUDIT_SIGNING_KEY,
+        checkpoint_every: int = AUDIT_CHECKPOINT_EVERY,
+    ):
+        if chained and not signing_key:
+            raise ValueError("AUDIT_HASH_CHAIN requires AUDIT_SIGNING_KEY (checkpoints are HMAC-signed)")
+
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.fsync_batch = max(1, fsync_batch)
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.chained = chained
+        self.signing_key = signing_key
+        self.checkpoint_every = checkpoint_every
+
+        # _lock: file handles, offsets, chain head; _sync_lock: one fsync leader at a time
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+        self._segment: Optional[int] = None
+        self._data = None
+        self._index = None
+        self._offset = 0
+        self._opened_at = 0.0
+
+        self._written = 0     # records appended
+        self._synced = 0      # records known durable
+        self._last_sync = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+        self._retired: List[Any] = []  # rotated handles awaiting their last fsync
+
+        self._head = GENESIS_HASH      # hash of the last chained record
+        self._unsigned = 0             # chained records since the last checkpoint
+
+    # -------------------------
+    # Write path
+    # -------------------------
+
+    def append(self, record: Dict[str, Any], customer_id: Optional[int], timestamp: float) -> None:
+        """
+        Append one record. Returns once it is durable when a sync is due
+        (batch full / interval elapsed / checkpoint); otherwise a timer
+        syncs it within AUDIT_FSYNC_INTERVAL_MS.
+        """
+        run_id = uuid.UUID(record["run_id"]).bytes
+
+        with self._lock:
+            if self._data is None:
+                self._open_first_segment()
+
+            line, head = self._encode(record)
+            self._rotate_if_needed(len(line))
+
+            self._data.write(line)
+            self._index.write(INDEX_ENTRY.pack(
+                run_id,
+                -1 if customer_id is None else int(customer_id),
+                timestamp,
+                self._offset,
+                len(line),
+            ))
+            self._offset += len(line)
+            self._head = head
+
+            self._written += 1
+            ticket = self._written
+
+            checkpoint = False
+            if self.chained:
+                self._unsigned += 1
+                if self._unsigned >= self.checkpoint_every:
+                    self._write_checkpoint()
+                    checkpoint = True
+
+            sync_due = (
+                checkpoint
+                or ticket - self._synced >= self.fsync_batch
+                or time.monotonic() - self._last_sync >= self.fsync_interval
+            )
+            if not sync_due and self._timer is None:
+                self._timer = threading.Timer(self.fsync_interval, self._timed_sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if sync_due:
+            self._sync(ticket)
+
+    def _encode(self, record: Dict[str, Any]) -> Tuple[bytes, str]:
+        """JSONL line for `record` and the chain head after it (holds _lock)"""
+        if not self.chained:
+            return (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode("utf-8"), self._head
+
+        body = dict(record, prev_hash=self._head)
+        digest = hashlib.sha256(_canonical(body)).hexdigest()
+        return _canonical(dict(body, hash=digest)) + b"\n", digest
+
+    def _write_checkpoint(self) -> None:
+        """Signed checkpoint pinning the current chain head (holds _lock)"""
+        checkpoint = {
+            "segment": self._segment,
+            "records": self._unsigned,
+            "hash": self._head,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        line = _canonical({"checkpoint": checkpoint, "signature": _sign(self.signing_key, checkpoint)}) + b"\n"
+        self._data.write(line)
+        self._offset += len(line)
+        self._unsigned = 0
+
+    def _timed_sync(self) -> None:
+        with self._lock:
+            self._timer = None
+            ticket = self._written
+        self._sync(ticket)
+
+    def _sync(self, ticket: int, force: bool = False) -> None:
+        """
+        Group commit: the first waiter becomes leader and fsyncs everything
+        written so far; writers that queued up behind it are covered too.
+        """
+        with self._sync_lock:
+            if self._synced >= ticket and not force:
+                return
+
+            with self._lock:
+                if self._data is None:
+                    return
+                self._data.flush()
+                self._index.flush()
+                retired, self._retired = self._retired, []
+                current = [self._data, self._index]
+                target = self._written
+
+            for handle in retired + current:
+                os.fsync(handle.fileno())
+            # Handles rotated out after this point wait for the next leader
+            for handle in retired:
+                handle.close()
+
+            self._synced = target
+            self._last_sync = time.monotonic()
+
+    def _open_first_segment(self) -> None:
+        """First write of this process: new segment, chain continues from disk (holds _lock)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        existing = self.segments()
+        if existing and self.chained:
+            self._head = self._tail_hash(existing[-1])
+        self._open_segment(existing[-1] + 1 if existing else 1)
+
+    def _rotate_if_needed(self, incoming: int) -> None:
+        """Rotate when full / too old (holds _lock)"""
+        too_big = self._offset > 0 and self._offset + incoming > self.max_bytes
+        too_old = time.time() - self._opened_at >= self.max_age_seconds
+        if not (too_big or too_old):
+            return
+
+        if self.chained and self._unsigned:
+            self._write_checkpoint()
+        self._data.flush()
+        self._index.flush()
+        self._retired += [self._data, self._index]
+        self._open_segment(self._segment + 1)
+
+    def _open_segment(self, segment: int) -> None:
+        self._segment = segment
+        self._data = open(self._path(segment, ".jsonl"), "ab")
+        self._index = open(self._path(segment, ".idx"), "ab")
+        self._offset = 0
+        self._opened_at = time.time()
+
+    def _tail_hash(self, segment: int) -> str:
+        """Chain head recorded at the end of a segment (last record or checkpoint)"""
+        path = self._path(segment, ".jsonl")
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            window = 4096
+            while True:
+                start = max(0, size - window)
+                f.seek(start)
+                lines = f.read(size - start).rstrip(b"\n").split(b"\n")
+                if len(lines) > 1 or start == 0:
+                    break
+                window *= 4
+
+        if not lines[-1]:
+            return GENESIS_HASH
+        try:
+            last = json.loads(lines[-1])
+        except ValueError:
+            # Torn write: the next segment will fail verification at the seam
+            return GENESIS_HASH
+        return last.get("hash") or last.get("checkpoint", {}).get("hash") or GENESIS_HASH
+
+    def close(self) -> None:
+        with self._lock:
+            if self._data is None:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self.chained and self._unsigned:
+                self._write_checkpoint()
+            ticket = self._written
+        self._sync(ticket, force=True)
+        with self._lock:
+            self._data.close()
+            self._index.close()
+            self._data = self._index = None
+
+    # -------------------------
+    # Verification
+    # -------------------------
+
+    def verify(self) -> Dict[str, Any]:
+        """
+        Stream-check every segment, oldest first, continuing the chain
+        across segment boundaries. Stops at the first failure.
+        """
+        self._flush_buffers()
+        head = GENESIS_HASH
+        results = []
+
+        for segment in self.segments():
+            result = verify_segment(self._path(segment, ".jsonl"), self.signing_key, head)
+            results.append(result)
+            if not result["ok"]:
+                return {"ok": False, "segments": results}
+            head = result["last_hash"]
+
+        return {"ok": True, "segments": results}
+
+    # -------------------------
+    # Read path
+    # -------------------------
+
+    def segments(self) -> List[int]:
+        """Segment numbers on disk, oldest first"""
+        if not self.directory.exists():
+            return []
+        return sorted(
+            int(path.stem[len(SEGMENT_PREFIX):])
+            for path in self.directory.glob(f"{SEGMENT_PREFIX}*.jsonl")
+        )
+
+    def _path(self, segment: int, suffix: str) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{segment:06d}{suffix}"
+
+    def _flush_buffers(self) -> None:
+        # Readers see every appended record, durable or not
+        with self._lock:
+            if self._data is not None:
+                self._data.flush()
+                self._index.flush()
+
+    def _entries(self, segment: int) -> Iterator[tuple]:
+        path = self._path(segment, ".idx")
+        size = path.stat().st_size if path.exists() else 0
+        usable = size - size % INDEX_ENTRY.size
+        if usable == 0:
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from INDEX_ENTRY.iter_unpack(mm[:usable])
+
+    def _read(self, segment: int, offset: int, length: int) -> Dict[str, Any]:
+        with open(self._path(segment, ".jsonl"), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def find(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """One run by id: index scan (newest segment first) + one seek"""
+        self._flush_buffers()
+        key = uuid.UUID(run_id).bytes
+
+        for segment in reversed(self.segments()):
+            path = self._path(segment, ".idx")
+            if not path.exists() or path.stat().st_size < INDEX_ENTRY.size:
+                continue
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                position = mm.find(key)
+                while position != -1 and position % INDEX_ENTRY.size:
+                    position = mm.find(key, position + 1)
+                if position == -1 or position + INDEX_ENTRY.size > len(mm):
+                    continue
+                _, _, _, offset, length = INDEX_ENTRY.unpack_from(mm, position)
+            return self._read(segment, offset, length)
+
+        return None
+
+    def query(
+        self,
+        customer_id: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Runs matching customer and/or [since, until) unix timestamps, oldest first"""
+        self._flush_buffers()
+        found = []
+
+        for segment in self.segments():
+            for _, customer, timestamp, offset, length in self._entries(segment):
+                if customer_id is not None and customer != customer_id:
+                    continue
+                if since is not None and timestamp < since:
+                    continue
+                if until is not None and timestamp >= until:
+                    continue
+                found.append(self._read(segment, offset, length))
+
+        return found
+
+
+def verify_segment(path: Path, signing_key: str, prev_hash: str = GENESIS_HASH) -> Dict[str, Any]:
+    """
+    Stream-check one hash-chained segment, line by line.
+
+    prev_hash: chain head at the end of the previous segment.
+    `unsigned` counts records after the last checkpoint; a truncated tail
+    is only detectable up to that point.
+    """
+    result = {
+        "segment": Path(path).name,
+        "ok": True,
+        "records": 0,
+        "checkpoints": 0,
+        "unsigned": 0,
+        "last_hash": prev_hash,
+        "error": None,
+        "line": None,
+    }
+
+    def fail(line_no: int, error: str) -> Dict[str, Any]:
+        result.update(ok=False, error=error, line=line_no)
+        return result
+
+    head = prev_hash
+    with open(path, "rb") as f:
+        for line_no, raw in enumerate(f, 1):
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                return fail(line_no, "unreadable line")
+
+            if "checkpoint" in entry:
+                checkpoint = entry["checkpoint"]
+                if not hmac.compare_digest(_sign(signing_key, checkpoint), entry.get("signature", "")):
+                    return fail(line_no, "bad checkpoint signature")
+                if checkpoint.get("hash") != head:
+                    return fail(line_no, "checkpoint does not match chain")
+                result["checkpoints"] += 1
+                result["unsigned"] = 0
+                continue
+
+            claimed = entry.pop("hash", None)
+            if entry.get("prev_hash") != head:
+                return fail(line_no, "chain broken (prev_hash mismatch)")
+            if hashlib.sha256(_canonical(entry)).hexdigest() != claimed:
+                return fail(line_no, "record altered (hash mismatch)")
+
+            head = claimed
+            result["records"] += 1
+            result["unsigned"] += 1
+            result["last_hash"] = head
+
+    return result
+
+
+# -------------------------
+# Module API
+# -------------------------
+
+_log: Optional[AuditLog] = None
+_log_lock = threading.Lock()
+
+
+def audit_log() -> AuditLog:
+    """Process-wide audit log; the directory is created on first write"""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = AuditLog(Path(AUDIT_LOG_DIR))
+    return _log
 
 
 def write_decision_log(state: dict) -> str:
@@ -15,10 +466,11 @@ def write_decision_log(state: dict) -> str:
     """
 
     run_id = str(uuid.uuid4())
+    now = time.time()
 
     record = {
         "run_id": run_id,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.utcfromtimestamp(now).isoformat(),
         "customer": state.get("customer"),
         "conversation": state.get("conversation"),
         "safety": state.get("safety"),
@@ -27,9 +479,18 @@ def write_decision_log(state: dict) -> str:
         "meta": state.get("meta"),
     }
 
-    file_path = LOG_DIR / f"{run_id}.json"
-
-    with open(file_path, "w") as f:
-        json.dump(record, f, indent=2)
+    customer_id = (state.get("customer") or {}).get("id")
+    audit_log().append(record, customer_id, now)
 
     return run_id
+
+
+def read_decision_log(run_id: str) -> Optional[dict]:
+    """The audit record of one run, or None"""
+    return audit_log().find(run_id)
+
+
+def close_decision_log() -> None:
+    """Sync and close the process-wide log, if it was ever opened (app shutdown)"""
+    if _log is not None:
+        _log.close()
@@ -0,0 +1,143 @@
+import json
+import zlib
+from collections import Counter
+from typing import Any, Dict, List
+
+"""
+Packed Decision Trace Codec
+
+Purpose:
+- Store a whole run's decision_trace as ONE row (PackedDecisionTrace)
+- Sub-objects repeated across agents (the extraction handed to safety,
+  the medicines list, the safety verdict...) are stored once and
+  referenced as {"$ref": n}
+- Compact JSON (no whitespace) compressed with zlib
+
+Payload layout (before compression):
+    {"v": 1, "objects": [...], "trace": [...]}
+
+`unpack_rows` turns a packed record back into the exact row shape the
+classic one-row-per-agent format exposes, so readers never need to know
+which format a run was stored in.
+"""
+
+FORMAT_VERSION = 1
+REF = "$ref"
+
+# Smaller objects cost more as a reference than inline
+MIN_SHARED_BYTES = 32
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _count_shared(value: Any, counts: Counter) -> None:
+    if isinstance(value, (dict, list)):
+        key = _canonical(value)
+        counts[key] += 1
+        if counts[key] > 1:
+            # Repeats are referenced whole; their contents were counted once
+            return
+        children = value.values() if isinstance(value, dict) else value
+        for child in children:
+            _count_shared(child, counts)
+
+
+def encode(trace: List[Dict[str, Any]]) -> bytes:
+    """Compress a decision_trace list; shared sub-objects are stored once"""
+    counts: Counter = Counter()
+    for entry in trace:
+        # Entries themselves are unique; only their contents are shared
+        for value in entry.values():
+            _count_shared(value, counts)
+
+    objects: List[Any] = []
+    index: Dict[str, int] = {}
+
+    def pack(value: Any) -> Any:
+        if not isinstance(value, (dict, list)):
+            return value
+
+        key = _canonical(value)
+        shared = counts[key] > 1 and len(key) >= MIN_SHARED_BYTES
+        if shared and key in index:
+            return {REF: index[key]}
+
+        if isinstance(value, dict):
+            packed = {k: pack(v) for k, v in value.items()}
+        else:
+            packed = [pack(v) for v in value]
+
+        if not shared:
+            return packed
+
+        index[key] = len(objects)
+        objects.append(packed)
+        return {REF: index[key]}
+
+    body = {
+        "v": FORMAT_VERSION,
+        "trace": [{k: pack(v) for k, v in entry.items()} for entry in trace],
+        "objects": objects,
+    }
+    return zlib.compress(
+        json.dumps(body, separators=(",", ":"), default=str).encode("utf-8"), 9
+    )
+
+
+def decode(payload: bytes) -> List[Dict[str, Any]]:
+    """Inverse of encode()"""
+    body = json.loads(zlib.decompress(payload).decode("utf-8"))
+    if body.get("v") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported packed trace version: {body.get('v')}")
+
+    objects = body["objects"]
+
+    def unpack(value: Any) -> Any:
+        if isinstance(value, dict):
+            if len(value) == 1 and REF in value:
+                return unpack(objects[value[REF]])
+            return {k: unpack(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [unpack(v) for v in value]
+        return value
+
+    return [unpack(entry) for entry in body["trace"]]
+
+
+# -------------------------
+# Row mapping
+# -------------------------
+
+def pack_record(request_id: str, trace: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """PackedDecisionTrace column mapping for one run"""
+    return {
+        "request_id": request_id,
+        "steps": len(trace),
+        "payload": encode(trace),
+    }
+
+
+def unpack_rows(pack) -> List[Dict[str, Any]]:
+    """
+    Expand a PackedDecisionTrace into DecisionTrace-shaped dicts.
+    Ids are "p<pack id>.<step>" so they never collide with row ids.
+    """
+    def as_json(value):
+        return None if value is None else json.dumps(value, default=str)
+
+    return [
+        {
+            "id": f"p{pack.id}.{step}",
+            "request_id": pack.request_id,
+            "agent_name": entry.get("agent"),
+            "input": as_json(entry.get("input")),
+            "reasoning": as_json(entry.get("reasoning")),
+            "decision": as_json(entry.get("decision")),
+            "output": as_json(entry.get("output")),
+            "duration_ms": (entry.get("metrics") or {}).get("duration_ms"),
+            "created_at": pack.created_at,
+        }
+        for step, entry in enumerate(decode(pack.payload))
+    ]
@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Type
+
+from sqlalchemy import insert
+
+from app.config import (
+    TRACE_FLUSH_BATCH_ROWS,
+    TRACE_FLUSH_INTERVAL_MS,
+    TRACE_QUEUE_MAX_ROWS,
+)
+from app.db.database import SessionLocal, write_lock
+from app.db.models import DecisionTrace
+from app.observability.metrics import TRACE_PERSIST_DURATION, TRACE_ROWS_DROPPED, timed
+
+"""
+Decision Trace Write-Behind Queue
+
+Purpose:
+- Take DecisionTrace inserts off the user-facing latency path
+- Batch rows from many requests into one multi-row INSERT per flush
+- Flush when TRACE_FLUSH_BATCH_ROWS rows are waiting or
+  TRACE_FLUSH_INTERVAL_MS has passed since the first one arrived
+- Backpressure: enqueue() blocks while TRACE_QUEUE_MAX_ROWS rows are pending
+- stop() drains everything still queued (called on app shutdown)
+
+While the writer is not running (tests, scripts) callers write traces
+inline, exactly as before.
+"""
+
+_STOP = object()
+
+
+class TraceWriter:
+    def __init__(
+        self,
+        max_rows: int = TRACE_QUEUE_MAX_ROWS,
+        batch_rows: int = TRACE_FLUSH_BATCH_ROWS,
+        flush_interval_ms: int = TRACE_FLUSH_INTERVAL_MS,
+    ):
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval_ms / 1000
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_rows)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="trace-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Flush every queued row, then stop the background thread"""
+        with self._lock:
+            if not self.running:
+                return
+            # Queued behind real rows, so everything before it is written first
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def enqueue(self, rows: List[Dict[str, Any]], model: Type = DecisionTrace) -> None:
+        """
+        Queue trace rows for `model` (DecisionTrace or PackedDecisionTrace);
+        blocks while the queue is full (backpressure).
+        """
+        for row in rows:
+            self._queue.put((model, row))
+
+    def flush(self) -> None:
+        """Block until every row queued so far has been written"""
+        self._queue.join()
+
+    # -------------------------
+    # Background thread
+    # -------------------------
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            # Keep collecting until the batch is full or the window closes
+            while batch[-1] is not _STOP and len(batch) < self.batch_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            items = [item for item in batch if item is not _STOP]
+            try:
+                # One multi-row INSERT per table, in arrival order
+                for model, group in groupby(items, key=lambda item: item[0]):
+                    self._write(model, [row for _, row in group])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if batch[-1] is _STOP:
+                return
+
+    def _write(self, model: Type, rows: List[Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            with timed(TRACE_PERSIST_DURATION), write_lock:
+                db.execute(insert(model), rows)
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            TRACE_ROWS_DROPPED.inc(len(rows))
+            print(f"⚠️ Trace flush failed, {len(rows)} rows dropped: {e}")
+        finally:
+            db.close()
+
+
+trace_writer = TraceWriter()
@@ -18,8 +18,8 @@ RELOAD = ENV == "development"
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "ollama")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
 
-# Safety
-MAX_QTY_PER_ORDER = int(os.getenv("MAX_QTY_PER_ORDER", 30))
+# Safety (default per-order cap; policy lives in app/rules/safety_rules.py)
+MAX_QTY_PER_ORDER = int(os.getenv("MAX_QTY_PER_ORDER", 100))
 
 # Scheduler
 REFILL_INTERVAL_SECONDS = int(
@@ -35,4 +35,110 @@ ENABLE_DECISION_TRACE = os.getenv(
 ).lower() == "true"
 
 
-# --------------------
+# -------------------------------------------------------------------
+# Request scopes (app/db/unit_of_work.py)
+# -------------------------------------------------------------------
+
+# Async chat turns holding a DB session at once; the rest queue on the event
+# loop. 0 = the connection pool size (never more turns than connections)
+MAX_INFLIGHT_WORKFLOWS = int(os.getenv("MAX_INFLIGHT_WORKFLOWS", 0))
+
+
+# -------------------------------------------------------------------
+# Batch chat (/chat/batch)
+# -------------------------------------------------------------------
+
+CHAT_BATCH_MAX_ITEMS = int(os.getenv("CHAT_BATCH_MAX_ITEMS", 500))
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", 8))
+
+
+# -------------------------------------------------------------------
+# Decision trace write-behind (app/audit/trace_writer.py)
+# -------------------------------------------------------------------
+
+TRACE_WRITE_BEHIND = os.getenv(
+    "TRACE_WRITE_BEHIND", "true"
+).lower() == "true"
+TRACE_QUEUE_MAX_ROWS = int(os.getenv("TRACE_QUEUE_MAX_ROWS", 10000))
+TRACE_FLUSH_BATCH_ROWS = int(os.getenv("TRACE_FLUSH_BATCH_ROWS", 500))
+TRACE_FLUSH_INTERVAL_MS = int(os.getenv("TRACE_FLUSH_INTERVAL_MS", 250))
+
+# "rows": one DecisionTrace row per agent step
+# "packed": one compressed PackedDecisionTrace row per run (app/audit/trace_codec.py)
+TRACE_STORAGE_FORMAT = os.getenv("TRACE_STORAGE_FORMAT", "rows").lower()
+
+
+# -------------------------------------------------------------------
+# Audit log (app/audit/decision_logger.py)
+# -------------------------------------------------------------------
+
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "logs")
+AUDIT_SEGMENT_MAX_BYTES = int(os.getenv("AUDIT_SEGMENT_MAX_BYTES", 64 * 1024 * 1024))
+AUDIT_SEGMENT_MAX_AGE_SECONDS = int(os.getenv("AUDIT_SEGMENT_MAX_AGE_SECONDS", 3600))
+
+# Records per fsync / longest a record may wait for one (group commit)
+AUDIT_FSYNC_BATCH = int(os.getenv("AUDIT_FSYNC_BATCH", 64))
+AUDIT_FSYNC_INTERVAL_MS = int(os.getenv("AUDIT_FSYNC_INTERVAL_MS", 200))
+
+# Tamper-evident mode: every record carries the SHA-256 of the previous one,
+# with an HMAC-signed checkpoint every AUDIT_CHECKPOINT_EVERY records.
+# No default key: the app refuses to start with the chain on and no key set
+AUDIT_HASH_CHAIN = os.getenv("AUDIT_HASH_CHAIN", "false").lower() == "true"
+AUDIT_SIGNING_KEY = os.getenv("AUDIT_SIGNING_KEY", "")
+AUDIT_CHECKPOINT_EVERY = int(os.getenv("AUDIT_CHECKPOINT_EVERY", 1000))
+
+
+# -------------------------------------------------------------------
+# Extraction (app/extraction/)
+# -------------------------------------------------------------------
+
+# How often each worker checks whether the alias catalog changed
+ALIAS_RELOAD_INTERVAL_SECONDS = float(os.getenv("ALIAS_RELOAD_INTERVAL_SECONDS", 5))
+
+# Extraction results kept per (alias catalog version, normalized message)
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", 2048))
+
+
+# -------------------------------------------------------------------
+# LLM extraction fallback (app/extraction/llm_adapter.py)
+# -------------------------------------------------------------------
+
+# Off by default: the rule path answers everything
+LLM_EXTRACTION_ENABLED = os.getenv(
+    "LLM_EXTRACTION_ENABLED", "false"
+).lower() == "true"
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+
+# Rule results scoring below this go to the LLM (exact alias = 1.0)
+LLM_CONFIDENCE_THRESHOLD = float(os.getenv("LLM_CONFIDENCE_THRESHOLD", 0.85))
+LLM_TIMEOUT_MS = int(os.getenv("LLM_TIMEOUT_MS", 2000))
+
+# Concurrent prompts collected for up to LLM_BATCH_WINDOW_MS go out as one call
+LLM_BATCH_WINDOW_MS = int(os.getenv("LLM_BATCH_WINDOW_MS", 20))
+LLM_BATCH_MAX = int(os.getenv("LLM_BATCH_MAX", 16))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 1024))
+
+# Consecutive failures that open the breaker / how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 3))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+
+
+# -------------------------------------------------------------------
+# Safety verdict cache (app/rules/verdict_cache.py)
+# -------------------------------------------------------------------
+
+# Blocked / clarification verdicts reused for a repeat of the same cart
+VERDICT_CACHE_TTL_SECONDS = float(os.getenv("VERDICT_CACHE_TTL_SECONDS", 30))
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", 1024))
+
+
+# -------------------------------------------------------------------
+# Interaction screening (app/rules/interactions.py)
+# -------------------------------------------------------------------
+
+INTERACTIONS_FILE = os.getenv(
+    "INTERACTIONS_FILE",
+    os.path.join(os.path.dirname(__file__), "rules", "data", "interactions.json")
+)
+# Orders this recent (plus valid prescriptions) count as active medications
+ACTIVE_MEDICATION_DAYS = int(os.getenv("ACTIVE_MEDICATION_DAYS", 30))
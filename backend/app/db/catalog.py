@@ -0,0 +1,91 @@
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from app.db.database import SessionLocal
+from app.db.models import Medicine
+from app.db.versions import CATALOG, get_version
+from app.extraction.fuzzy import normalize_medicine_name
+
+"""
+Medicine Catalog Index
+
+Purpose:
+- Process-wide, read-only view of the catalog for per-item lookups
+  (normalized name → compact record; safety policy per entry is compiled
+  from it by app/rules/engine.py) instead of loading and normalizing
+  every Medicine row on every request
+- Rebuilt only when the "catalog" data version moves (name or
+  prescription flag changed, medicine added or removed)
+- Holds NO stock: stock changes on every order and is always read fresh
+  (RequestScope.stock_levels)
+
+Usage:
+    index = scope.catalog()          # version checked once per request
+    entry = index.lookup("Paracetamol 500mg")
+"""
+
+
+class CatalogEntry(NamedTuple):
+    id: int
+    name: str
+    rx: bool                # prescription_required
+
+
+class CatalogIndex:
+    def __init__(self, entries: Iterable[CatalogEntry], version: int):
+        self.version = version
+        self.entries: List[CatalogEntry] = list(entries)
+        self.by_id: Dict[int, CatalogEntry] = {e.id: e for e in self.entries}
+        self.by_name: Dict[str, CatalogEntry] = {
+            normalize_medicine_name(e.name): e for e in self.entries
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, medicine_id: int) -> Optional[CatalogEntry]:
+        return self.by_id.get(medicine_id)
+
+    def lookup(self, name: str) -> Optional[CatalogEntry]:
+        """Exact match on the normalized name ("paracetamol 500mg" → Paracetamol 500mg)"""
+        return self.by_name.get(normalize_medicine_name(name))
+
+
+_index: Optional[CatalogIndex] = None
+_lock = threading.Lock()
+
+
+def _build() -> CatalogIndex:
+    # Own session: the index is shared, so build it from committed rows only
+    db = SessionLocal()
+    try:
+        version = get_version(db, CATALOG)
+        rows = db.query(Medicine.id, Medicine.name, Medicine.prescription_required).all()
+    finally:
+        db.close()
+
+    return CatalogIndex(
+        (
+            CatalogEntry(row.id, row.name, bool(row.prescription_required))
+            for row in rows
+        ),
+        version,
+    )
+
+
+def catalog_index(db, version: Optional[int] = None) -> CatalogIndex:
+    """
+    The live index, rebuilt first if the catalog version `db` sees has moved
+    (pass `version` when the caller has already read it)
+    """
+    global _index
+
+    if version is None:
+        version = get_version(db, CATALOG)
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = _build()
+            index = _index
+    return index
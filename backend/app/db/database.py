@@ -1,4 +1,7 @@
 import os
+import threading
+from contextlib import nullcontext
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -23,6 +26,29 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+def begin_write(db) -> None:
+    """
+    Open `db`'s write transaction now, before a SAVEPOINT or the first write.
+
+    pysqlite only sends BEGIN ahead of DML, so a SAVEPOINT issued first would
+    itself become the outer transaction (and releasing it would commit).
+    BEGIN IMMEDIATE also takes SQLite's write lock up front, instead of
+    upgrading a read lock mid-transaction and failing with SQLITE_BUSY.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    conn = db.connection()
+    if not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+# SQLite allows one writer at a time: write transactions in this process
+# take turns here instead of failing with "database is locked"
+write_lock = threading.Lock() if DATABASE_URL.startswith("sqlite") else nullcontext()
+
+# Bump data versions (aliases, ...) whenever a session flushes a change
+import app.db.versions  # noqa: E402,F401
+
 
 def init_db():
     """
@@ -32,4 +58,9 @@ def init_db():
     - prevents circular imports
     """
     from app.db import models  # noqa: F401
+    from app.db.migrations import run_migrations
+
     Base.metadata.create_all(bind=engine)
+
+    # Columns / indexes added after a table first shipped
+    run_migrations(engine)
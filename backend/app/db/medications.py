@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Optional
+
+from app.config import ACTIVE_MEDICATION_DAYS
+from app.db.models import Order, OrderHistory, OrderItem, Prescription
+from app.db.versions import ORDERS, PRESCRIPTIONS, get_versions
+from app.extraction.cache import LRUCache
+
+"""
+Active Medications
+
+Purpose:
+- What a customer is currently taking, for interaction screening
+  (app/rules/interactions.py): medicines with a valid prescription, or
+  ordered in the last ACTIVE_MEDICATION_DAYS (orders + order history)
+- Cached process-wide per (customer, orders version, prescriptions version,
+  day): repeat turns cost no query until the customer orders again or a
+  prescription changes
+- Day granularity: the window starts at midnight UTC, and a prescription
+  still counts on the day it expires (screening errs towards warning)
+"""
+
+DEPENDS_ON = (ORDERS, PRESCRIPTIONS)
+
+_cache = LRUCache(4096)
+
+
+def active_medications(db, customer_id: int, catalog, versions: Optional[Dict[str, int]] = None) -> FrozenSet[int]:
+    """
+    Medicine ids the customer is currently taking.
+    `versions`: the orders / prescriptions data versions, if already read.
+    """
+    if versions is None or any(name not in versions for name in DEPENDS_ON):
+        versions = get_versions(db, DEPENDS_ON)
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    key = (customer_id, tuple(versions[name] for name in DEPENDS_ON), catalog.version, today)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    since = today - timedelta(days=ACTIVE_MEDICATION_DAYS)
+
+    prescribed = db.query(Prescription.medicine_id).filter(
+        Prescription.customer_id == customer_id,
+        Prescription.valid_until >= today
+    )
+    ordered = (
+        db.query(OrderItem.medicine_id)
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.customer_id == customer_id, Order.created_at >= since)
+    )
+    ids = {row[0] for row in prescribed.union(ordered).all()}
+
+    # Order history stores names, not ids
+    for (name,) in (
+        db.query(OrderHistory.medicine_name)
+        .filter(OrderHistory.customer_id == customer_id, OrderHistory.created_at >= since)
+        .distinct()
+    ):
+        entry = catalog.lookup(name)
+        if entry:
+            ids.add(entry.id)
+
+    result = frozenset(ids)
+    _cache.put(key, result)
+    return result
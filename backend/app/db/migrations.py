@@ -0,0 +1,188 @@
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+"""
+Schema Migrations
+
+Purpose:
+- Evolve tables that already exist in deployed databases
+  (create_all only creates missing tables, never missing columns)
+- Applied versions are recorded in `schema_migrations`
+- Every step is idempotent: a fresh database built by create_all already
+  has the column / index, so the step is just recorded
+
+Add new steps to the END of MIGRATIONS; never renumber.
+"""
+
+Migration = Tuple[int, str, Callable[[Connection], None]]
+
+
+# -------------------------
+# Helpers
+# -------------------------
+
+def add_column(conn: Connection, table: str, column: str, ddl_type: str) -> None:
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+# -------------------------
+# Steps
+# -------------------------
+
+def _decision_trace_duration(conn: Connection) -> None:
+    add_column(conn, "decision_traces", "duration_ms", "FLOAT")
+
+
+def _seed_medicine_aliases(conn: Connection) -> None:
+    """Move the built-in alias table into medicine_aliases (only if empty)"""
+    from app.extraction.aliases import MEDICINE_ALIASES
+
+    if not inspect(conn).has_table("medicine_aliases"):
+        return
+    if conn.execute(text("SELECT COUNT(*) FROM medicine_aliases")).scalar():
+        return
+
+    medicine_ids = dict(conn.execute(text("SELECT name, id FROM medicines")).all())
+    rows = [
+        {
+            "medicine_id": medicine_ids[details["name"]],
+            "alias": alias,
+            "default_dosage": details["dosage"],
+            "otc_hint": details["otc"],
+        }
+        for alias, details in MEDICINE_ALIASES.items()
+        if details["name"] in medicine_ids
+    ]
+    if rows:
+        conn.execute(
+            text(
+                "INSERT INTO medicine_aliases (medicine_id, alias, default_dosage, otc_hint) "
+                "VALUES (:medicine_id, :alias, :default_dosage, :otc_hint)"
+            ),
+            rows,
+        )
+
+
+def _alias_language(conn: Connection) -> None:
+    """
+    medicine_aliases.language, unique per (alias, language).
+    SQLite cannot drop the old UNIQUE(alias), so the table is rebuilt.
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table("medicine_aliases"):
+        return
+    if "language" in {c["name"] for c in inspector.get_columns("medicine_aliases")}:
+        return
+
+    conn.execute(text("ALTER TABLE medicine_aliases RENAME TO medicine_aliases_old"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_medicine_aliases_id"))
+    conn.execute(text(
+        "CREATE TABLE medicine_aliases ("
+        "id INTEGER NOT NULL PRIMARY KEY, "
+        "medicine_id INTEGER NOT NULL REFERENCES medicines (id), "
+        "alias VARCHAR NOT NULL, "
+        "language VARCHAR DEFAULT 'en' NOT NULL, "
+        "default_dosage VARCHAR, "
+        "otc_hint BOOLEAN, "
+        "created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), "
+        "CONSTRAINT uq_medicine_aliases_alias_language UNIQUE (alias, language))"
+    ))
+    conn.execute(text(
+        "INSERT INTO medicine_aliases (id, medicine_id, alias, language, default_dosage, otc_hint, created_at) "
+        "SELECT id, medicine_id, alias, 'en', default_dosage, otc_hint, created_at FROM medicine_aliases_old"
+    ))
+    conn.execute(text("DROP TABLE medicine_aliases_old"))
+    conn.execute(text("CREATE INDEX ix_medicine_aliases_id ON medicine_aliases (id)"))
+
+
+def _seed_localized_aliases(conn: Connection) -> None:
+    """Spanish / Chinese aliases, for languages that have none yet"""
+    from app.extraction.aliases import LOCALIZED_ALIASES
+
+    if not inspect(conn).has_table("medicine_aliases"):
+        return
+    present = {row[0] for row in conn.execute(text("SELECT DISTINCT language FROM medicine_aliases"))}
+    medicine_ids = dict(conn.execute(text("SELECT name, id FROM medicines")).all())
+
+    rows = [
+        {
+            "medicine_id": medicine_ids[details["name"]],
+            "alias": alias,
+            "language": language,
+            "default_dosage": details["dosage"],
+            "otc_hint": details["otc"],
+        }
+        for language, aliases in LOCALIZED_ALIASES.items()
+        if language not in present
+        for alias, details in aliases.items()
+        if details["name"] in medicine_ids
+    ]
+    if rows:
+        conn.execute(
+            text(
+                "INSERT INTO medicine_aliases (medicine_id, alias, language, default_dosage, otc_hint) "
+                "VALUES (:medicine_id, :alias, :language, :default_dosage, :otc_hint)"
+            ),
+            rows,
+        )
+
+
+def _prescription_lookup_index(conn: Connection) -> None:
+    if not inspect(conn).has_table("prescriptions"):
+        return
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_prescriptions_customer_medicine_valid "
+        "ON prescriptions (customer_id, medicine_id, valid_until)"
+    ))
+
+
+def _dose_buckets(conn: Connection) -> None:
+    """Rolling dose windows, backfilled from the last week's orders"""
+    from app.db.models import DoseBucket
+    from app.rules.dose_windows import rebuild_dose_buckets
+
+    DoseBucket.__table__.create(conn, checkfirst=True)
+    inspector = inspect(conn)
+    if all(inspector.has_table(t) for t in ("orders", "order_items", "medicines")):
+        rebuild_dose_buckets(conn)
+
+
+MIGRATIONS: List[Migration] = [
+    (1, "decision_traces.duration_ms", _decision_trace_duration),
+    (2, "seed medicine_aliases", _seed_medicine_aliases),
+    (3, "medicine_aliases.language", _alias_language),
+    (4, "seed localized medicine_aliases", _seed_localized_aliases),
+    (5, "prescriptions (customer_id, medicine_id, valid_until) index", _prescription_lookup_index),
+    (6, "dose_buckets (rolling cumulative doses)", _dose_buckets),
+]
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply pending migrations in order. Returns the versions applied."""
+    applied: List[int] = []
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR NOT NULL, "
+            "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+        for version, description, step in MIGRATIONS:
+            if version in done:
+                continue
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+                {"v": version, "d": description},
+            )
+            applied.append(version)
+            print(f"🗄️ Migration {version} applied: {description}")
+
+    return applied
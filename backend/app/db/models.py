@@ -5,7 +5,11 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Text,
-    ForeignKey
+    Float,
+    LargeBinary,
+    ForeignKey,
+    Index,
+    UniqueConstraint
 )
 from sqlalchemy.sql import func
 
@@ -50,11 +54,52 @@ class Medicine(Base):
     )
 
 
+# -------------------------
+# MEDICINE ALIAS
+# -------------------------
+class MedicineAlias(Base):
+    """
+    Brand / generic name a customer may type, linked to its Medicine.
+    Compiled into the extraction matcher for its language
+    (app/extraction/registry.py); the same word may mean different
+    medicines in different languages.
+    """
+    __tablename__ = "medicine_aliases"
+    __table_args__ = (
+        UniqueConstraint("alias", "language", name="uq_medicine_aliases_alias_language"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    medicine_id = Column(
+        Integer,
+        ForeignKey("medicines.id"),
+        nullable=False
+    )
+
+    alias = Column(String, nullable=False)
+    language = Column(String, nullable=False, default="en", server_default="en")
+    default_dosage = Column(String, nullable=True)
+    otc_hint = Column(Boolean, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+
 # -------------------------
 # PRESCRIPTION
 # -------------------------
 class Prescription(Base):
     __tablename__ = "prescriptions"
+    __table_args__ = (
+        # Rx checks: customer + cart medicines + still valid (one range scan)
+        Index(
+            "ix_prescriptions_customer_medicine_valid",
+            "customer_id", "medicine_id", "valid_until"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -117,6 +162,31 @@ class DecisionTrace(Base):
     decision = Column(String)
     output = Column(Text)
 
+    # Node wall time (app/graph/instrumentation.py)
+    duration_ms = Column(Float, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+
+# -------------------------
+# PACKED DECISION TRACE
+# -------------------------
+class PackedDecisionTrace(Base):
+    """
+    One row per workflow run (TRACE_STORAGE_FORMAT=packed).
+    payload: app/audit/trace_codec.py encoding of the whole decision_trace.
+    """
+    __tablename__ = "decision_trace_packs"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    request_id = Column(String, unique=True, index=True)
+    steps = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+
     created_at = Column(
         DateTime(timezone=True),
         server_default=func.now()
@@ -164,3 +234,54 @@ class OrderItem(Base):
 
     quantity = Column(Integer, nullable=False)
     dosage = Column(String, nullable=True)
+
+
+# -------------------------
+# DOSE BUCKET
+# -------------------------
+class DoseBucket(Base):
+    """
+    Milligrams of one ingredient a customer bought within one clock hour.
+    Upserted with every order (app/rules/dose_windows.py); 24h / 7 day
+    totals are sums over at most 24 / 168 rows.
+    """
+    __tablename__ = "dose_buckets"
+    __table_args__ = (
+        UniqueConstraint(
+            "customer_id", "ingredient", "hour",
+            name="uq_dose_buckets_customer_ingredient_hour"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    customer_id = Column(
+        Integer,
+        ForeignKey("customers.id"),
+        nullable=False
+    )
+
+    ingredient = Column(String, nullable=False)
+    hour = Column(DateTime, nullable=False)     # UTC, truncated to the hour
+    mg = Column(Float, nullable=False, default=0)
+
+
+# -------------------------
+# DATA VERSION
+# -------------------------
+class DataVersion(Base):
+    """
+    Change counter per reference dataset (aliases, ...), bumped in the same
+    transaction as the change (app/db/versions.py). In-memory indexes poll
+    it to know when to rebuild.
+    """
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
@@ -3,9 +3,11 @@ import json
 
 from app.db.database import SessionLocal, engine, Base
 from app.db.models import (
-    Customer, Medicine, Prescription, OrderHistory, 
-    DecisionTrace, Order, OrderItem
+    Customer, Medicine, MedicineAlias, Prescription, OrderHistory, 
+    DecisionTrace, DoseBucket, Order, OrderItem
 )
+from app.rules.dose_windows import rebuild_dose_buckets
+from app.extraction.aliases import LOCALIZED_ALIASES, MEDICINE_ALIASES
 
 
 def seed():
@@ -17,12 +19,14 @@ def seed():
 
     try:
         # ---------- Clear existing data (for re-seeding) ----------
+        db.query(DoseBucket).delete()
         db.query(OrderItem).delete()
         db.query(Order).delete()
         db.query(DecisionTrace).delete()
         db.query(OrderHistory).delete()
         db.query(Prescription).delete()
         db.query(Customer).delete()
+        db.query(MedicineAlias).delete()
         db.query(Medicine).delete()
         db.commit()
 
@@ -79,6 +83,22 @@ def seed():
         db.add_all(medicines)
         db.commit()
 
+        # ---------- MEDICINE ALIASES ----------
+        medicine_ids = {m.name: m.id for m in medicines}
+        alias_sets = {"en": MEDICINE_ALIASES, **LOCALIZED_ALIASES}
+        db.add_all(
+            MedicineAlias(
+                medicine_id=medicine_ids[details["name"]],
+                alias=alias,
+                language=language,
+                default_dosage=details["dosage"],
+                otc_hint=details["otc"]
+            )
+            for language, aliases in alias_sets.items()
+            for alias, details in aliases.items()
+        )
+        db.commit()
+
         # ---------- PRESCRIPTIONS ----------
         for customer in customers:
             # Assign random RX medicines to customers
@@ -119,6 +139,10 @@ def seed():
         
         db.commit()
 
+        # ---------- DOSE WINDOWS (derived from the orders above) ----------
+        rebuild_dose_buckets(db)
+        db.commit()
+
         # ---------- ORDER HISTORY ----------
         for customer in customers:
             orders = db.query(Order).filter(Order.customer_id == customer.id).all()
@@ -163,9 +187,11 @@ def seed():
         print("✅ Database seeded successfully!")
         print(f"  📊 Customers: {db.query(Customer).count()}")
         print(f"  💊 Medicines: {db.query(Medicine).count()}")
+        print(f"  🔤 Aliases: {db.query(MedicineAlias).count()}")
         print(f"  📋 Prescriptions: {db.query(Prescription).count()}")
         print(f"  📦 Orders: {db.query(Order).count()}")
         print(f"  📝 Order History: {db.query(OrderHistory).count()}")
+        print(f"  ⏱️ Dose Buckets: {db.query(DoseBucket).count()}")
         print(f"  🔍 Decision Traces: {db.query(DecisionTrace).count()}")
 
     except Exception as e:
@@ -0,0 +1,265 @@
+import asyncio
+import contextvars
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from app.config import MAX_INFLIGHT_WORKFLOWS
+from app.db.catalog import CatalogIndex, catalog_index
+from app.db.database import SessionLocal, begin_write, engine, write_lock
+from app.db.medications import active_medications
+from app.db.models import Customer, Medicine, Prescription
+from app.db.versions import CATALOG
+
+"""
+Request-scoped Unit of Work
+
+Purpose:
+- ONE Session (one pooled connection) per chat turn, shared by every agent
+- Identity map for rows agents look up repeatedly
+  (customers, prescriptions)
+- Catalog lookups go through the process-wide index (app/db/catalog.py),
+  version-checked once per request; stock is read fresh
+- Writes are short: the order + stock change is committed by `scope.write()`
+  as soon as it is placed, so no write lock is held through the webhook,
+  confirmation, refill prediction or trace persistence; whatever is left
+  is committed when the request ends
+
+Usage:
+    with request_scope() as scope:
+        customer = scope.customer(customer_id)
+
+Nested `request_scope()` calls join the active scope; only the outermost
+owner commits, rolls back and closes it.
+
+Graph nodes may run in parallel (fan-out), so every use of the shared
+Session goes through `scope.session()` or the lookup helpers, which
+serialize access with a per-scope lock.
+
+Every scope holds a pooled connection while it reads, so async scopes are
+admitted MAX_INFLIGHT_WORKFLOWS at a time (default: the pool size); the rest
+wait on the event loop instead of timing out on the pool.
+"""
+
+_current_scope: contextvars.ContextVar[Optional["RequestScope"]] = contextvars.ContextVar(
+    "request_scope", default=None
+)
+
+
+class RequestScope:
+    """Session + identity map for a single request"""
+
+    def __init__(self, customers: Optional[List[Customer]] = None):
+        """
+        customers: detached rows shared across many scopes (batch runs),
+        merged into this session without a SELECT.
+        """
+        self.db = SessionLocal()
+        # The identity map is this request's cache: keep it across the
+        # mid-request commit of the order (stock is always re-read anyway)
+        self.db.expire_on_commit = False
+
+        # Sessions are not thread-safe; parallel graph branches take turns
+        self._lock = threading.RLock()
+
+        self._catalog: Optional[CatalogIndex] = None
+        self._prescriptions: Dict[Tuple[int, int], Optional[Prescription]] = {}
+        self._active: Dict[int, FrozenSet[int]] = {}
+
+        for customer in customers or []:
+            self.db.merge(customer, load=False)
+
+    @contextmanager
+    def session(self):
+        """Exclusive access to the shared Session for a block of queries"""
+        with self._lock:
+            yield self.db
+
+    @contextmanager
+    def write(self):
+        """
+        Short write transaction on the shared Session: committed on exit,
+        rolled back on error. Anything read earlier in the request is
+        committed with it (reads only, nothing to undo). On SQLite, writers
+        run one at a time (database.write_lock).
+        """
+        with self._lock, write_lock:
+            try:
+                begin_write(self.db)
+                yield self.db
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+
+    # -------------------------
+    # Identity-mapped lookups
+    # -------------------------
+
+    def customer(self, customer_id: int) -> Optional[Customer]:
+        """Customer by primary key (Session.get hits the identity map first)"""
+        with self._lock:
+            return self.db.get(Customer, customer_id)
+
+    def catalog(self, version: Optional[int] = None) -> CatalogIndex:
+        """
+        Catalog index (names, Rx flags), checked once per request.
+        `version`: the "catalog" data version, if already read this request.
+        """
+        with self._lock:
+            if self._catalog is None:
+                self._catalog = catalog_index(self.db, version)
+            return self._catalog
+
+    def stock_levels(self, medicine_ids) -> Dict[int, int]:
+        """Current stock for the given medicines, in one query (never cached)"""
+        ids = list(medicine_ids)
+        if not ids:
+            return {}
+        with self._lock:
+            return dict(
+                self.db.query(Medicine.id, Medicine.stock_quantity)
+                .filter(Medicine.id.in_(ids))
+                .all()
+            )
+
+    def valid_prescriptions(self, customer_id: int, medicine_ids) -> Dict[int, Optional[Prescription]]:
+        """
+        Currently valid prescription (or None) for each medicine in a cart.
+        Anything not already known is fetched in ONE `medicine_id IN (...)`
+        query (ix_prescriptions_customer_medicine_valid), then cached.
+        """
+        ids = list(dict.fromkeys(medicine_ids))
+        with self._lock:
+            missing = [m for m in ids if (customer_id, m) not in self._prescriptions]
+            if missing:
+                rows = (
+                    self.db.query(Prescription)
+                    .filter(
+                        Prescription.customer_id == customer_id,
+                        Prescription.medicine_id.in_(missing),
+                        Prescription.valid_until >= datetime.utcnow()
+                    )
+                    .all()
+                )
+                for medicine_id in missing:
+                    self._prescriptions[(customer_id, medicine_id)] = None
+                for row in rows:
+                    if self._prescriptions[(customer_id, row.medicine_id)] is None:
+                        self._prescriptions[(customer_id, row.medicine_id)] = row
+
+            return {m: self._prescriptions.get((customer_id, m)) for m in ids}
+
+    def active_medications(self, customer_id: int, versions: Optional[Dict[str, int]] = None) -> FrozenSet[int]:
+        """
+        Medicine ids the customer is currently taking (app/db/medications.py),
+        once per request. `versions`: data versions already read this request.
+        """
+        with self._lock:
+            if customer_id not in self._active:
+                self._active[customer_id] = active_medications(
+                    self.db, customer_id, self.catalog((versions or {}).get(CATALOG)), versions
+                )
+            return self._active[customer_id]
+
+    # -------------------------
+    # Transaction control
+    # -------------------------
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def release(self):
+        """
+        End the read transaction and hand the connection back to the pool
+        (identity map kept), e.g. before waiting on something that is not
+        the database. Only between agents: never with writes pending.
+        """
+        with self._lock:
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def current_scope() -> Optional[RequestScope]:
+    """The active request scope, or None outside a request"""
+    return _current_scope.get()
+
+
+@contextmanager
+def request_scope(**preloaded):
+    """
+    Open the request's unit of work, or join the one already active.
+
+    The owner commits on success and rolls back on any exception.
+    `preloaded` is passed to RequestScope (ignored when joining).
+    """
+    scope = _current_scope.get()
+    if scope is not None:
+        yield scope
+        return
+
+    scope = RequestScope(**preloaded)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+        scope.commit()
+    except BaseException:
+        scope.rollback()
+        raise
+    finally:
+        _current_scope.reset(token)
+        scope.close()
+
+
+def _inflight_limit() -> int:
+    if MAX_INFLIGHT_WORKFLOWS > 0:
+        return MAX_INFLIGHT_WORKFLOWS
+    size = getattr(engine.pool, "size", None)
+    return size() if callable(size) else 5
+
+
+# One limiter per event loop (asyncio primitives are bound to their loop)
+_limiters: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+
+
+def _inflight_limiter() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = asyncio.Semaphore(_inflight_limit())
+    return limiter
+
+
+@asynccontextmanager
+async def async_request_scope(**preloaded):
+    """
+    Async twin of request_scope() for `async def` endpoints.
+
+    Same join/commit semantics; the blocking commit, rollback and close
+    run in a worker thread so they never stall the event loop. A new scope
+    first waits for one of the MAX_INFLIGHT_WORKFLOWS slots (joining is free).
+    """
+    scope = _current_scope.get()
+    if scope is not None:
+        yield scope
+        return
+
+    async with _inflight_limiter():
+        scope = RequestScope(**preloaded)
+        token = _current_scope.set(scope)
+        try:
+            yield scope
+            await asyncio.to_thread(scope.commit)
+        except BaseException:
+            await asyncio.to_thread(scope.rollback)
+            raise
+        finally:
+            _current_scope.reset(token)
+            await asyncio.to_thread(scope.close)
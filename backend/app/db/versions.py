@@ -0,0 +1,136 @@
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models import DataVersion, Medicine, MedicineAlias, Order, OrderHistory, OrderItem, Prescription
+
+"""
+Data Versions
+
+Purpose:
+- One counter per reference dataset that in-memory indexes are built from
+- Bumped automatically, in the same transaction, whenever the ORM flushes
+  a change to a watched model (insert, delete, or update of a watched column)
+- Readers compare the counter with the version they built from and rebuild
+  when it moved — across every worker, without a restart
+
+Changes made with raw SQL bypass the listener; call bump() yourself, or
+touch() on a Session.
+
+A Session bumps each dataset at most ONCE per transaction, however many
+flushes touch it: an order (stock, order rows, order history) costs one
+UPDATE per dataset, issued inside the short order transaction, so the row
+is locked only until that commit.
+"""
+
+ALIASES = "aliases"
+CATALOG = "catalog"
+INVENTORY = "inventory"
+ORDERS = "orders"
+PRESCRIPTIONS = "prescriptions"
+
+# session.info key: datasets already bumped by the open transaction
+_BUMPED = "versions_bumped"
+
+# dataset → [(model, columns whose update counts; None = any column)]
+WATCHED: Dict[str, Tuple[Tuple[type, Optional[Set[str]]], ...]] = {
+    ALIASES: (
+        (MedicineAlias, None),
+        (Medicine, {"name", "prescription_required"}),
+    ),
+    # Stock is NOT part of the catalog: it changes on every order
+    CATALOG: (
+        (Medicine, {"name", "prescription_required"}),
+    ),
+    INVENTORY: (
+        (Medicine, {"stock_quantity"}),
+    ),
+    PRESCRIPTIONS: (
+        (Prescription, None),
+    ),
+    # What customers have been taking (interaction screening)
+    ORDERS: (
+        (Order, None),
+        (OrderItem, None),
+        (OrderHistory, None),
+    ),
+}
+
+
+def touch(session: Session, name: str) -> None:
+    """
+    Bump `name` as part of `session`'s transaction (undone with it).
+    Once per transaction: later touches of the same dataset are free.
+    """
+    bumped = session.info.setdefault(_BUMPED, set())
+    if name not in bumped:
+        bump(session.connection(), name)
+        bumped.add(name)
+
+
+def bump(conn, name: str) -> None:
+    result = conn.execute(
+        update(DataVersion)
+        .where(DataVersion.name == name)
+        .values(version=DataVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        conn.execute(insert(DataVersion).values(name=name, version=1))
+
+
+def get_version(db, name: str) -> int:
+    """Current version of `name` (0 if it never changed)"""
+    version = db.execute(
+        select(DataVersion.version).where(DataVersion.name == name)
+    ).scalar()
+    return version or 0
+
+
+def get_versions(db, names: Iterable[str]) -> Dict[str, int]:
+    """Several versions in one query (0 for any that never changed)"""
+    names = list(names)
+    rows = db.execute(
+        select(DataVersion.name, DataVersion.version).where(DataVersion.name.in_(names))
+    ).all()
+    found = dict(rows)
+    return {name: found.get(name, 0) for name in names}
+
+
+def _changed(obj, columns: Optional[Set[str]]) -> bool:
+    if columns is None:
+        return True
+    state = inspect(obj)
+    return any(state.attrs[column].history.has_changes() for column in columns)
+
+
+def _datasets_touched(new: Iterable, dirty: Iterable, deleted: Iterable) -> Set[str]:
+    touched = set()
+    for name, watched in WATCHED.items():
+        for model, columns in watched:
+            if any(isinstance(obj, model) for obj in new) or any(
+                isinstance(obj, model) for obj in deleted
+            ):
+                touched.add(name)
+            elif any(isinstance(obj, model) and _changed(obj, columns) for obj in dirty):
+                touched.add(name)
+    return touched
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session, flush_context):
+    # new / dirty / deleted still describe what this flush wrote
+    for name in _datasets_touched(session.new, session.dirty, session.deleted):
+        touch(session, name)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_bumps_at_transaction_end(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_BUMPED, None)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_bumps_on_savepoint_rollback(session, previous_transaction):
+    # A rolled-back savepoint may have undone a bump: bump again if needed
+    session.info.pop(_BUMPED, None)
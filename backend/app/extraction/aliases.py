@@ -0,0 +1,72 @@
+"""
+Medicine Alias Table
+
+Format: message_keyword → {name: db_name, dosage: default_dosage, otc: is_otc}
+
+Brand and generic names a customer may type, mapped to the canonical
+`Medicine.name`. Compiled into one automaton per customer language by
+app/extraction/registry.py.
+
+MEDICINE_ALIASES is English; LOCALIZED_ALIASES adds the names Spanish and
+Chinese customers use. Seed data for the medicine_aliases table.
+"""
+
+MEDICINE_ALIASES = {
+    "paracetamol": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
+    "acetaminophen": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
+    "tylenol": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
+    "ibuprofen": {"name": "Ibuprofen 200mg", "dosage": "200mg", "otc": True},
+    "advil": {"name": "Ibuprofen 200mg", "dosage": "200mg", "otc": True},
+    "motrin": {"name": "Ibuprofen 200mg", "dosage": "200mg", "otc": True},
+    "amoxicillin": {"name": "Amoxicillin 500mg", "dosage": "500mg", "otc": False},
+    "augmentin": {"name": "Amoxicillin 500mg", "dosage": "500mg", "otc": False},
+    "metformin": {"name": "Metformin 500mg", "dosage": "500mg", "otc": False},
+    "glucophage": {"name": "Metformin 500mg", "dosage": "500mg", "otc": False},
+    "lisinopril": {"name": "Lisinopril 10mg", "dosage": "10mg", "otc": False},
+    "zestril": {"name": "Lisinopril 10mg", "dosage": "10mg", "otc": False},
+    "omeprazole": {"name": "Omeprazole 20mg", "dosage": "20mg", "otc": False},
+    "prilosec": {"name": "Omeprazole 20mg", "dosage": "20mg", "otc": False},
+    "vitamin c": {"name": "Vitamin C 500mg", "dosage": "500mg", "otc": True},
+    "ascorbic acid": {"name": "Vitamin C 500mg", "dosage": "500mg", "otc": True},
+    "aspirin": {"name": "Aspirin 81mg", "dosage": "81mg", "otc": True},
+    "cetirizine": {"name": "Cetirizine 10mg", "dosage": "10mg", "otc": True},
+    "zyrtec": {"name": "Cetirizine 10mg", "dosage": "10mg", "otc": True},
+    "ciprofloxacin": {"name": "Ciprofloxacin 500mg", "dosage": "500mg", "otc": False},
+    "cipro": {"name": "Ciprofloxacin 500mg", "dosage": "500mg", "otc": False},
+}
+
+LOCALIZED_ALIASES = {
+    "es": {
+        "acetaminofén": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
+        "ibuprofeno": {"name": "Ibuprofen 200mg", "dosage": "200mg", "otc": True},
+        "amoxicilina": {"name": "Amoxicillin 500mg", "dosage": "500mg", "otc": False},
+        "metformina": {"name": "Metformin 500mg", "dosage": "500mg", "otc": False},
+        "omeprazol": {"name": "Omeprazole 20mg", "dosage": "20mg", "otc": False},
+        "vitamina c": {"name": "Vitamin C 500mg", "dosage": "500mg", "otc": True},
+        "ácido ascórbico": {"name": "Vitamin C 500mg", "dosage": "500mg", "otc": True},
+        "aspirina": {"name": "Aspirin 81mg", "dosage": "81mg", "otc": True},
+        "cetirizina": {"name": "Cetirizine 10mg", "dosage": "10mg", "otc": True},
+        "ciprofloxacino": {"name": "Ciprofloxacin 500mg", "dosage": "500mg", "otc": False},
+    },
+    "zh": {
+        "扑热息痛": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
+        "对乙酰氨基酚": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
+        "泰诺": {"name": "Paracetamol 500mg", "dosage": "500mg", "otc": True},
+        "布洛芬": {"name": "Ibuprofen 200mg", "dosage": "200mg", "otc": True},
+        "阿莫西林": {"name": "Amoxicillin 500mg", "dosage": "500mg", "otc": False},
+        "二甲双胍": {"name": "Metformin 500mg", "dosage": "500mg", "otc": False},
+        "赖诺普利": {"name": "Lisinopril 10mg", "dosage": "10mg", "otc": False},
+        "奥美拉唑": {"name": "Omeprazole 20mg", "dosage": "20mg", "otc": False},
+        "维生素c": {"name": "Vitamin C 500mg", "dosage": "500mg", "otc": True},
+        "阿司匹林": {"name": "Aspirin 81mg", "dosage": "81mg", "otc": True},
+        "西替利嗪": {"name": "Cetirizine 10mg", "dosage": "10mg", "otc": True},
+        "环丙沙星": {"name": "Ciprofloxacin 500mg", "dosage": "500mg", "otc": False},
+    },
+}
+
+
+def builtin_aliases(language: str = "en"):
+    """Built-in aliases one language's matcher sees: English plus its own"""
+    if language == "en":
+        return MEDICINE_ALIASES
+    return {**MEDICINE_ALIASES, **LOCALIZED_ALIASES.get(language, {})}
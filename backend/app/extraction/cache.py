@@ -0,0 +1,88 @@
+import copy
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+from app.config import EXTRACTION_CACHE_SIZE
+from app.extraction import registry
+from app.extraction.languages import DEFAULT_LANGUAGE
+from app.observability.metrics import EXTRACTION_CACHE
+
+"""
+Extraction Result Cache
+
+Purpose:
+- Most chat traffic is a handful of phrasings; extract each one once
+- Bounded LRU keyed on (alias catalog version, language, normalized message):
+  an alias change moves the version, so stale results are never served
+  and simply age out
+- Hit / miss counters: stats() and pharmacy_extraction_cache_total
+"""
+
+
+def normalize_message(message: str) -> str:
+    """Case and whitespace differences don't change what we extract"""
+    return re.sub(r"\s+", " ", message.lower()).strip()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+extraction_cache = LRUCache(EXTRACTION_CACHE_SIZE)
+
+
+def cached_extraction(message: str, extract: Callable[[str], Any], language: str = DEFAULT_LANGUAGE) -> Any:
+    """
+    extract(normalized_message), memoized per alias catalog version and language.
+    Callers get their own copy, so mutating a result never poisons the cache.
+    Results carrying "cacheable": False are returned but not stored.
+    """
+    text = normalize_message(message)
+    key = (registry.current().version, language, text)
+
+    result = extraction_cache.get(key)
+    if result is None:
+        EXTRACTION_CACHE.inc(result="miss")
+        result = extract(text)
+        if not (isinstance(result, dict) and result.get("cacheable") is False):
+            extraction_cache.put(key, result)
+    else:
+        EXTRACTION_CACHE.inc(result="hit")
+
+    return copy.deepcopy(result)
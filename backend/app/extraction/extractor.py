@@ -0,0 +1,94 @@
+import re
+from typing import Any, Dict, List
+
+from app.config import LLM_CONFIDENCE_THRESHOLD, LLM_EXTRACTION_ENABLED
+from app.extraction import registry
+from app.extraction.languages import DEFAULT_LANGUAGE, rules_for
+from app.extraction.llm_adapter import get_llm_adapter
+
+"""
+Medicine Extractor
+
+Purpose:
+- Turn a chat message into the medicines it mentions, in message order,
+  one entry per canonical medicine
+- Exact pass: alias automaton (word-bounded, leftmost-longest)
+- Typo pass: words the exact pass did not cover (5+ letters) are looked up
+  in the trigram index ("amoxicilin" → Amoxicillin 500mg); skipped for
+  languages written without spaces (zh)
+- Matcher, index and tokenization follow the customer's language
+
+Each result is the alias details dict (name, dosage, otc, medicine_id)
+plus how it matched: match = "alias" | "fuzzy" | "llm", term, score.
+
+Tiers (extract_tiered):
+- rules: the passes above; confidence = weakest match score (none found = 0)
+- llm: below LLM_CONFIDENCE_THRESHOLD, and only if LLM_EXTRACTION_ENABLED,
+  the message goes to the LLM adapter. Names it returns are resolved
+  against the catalog with the same passes, so it can never invent a medicine.
+- rules_fallback: the LLM was wanted but gave no answer (timeout, breaker open)
+"""
+
+# Shorter words are too ambiguous to correct
+MIN_FUZZY_WORD = 5
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+
+def extract_medicines(message: str, language: str = DEFAULT_LANGUAGE) -> List[Dict[str, Any]]:
+    loaded = registry.current(language)
+    rules = rules_for(language)
+    text = rules.normalize(message)
+
+    hits = []
+    covered = []
+    for match in loaded.matcher.find(text):
+        hits.append((match.start, dict(match.payload, match="alias", term=match.keyword, score=1.0)))
+        covered.append((match.start, match.end))
+
+    for word in _WORD.finditer(text) if rules.fuzzy else ():
+        if len(word.group()) < MIN_FUZZY_WORD:
+            continue
+        if any(start < word.end() and word.start() < end for start, end in covered):
+            continue
+        best = loaded.fuzzy.best(word.group())
+        if best:
+            hits.append((word.start(), dict(best.payload, match="fuzzy", term=word.group(), score=best.score)))
+
+    found: List[Dict[str, Any]] = []
+    seen = set()
+    for _, details in sorted(hits, key=lambda hit: hit[0]):
+        if details["name"] not in seen:
+            seen.add(details["name"])
+            found.append(details)
+    return found
+
+
+def confidence(found: List[Dict[str, Any]]) -> float:
+    return min((details["score"] for details in found), default=0.0)
+
+
+def extract_tiered(message: str, language: str = DEFAULT_LANGUAGE) -> Dict[str, Any]:
+    """{"medicines": [...], "tier": ..., "confidence": ...}"""
+    found = extract_medicines(message, language)
+    score = confidence(found)
+
+    if score >= LLM_CONFIDENCE_THRESHOLD or not LLM_EXTRACTION_ENABLED:
+        return {"medicines": found, "tier": "rules", "confidence": score}
+
+    read = get_llm_adapter().extract(message)
+    if read is None:
+        return {"medicines": found, "tier": "rules_fallback", "confidence": score}
+
+    resolved: List[Dict[str, Any]] = []
+    seen = set()
+    for item in read:
+        hits = extract_medicines(item["name"], language)
+        if hits and hits[0]["name"] not in seen:
+            seen.add(hits[0]["name"])
+            resolved.append(dict(hits[0], match="llm", term=item["name"], quantity=item["quantity"]))
+
+    # The model found nothing the catalog knows: keep what the rules had
+    if not resolved:
+        return {"medicines": found, "tier": "rules", "confidence": score}
+    return {"medicines": resolved, "tier": "llm", "confidence": confidence(resolved)}
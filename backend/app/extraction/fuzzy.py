@@ -0,0 +1,97 @@
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, NamedTuple
+
+"""
+Typo-Tolerant Lookup (trigram index)
+
+Purpose:
+- Ranked fuzzy matches for misspelled medicine names / aliases
+  ("amoxicilin", "paracetamole")
+- Score: Dice coefficient over padded character trigrams (0..1)
+- Prefix filtering: only terms sharing one of the query's RAREST trigrams
+  are scored, so lookups stay sub-millisecond on large catalogs
+
+Immutable once built; rebuilt with the alias matcher (app/extraction/registry.py).
+"""
+
+DEFAULT_MIN_SCORE = 0.6
+
+
+class FuzzyMatch(NamedTuple):
+    score: float
+    term: str
+    payload: Any
+
+
+def normalize_medicine_name(text: str) -> str:
+    """Lower-case, strength units (500mg, 5 ml, ...) removed, whitespace collapsed"""
+    if not text:
+        return ""
+    t = text.lower().strip()
+    t = re.sub(r"\b\d+\s*mg\b", "", t)
+    t = re.sub(r"\b\d+\s*mcg\b", "", t)
+    t = re.sub(r"\b\d+\s*ml\b", "", t)
+    t = re.sub(r"\s+", " ", t)
+    return t.strip()
+
+
+def trigrams(term: str) -> FrozenSet[str]:
+    padded = f"  {term} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    def __init__(self, entries: Dict[str, Any]):
+        self._terms: List[str] = []
+        self._payloads: List[Any] = []
+        self._grams: List[FrozenSet[str]] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+        for term, payload in entries.items():
+            term_id = len(self._terms)
+            grams = trigrams(term)
+            self._terms.append(term)
+            self._payloads.append(payload)
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings[gram].append(term_id)
+
+        self._postings = dict(self._postings)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def search(self, query: str, limit: int = 3, min_score: float = DEFAULT_MIN_SCORE) -> List[FuzzyMatch]:
+        """Best matches for `query`, highest score first"""
+        grams = trigrams(query.lower())
+        if not grams:
+            return []
+
+        # Dice >= s needs at least s*|q|/(2-s) shared trigrams, so every
+        # hit contains one of the (|q| - that + 1) rarest query trigrams
+        min_shared = math.ceil(min_score * len(grams) / (2 - min_score))
+        by_rarity = sorted(grams, key=lambda g: len(self._postings.get(g, ())))
+        prefix = by_rarity[:max(1, len(grams) - min_shared + 1)]
+
+        candidates = set()
+        for gram in prefix:
+            candidates.update(self._postings.get(gram, ()))
+
+        scored = []
+        for term_id in candidates:
+            shared = len(grams & self._grams[term_id])
+            score = 2 * shared / (len(grams) + len(self._grams[term_id]))
+            if score >= min_score:
+                scored.append((score, term_id))
+
+        return [
+            FuzzyMatch(round(score, 3), self._terms[term_id], self._payloads[term_id])
+            for score, term_id in heapq.nlargest(limit, scored)
+        ]
+
+    def best(self, query: str, min_score: float = DEFAULT_MIN_SCORE):
+        hits = self.search(query, limit=1, min_score=min_score)
+        return hits[0] if hits else None
@@ -0,0 +1,77 @@
+import re
+import unicodedata
+from typing import Callable, NamedTuple, Pattern
+
+"""
+Extraction Language Rules
+
+Purpose:
+- How each customer language (Customer.preferred_language) is tokenized
+  before alias matching; aliases and messages go through the same normalize
+- en: lower-case
+- es: lower-case and strip accents ("acetaminofén" == "acetaminofen")
+- zh: NFKC (full-width digits / letters → ASCII) and lower-case; no spaces
+  between words, so aliases match anywhere in the text and the trigram
+  typo pass is skipped
+- Quantity words per language ("3 pastillas", "3片")
+
+Languages without rules here are handled as English.
+"""
+
+DEFAULT_LANGUAGE = "en"
+
+
+class LanguageRules(NamedTuple):
+    normalize: Callable[[str], str]
+    word_boundaries: bool
+    fuzzy: bool
+    quantity: Pattern
+
+
+def _lower(text: str) -> str:
+    return text.lower()
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _fold_width(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+LANGUAGES = {
+    "en": LanguageRules(
+        normalize=_lower,
+        word_boundaries=True,
+        fuzzy=True,
+        quantity=re.compile(r"\b(\d+)\s*(?:pills?|units?|tablets?|caps?|x|dosages?|bottles?)", re.IGNORECASE),
+    ),
+    "es": LanguageRules(
+        normalize=_strip_accents,
+        word_boundaries=True,
+        fuzzy=True,
+        quantity=re.compile(
+            r"\b(\d+)\s*(?:pastillas?|tabletas?|capsulas?|comprimidos?|unidades?|cajas?|frascos?"
+            r"|pills?|units?|tablets?|caps?|x)",
+            re.IGNORECASE,
+        ),
+    ),
+    "zh": LanguageRules(
+        normalize=_fold_width,
+        word_boundaries=False,
+        fuzzy=False,
+        quantity=re.compile(r"(\d+)\s*(?:片|粒|盒|瓶|包|个|pills?|tablets?|x)", re.IGNORECASE),
+    ),
+}
+
+
+def resolve_language(language) -> str:
+    """Supported language code for a customer preference (None / unknown → en)"""
+    code = (language or DEFAULT_LANGUAGE).lower().split("-")[0]
+    return code if code in LANGUAGES else DEFAULT_LANGUAGE
+
+
+def rules_for(language: str) -> LanguageRules:
+    return LANGUAGES[resolve_language(language)]
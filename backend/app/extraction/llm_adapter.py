@@ -0,0 +1,247 @@
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    LLM_BATCH_MAX,
+    LLM_BATCH_WINDOW_MS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+    LLM_CACHE_SIZE,
+    LLM_TIMEOUT_MS,
+    OLLAMA_MODEL,
+    OLLAMA_URL,
+)
+from app.extraction.cache import LRUCache, normalize_message
+from app.observability.metrics import LLM_BATCH_DURATION, LLM_CALLS, timed
+
+"""
+LLM Extraction Adapter (Ollama)
+
+Purpose:
+- Slow path for messages the rule extractor is not confident about
+- Micro-batching: prompts arriving within LLM_BATCH_WINDOW_MS of each other
+  go out as ONE /api/generate call (numbered messages in, JSON results out)
+- Every prompt is bounded by LLM_TIMEOUT_MS, queueing included
+- Responses cached per normalized message
+- Circuit breaker: after LLM_BREAKER_FAILURES consecutive failures callers
+  get None immediately (→ rule result) until a probe succeeds
+
+extract() never raises: None means "no LLM answer, use the rules".
+
+Lives here rather than app/config/llm_adapter.py: app/config.py shadows
+the app/config/ package.
+"""
+
+PROMPT = """You extract pharmacy orders from customer messages.
+For each numbered message list the medicines it asks for and the quantity (null if not stated).
+Reply with JSON only: {{"results": [{{"id": 1, "medicines": [{{"name": "...", "quantity": 2}}]}}]}}
+
+Messages:
+{messages}
+"""
+
+
+class CircuitBreaker:
+    """closed → (N consecutive failures) → open → (reset timeout) → half_open → one probe"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class LLMAdapter:
+    def __init__(
+        self,
+        url: str = OLLAMA_URL,
+        model: str = OLLAMA_MODEL,
+        timeout_ms: int = LLM_TIMEOUT_MS,
+        batch_window_ms: int = LLM_BATCH_WINDOW_MS,
+        batch_max: int = LLM_BATCH_MAX,
+        cache_size: int = LLM_CACHE_SIZE,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.url = url.rstrip("/") + "/api/generate"
+        self.model = model
+        self.timeout = timeout_ms / 1000
+        self.batch_window = batch_window_ms / 1000
+        self.batch_max = batch_max
+        self.breaker = breaker or CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)
+        self.cache = LRUCache(cache_size)
+        self.calls = 0
+
+        self._pending: List[tuple] = []
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    # -------------------------
+    # Caller side
+    # -------------------------
+
+    def extract(self, message: str) -> Optional[List[Dict[str, Any]]]:
+        """[{name, quantity}] as the model read them, or None (rules only)"""
+        text = normalize_message(message)
+
+        cached = self.cache.get(text)
+        if cached is not None:
+            LLM_CALLS.inc(outcome="cached")
+            return cached
+
+        if not self.breaker.allow():
+            LLM_CALLS.inc(outcome="short_circuit")
+            return None
+
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((text, future))
+            self._ensure_worker()
+            self._cond.notify()
+
+        try:
+            medicines = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            LLM_CALLS.inc(outcome="timeout")
+            return None
+        except Exception:
+            LLM_CALLS.inc(outcome="error")
+            return None
+
+        self.cache.put(text, medicines)
+        LLM_CALLS.inc(outcome="ok")
+        return medicines
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+            self._worker.start()
+
+    # -------------------------
+    # Batching worker
+    # -------------------------
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+                # Hold the window open for stragglers, unless the batch is full
+                deadline = time.monotonic() + self.batch_window
+                while len(self._pending) < self.batch_max:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.batch_max]
+                del self._pending[:self.batch_max]
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[tuple]) -> None:
+        # Identical messages in one window share a slot in the prompt
+        messages = list(dict.fromkeys(text for text, _ in batch))
+
+        try:
+            with timed(LLM_BATCH_DURATION):
+                results = self._call(messages)
+        except Exception as exc:
+            self.breaker.record_failure()
+            print(f"⚠️ LLM extraction failed for {len(messages)} message(s): {exc}")
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+
+        self.breaker.record_success()
+        for text, future in batch:
+            future.set_result(results[messages.index(text)])
+
+    def _call(self, messages: List[str]) -> List[List[Dict[str, Any]]]:
+        self.calls += 1
+        numbered = "\n".join(f"{i}. {text}" for i, text in enumerate(messages, 1))
+        body = json.dumps({
+            "model": self.model,
+            "prompt": PROMPT.format(messages=numbered),
+            "format": "json",
+            "stream": False,
+            "options": {"temperature": 0},
+        }).encode()
+
+        request = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            reply = json.loads(json.loads(response.read())["response"])
+
+        by_id = {
+            str(item.get("id")): item.get("medicines") or []
+            for item in reply.get("results", [])
+            if isinstance(item, dict)
+        }
+        return [_clean(by_id.get(str(i), [])) for i in range(1, len(messages) + 1)]
+
+
+def _clean(medicines: List[Any]) -> List[Dict[str, Any]]:
+    """Keep well-formed entries only; the model's output is not trusted"""
+    cleaned = []
+    for medicine in medicines:
+        if not isinstance(medicine, dict) or not isinstance(medicine.get("name"), str):
+            continue
+        quantity = medicine.get("quantity")
+        cleaned.append({
+            "name": medicine["name"].strip(),
+            "quantity": quantity if isinstance(quantity, int) and quantity > 0 else None,
+        })
+    return cleaned
+
+
+_adapter: Optional[LLMAdapter] = None
+_adapter_lock = threading.Lock()
+
+
+def get_llm_adapter() -> LLMAdapter:
+    global _adapter
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                _adapter = LLMAdapter()
+    return _adapter
@@ -0,0 +1,138 @@
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple
+
+"""
+Alias Matcher (Aho-Corasick)
+
+Purpose:
+- Find every alias in a message in ONE left-to-right pass, however many
+  aliases there are (cost depends on message length, not alias count)
+- Word boundaries: "cipro" does not fire inside "ciprofloxacin",
+  "aspirin" does not fire inside "xaspirin"
+- Leftmost-longest: overlapping hits resolve to the longest alias
+- One result per canonical medicine, in the order they appear
+
+The automaton is immutable once built; share one instance across threads.
+"""
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    keyword: str
+    payload: Any
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Dict[str, Any]):
+        # Trie: node → {char: child}; node 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (keyword, payload) pairs ending at each node, incl. via fail links
+        self._out: List[List[tuple]] = [[]]
+        self._size = 0
+
+        for keyword, payload in patterns.items():
+            if not keyword:
+                continue
+            node = 0
+            for char in keyword:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].append((keyword, payload))
+            self._size += 1
+
+        self._build_fail_links()
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def iter_matches(self, text: str) -> Iterator[Match]:
+        """Every (possibly overlapping) occurrence of every pattern"""
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for keyword, payload in self._out[node]:
+                yield Match(index + 1 - len(keyword), index + 1, keyword, payload)
+
+
+def _at_boundary(text: str, match: Match) -> bool:
+    before = text[match.start - 1] if match.start > 0 else " "
+    after = text[match.end] if match.end < len(text) else " "
+    return not before.isalnum() and not after.isalnum()
+
+
+def leftmost_longest(text: str, matches: Iterator[Match], word_boundaries: bool = True) -> List[Match]:
+    """Non-overlapping matches, preferring the earliest start, then the longest"""
+    candidates = [m for m in matches if not word_boundaries or _at_boundary(text, m)]
+    candidates.sort(key=lambda m: (m.start, -(m.end - m.start)))
+
+    chosen: List[Match] = []
+    last_end = 0
+    for match in candidates:
+        if match.start >= last_end:
+            chosen.append(match)
+            last_end = match.end
+    return chosen
+
+
+class AliasMatcher:
+    """
+    Alias table (keyword → details with a canonical "name") compiled once.
+    `normalize` is applied to aliases here and to messages by the caller
+    (language rules, app/extraction/languages.py).
+    """
+
+    def __init__(
+        self,
+        aliases: Dict[str, Dict[str, Any]],
+        normalize: Callable[[str], str] = str.lower,
+        word_boundaries: bool = True,
+    ):
+        self.normalize = normalize
+        self.word_boundaries = word_boundaries
+        self._automaton = AhoCorasick({normalize(k): v for k, v in aliases.items()})
+
+    def __len__(self) -> int:
+        return len(self._automaton)
+
+    def find(self, text: str) -> List[Match]:
+        """Leftmost-longest alias hits in already normalized text"""
+        return leftmost_longest(text, self._automaton.iter_matches(text), self.word_boundaries)
+
+    def match(self, message: str) -> List[Dict[str, Any]]:
+        """Alias details found in `message`, one per canonical medicine"""
+        text = self.normalize(message)
+        found: List[Dict[str, Any]] = []
+        seen = set()
+
+        for hit in self.find(text):
+            name = hit.payload["name"]
+            if name not in seen:
+                seen.add(name)
+                found.append(hit.payload)
+
+        return found
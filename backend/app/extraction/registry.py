@@ -0,0 +1,169 @@
+import re
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.config import ALIAS_RELOAD_INTERVAL_SECONDS
+from app.db.database import SessionLocal
+from app.db.models import Medicine, MedicineAlias
+from app.db.versions import ALIASES, get_version
+from app.extraction.aliases import builtin_aliases
+from app.extraction.fuzzy import TrigramIndex, normalize_medicine_name
+from app.extraction.languages import DEFAULT_LANGUAGE, resolve_language, rules_for
+from app.extraction.matcher import AliasMatcher
+
+"""
+Alias Matcher Registry
+
+Purpose:
+- Compile the medicine_aliases table into one AliasMatcher per customer
+  language, plus a trigram index over aliases and catalog names
+- Per language: English aliases plus that language's own, tokenized by its
+  rules (app/extraction/languages.py). Built lazily the first time a
+  customer of that language writes in, then cached; English is built on
+  app startup via warm_up. English requests never pay for other languages.
+- Hot reload: at most every ALIAS_RELOAD_INTERVAL_SECONDS a caller checks
+  the "aliases" data version; if it moved, every language's indexes are
+  dropped and rebuilt on next use. Requests in flight keep the ones they
+  started with.
+- Falls back to the built-in tables (aliases.py) while medicine_aliases is empty
+"""
+
+
+class LoadedMatcher(NamedTuple):
+    matcher: AliasMatcher
+    fuzzy: TrigramIndex
+    version: int
+    build_ms: float
+    language: str = DEFAULT_LANGUAGE
+
+
+# language → indexes for _version; replaced (never mutated) under _lock
+_loaded: Dict[str, LoadedMatcher] = {}
+_version: Optional[int] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def load_aliases(db, language: str = DEFAULT_LANGUAGE) -> Dict[str, Dict[str, Any]]:
+    """
+    medicine_aliases joined to Medicine, as alias → details: English rows
+    plus `language` rows (which win on a clash)
+    """
+    languages = {DEFAULT_LANGUAGE, language}
+    rows = (
+        db.query(MedicineAlias, Medicine)
+        .join(Medicine, MedicineAlias.medicine_id == Medicine.id)
+        .filter(MedicineAlias.language.in_(languages))
+        .all()
+    )
+    rows.sort(key=lambda row: row[0].language != DEFAULT_LANGUAGE)
+    return {
+        alias.alias.lower(): {
+            "name": medicine.name,
+            "medicine_id": medicine.id,
+            "dosage": alias.default_dosage,
+            "otc": (
+                alias.otc_hint
+                if alias.otc_hint is not None
+                else not medicine.prescription_required
+            ),
+        }
+        for alias, medicine in rows
+    }
+
+
+def load_medicine_names(db) -> Dict[str, Dict[str, Any]]:
+    """Catalog names without strength ("paracetamol"), as name → details"""
+    names = {}
+    for medicine in db.query(Medicine).all():
+        strength = re.search(r"\d+\s*(?:mg|mcg|ml)\b", medicine.name.lower())
+        names[normalize_medicine_name(medicine.name)] = {
+            "name": medicine.name,
+            "medicine_id": medicine.id,
+            "dosage": strength.group().replace(" ", "") if strength else None,
+            "otc": not medicine.prescription_required,
+        }
+    return names
+
+
+def _check(force: bool = False) -> None:
+    """Forget every language's indexes if the alias catalog version moved"""
+    global _loaded, _version, _checked_at
+
+    with _lock:
+        # Another thread may have checked while we waited for the lock
+        if not force and _version is not None and time.monotonic() - _checked_at < ALIAS_RELOAD_INTERVAL_SECONDS:
+            return
+
+        db = SessionLocal()
+        try:
+            version = get_version(db, ALIASES)
+        finally:
+            db.close()
+
+        if force or version != _version:
+            _loaded = {}
+            _version = version
+        _checked_at = time.monotonic()
+
+
+def _build(language: str) -> LoadedMatcher:
+    global _loaded
+
+    with _lock:
+        loaded = _loaded.get(language)
+        if loaded is not None:
+            return loaded
+
+        rules = rules_for(language)
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            aliases = load_aliases(db, language) or builtin_aliases(language)
+            matcher = AliasMatcher(aliases, rules.normalize, rules.word_boundaries)
+            fuzzy = TrigramIndex({
+                **load_medicine_names(db),
+                **{rules.normalize(alias): details for alias, details in aliases.items()},
+            })
+            build_ms = round((time.perf_counter() - started) * 1000, 2)
+        finally:
+            db.close()
+
+        # Atomic swap: readers see the old or the new mapping, never half
+        loaded = LoadedMatcher(matcher, fuzzy, _version, build_ms, language)
+        _loaded = {**_loaded, language: loaded}
+        if _version or language != DEFAULT_LANGUAGE:
+            print(f"🔤 Alias matcher ({language}) built for catalog v{_version} in {build_ms}ms")
+        return loaded
+
+
+def current(language: str = DEFAULT_LANGUAGE) -> LoadedMatcher:
+    """The live indexes for a customer language and the catalog version they were built from"""
+    if _version is None or time.monotonic() - _checked_at >= ALIAS_RELOAD_INTERVAL_SECONDS:
+        _check()
+    code = resolve_language(language)
+    return _loaded.get(code) or _build(code)
+
+
+def built_languages():
+    return sorted(_loaded)
+
+
+def get_alias_matcher(language: str = DEFAULT_LANGUAGE) -> AliasMatcher:
+    return current(language).matcher
+
+
+def get_fuzzy_index(language: str = DEFAULT_LANGUAGE) -> TrigramIndex:
+    return current(language).fuzzy
+
+
+def reload() -> LoadedMatcher:
+    """Rebuild now (admin alias edits in this worker; others follow on their next check)"""
+    _check(force=True)
+    return current()
+
+
+def warm_up() -> float:
+    """Build the English matcher up front; returns the build time in milliseconds"""
+    return current().build_ms
@@ -0,0 +1,129 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import insert
+
+from app.audit.trace_writer import trace_writer
+from app.config import CHAT_BATCH_CONCURRENCY
+from app.db.database import SessionLocal, write_lock
+from app.db.models import Customer
+from app.db.unit_of_work import async_request_scope
+from app.graph.pharmacy_workflow import arun_workflow, trace_records
+from app.observability.metrics import TRACE_PERSIST_DURATION, timed
+
+"""
+Batch Workflow Runner
+
+Purpose:
+- Replay queued SMS / chat backlogs through the compiled graph
+- Bounded concurrency across customers (CHAT_BATCH_CONCURRENCY)
+- Messages from the SAME customer run strictly in order, so inventory
+  decrements happen in the order the customer sent them
+- Customers are loaded once for the whole batch (the catalog comes from
+  the process-wide index, app/db/catalog.py)
+- All decision traces are written with one bulk insert at the end
+  (or handed to the trace write-behind queue when it is running)
+
+Each message still gets its own unit of work (order + stock commit), so a
+failure in one message never rolls back another. The order writes themselves
+are short and serialized (RequestScope.write), so parallel queues never race
+SQLite's single writer. A crashed item is logged here; the caller only gets
+WORKFLOW_FAILED back, never the exception text.
+"""
+
+
+# A finished item: (final_state, error). Exactly one of them is set.
+BatchResult = Tuple[Optional[Dict[str, Any]], Optional[str]]
+
+CUSTOMER_NOT_FOUND = "Customer not found"
+WORKFLOW_FAILED = "Request could not be processed"
+
+
+def _load_customers(customer_ids: List[int]) -> Dict[int, Customer]:
+    """One query for every customer in the batch"""
+    db = SessionLocal()
+    try:
+        customers = (
+            db.query(Customer)
+            .filter(Customer.id.in_(customer_ids))
+            .all()
+        )
+        return {c.id: c for c in customers}
+    finally:
+        # Rows stay loaded but detached; each item scope merges them in
+        db.close()
+
+
+def _bulk_insert_traces(model: Type, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    if trace_writer.running:
+        trace_writer.enqueue(rows, model)
+        return
+    db = SessionLocal()
+    try:
+        with timed(TRACE_PERSIST_DURATION), write_lock:
+            db.execute(insert(model), rows)
+            db.commit()
+    finally:
+        db.close()
+
+
+async def arun_workflow_batch(items: List[Tuple[int, str]]) -> List[BatchResult]:
+    """
+    Run many (customer_id, message) pairs; results come back in input order.
+    """
+    customers = await asyncio.to_thread(
+        _load_customers, sorted({cid for cid, _ in items})
+    )
+
+    results: List[Optional[BatchResult]] = [None] * len(items)
+    traces: Dict[int, Tuple[Type, List[Dict[str, Any]]]] = {}
+    limiter = asyncio.Semaphore(CHAT_BATCH_CONCURRENCY)
+
+    # Per-customer queues, in first-seen order
+    queues: "OrderedDict[int, List[int]]" = OrderedDict()
+    for index, (customer_id, _) in enumerate(items):
+        queues.setdefault(customer_id, []).append(index)
+
+    async def run_one(index: int) -> None:
+        customer_id, message = items[index]
+        customer = customers.get(customer_id)
+
+        if customer is None:
+            results[index] = (None, CUSTOMER_NOT_FOUND)
+            return
+
+        try:
+            async with async_request_scope(customers=[customer]):
+                final_state = await arun_workflow(
+                    customer_id=customer_id,
+                    message=message,
+                    persist_traces=False,
+                )
+        except Exception as e:
+            print(f"❌ Batch item {index} (customer {customer_id}) failed: {e!r}")
+            results[index] = (None, WORKFLOW_FAILED)
+            return
+
+        results[index] = (final_state, None)
+        traces[index] = trace_records(str(uuid.uuid4()), final_state)
+
+    async def run_customer(indexes: List[int]) -> None:
+        # Same customer → strictly sequential
+        for index in indexes:
+            async with limiter:
+                await run_one(index)
+
+    await asyncio.gather(*(run_customer(indexes) for indexes in queues.values()))
+
+    # Traces in input order, one multi-row insert for the whole batch
+    # (every run uses the same TRACE_STORAGE_FORMAT, hence the same model)
+    if traces:
+        model = next(iter(traces.values()))[0]
+        rows = [row for index in sorted(traces) for row in traces[index][1]]
+        await asyncio.to_thread(_bulk_insert_traces, model, rows)
+
+    return results
@@ -1,28 +1,81 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from app.graph.state import PharmacyState
 
 from app.agents.memory_agent import memory_agent
 from app.agents.conversation_agent import conversation_agent
 from app.agents.safety_agent import safety_agent
-from app.agents.action_agent import action_agent
+from app.agents.action_agent import action_agent, action_agent_async
 from app.agents.predictive_refill_agent import predictive_refill_agent
+from app.graph.instrumentation import instrumented, instrumented_async
+from app.graph.routing import (
+    CONTEXT_JOIN,
+    SHORT_CIRCUIT,
+    context_join,
+    route_after_action,
+    route_after_extraction,
+    route_after_safety,
+    short_circuit,
+)
+
+# Independent context branches. Parallel updates are merged in node
+# registration order (add_node below), which keeps decision_trace stable:
+# memory_agent, then conversation_agent
+PARALLEL_CONTEXT = ["memory_agent", "conversation_agent"]
 
 
 def build_pharmacy_graph():
     graph = StateGraph(PharmacyState)
 
-    graph.add_node("memory_agent", memory_agent)
-    graph.add_node("conversation_agent", conversation_agent)
-    graph.add_node("safety_agent", safety_agent)
-    graph.add_node("action_agent", action_agent)
-    graph.add_node("predictive_refill_agent", predictive_refill_agent)
+    # Every node is timed (duration, DB queries, rows read) — see
+    # app/graph/instrumentation.py
+    def add_node(name, func):
+        graph.add_node(name, instrumented(name, func))
+
+    add_node("memory_agent", memory_agent)
+    add_node("conversation_agent", conversation_agent)
+    add_node(CONTEXT_JOIN, context_join)
+    add_node("safety_agent", safety_agent)
+    # Sync + async implementations: graph.invoke uses the first,
+    # graph.ainvoke awaits the second (webhook on the server's loop)
+    graph.add_node(
+        "action_agent",
+        RunnableLambda(
+            instrumented("action_agent", action_agent),
+            afunc=instrumented_async("action_agent", action_agent_async),
+            name="action_agent",
+        ),
+    )
+    add_node("predictive_refill_agent", predictive_refill_agent)
+    add_node(SHORT_CIRCUIT, short_circuit)
+
+    # Fan-out: history lookup (DB) and extraction (CPU) are independent,
+    # so they run concurrently
+    for node in PARALLEL_CONTEXT:
+        graph.set_entry_point(node)
+
+    # Fan-in: wait for both; reducers on PharmacyState merge their updates
+    graph.add_edge(PARALLEL_CONTEXT, CONTEXT_JOIN)
 
-    graph.set_entry_point("memory_agent")
+    # Gates: nothing extracted / not approved → straight to the end
+    graph.add_conditional_edges(
+        CONTEXT_JOIN,
+        route_after_extraction,
+        {"safety_agent": "safety_agent", SHORT_CIRCUIT: SHORT_CIRCUIT},
+    )
+    graph.add_conditional_edges(
+        "safety_agent",
+        route_after_safety,
+        {"action_agent": "action_agent", SHORT_CIRCUIT: SHORT_CIRCUIT},
+    )
 
-    graph.add_edge("memory_agent", "conversation_agent")
-    graph.add_edge("conversation_agent", "safety_agent")
-    graph.add_edge("safety_agent", "action_agent")
-    graph.add_edge("action_agent", "predictive_refill_agent")
+    # No order placed (stock conflict) → nothing to predict a refill for
+    graph.add_conditional_edges(
+        "action_agent",
+        route_after_action,
+        {"predictive_refill_agent": "predictive_refill_agent", SHORT_CIRCUIT: SHORT_CIRCUIT},
+    )
     graph.add_edge("predictive_refill_agent", END)
+    graph.add_edge(SHORT_CIRCUIT, END)
 
     return graph.compile()
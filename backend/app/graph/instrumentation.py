@@ -0,0 +1,42 @@
+import functools
+from typing import Any, Awaitable, Callable, Dict
+
+from app.observability.metrics import node_timer
+
+"""
+Node Instrumentation
+
+Purpose:
+- Wrap every graph node with a timer + DB query / row counter
+- Feed the per-node Prometheus metrics (app/observability/metrics.py)
+- Attach the same numbers to the node's decision_trace entries as
+  `metrics`, so they land on each DecisionTrace row (duration_ms)
+"""
+
+NodeUpdate = Dict[str, Any]
+
+
+def _attach(update: NodeUpdate, measured: Dict[str, float]) -> NodeUpdate:
+    for entry in (update or {}).get("decision_trace", []):
+        entry["metrics"] = dict(measured)
+    return update
+
+
+def instrumented(node: str, func: Callable[[Dict[str, Any]], NodeUpdate]):
+    @functools.wraps(func)
+    def wrapper(state):
+        with node_timer(node) as measured:
+            update = func(state)
+        return _attach(update, measured)
+
+    return wrapper
+
+
+def instrumented_async(node: str, afunc: Callable[[Dict[str, Any]], Awaitable[NodeUpdate]]):
+    @functools.wraps(afunc)
+    async def wrapper(state):
+        with node_timer(node) as measured:
+            update = await afunc(state)
+        return _attach(update, measured)
+
+    return wrapper
@@ -1,18 +1,19 @@
+import asyncio
+import time
 import uuid
 import json
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Tuple, Type
 
-from langgraph.graph import StateGraph, END
+from app.graph.state import PharmacyState, apply_update
+from app.db.unit_of_work import request_scope, async_request_scope
+from app.config import TRACE_STORAGE_FORMAT
+from app.db.models import DecisionTrace, PackedDecisionTrace
+from app.audit.trace_codec import pack_record
+from app.audit.trace_writer import trace_writer
+from app.observability.metrics import REQUEST_DURATION, TRACE_PERSIST_DURATION, timed
 
-from app.graph.state import PharmacyState
-from app.db.database import SessionLocal
-from app.db.models import DecisionTrace
-
-from app.agents.memory_agent import memory_agent
-from app.agents.conversation_agent import conversation_agent
-from app.agents.safety_agent import safety_agent
-from app.agents.action_agent import action_agent
-from app.agents.predictive_refill_agent import predictive_refill_agent
+from app.graph.builder import build_pharmacy_graph  # noqa: F401 (re-export)
+from app.graph.registry import get_graph
 
 
 # -------------------------
@@ -29,28 +30,73 @@ def _safe_json(value):
     return json.dumps(value, default=str)
 
 
-# -------------------------
-# Graph Builder
-# -------------------------
+def _initial_state(customer_id: int, message: str) -> PharmacyState:
+    state: PharmacyState = {
+        "conversation": {"message": message},
+        "customer": {"id": customer_id},
+        "extraction": {},
+        "safety": {},
+        "execution": {},
+        "decision_trace": [],
+        "meta": {},
+    }
+
+    # HARD ASSERT — NON NEGOTIABLE
+    assert isinstance(state, dict), f"STATE CORRUPTED AT START: {type(state)}"
+    return state
 
-def build_pharmacy_graph():
-    graph = StateGraph(PharmacyState)
 
-    graph.add_node("memory_agent", memory_agent)
-    graph.add_node("conversation_agent", conversation_agent)
-    graph.add_node("safety_agent", safety_agent)
-    graph.add_node("action_agent", action_agent)
-    graph.add_node("predictive_refill_agent", predictive_refill_agent)
+def trace_rows(request_id: str, final_state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One DecisionTrace column mapping per agent step, ready to insert"""
+    # HARD ASSERT — NON NEGOTIABLE
+    assert isinstance(final_state, dict), f"STATE CORRUPTED AT END: {type(final_state)}"
+
+    return [
+        {
+            "request_id": request_id,
+            "agent_name": trace.get("agent"),
+            "input": _safe_json(trace.get("input")),
+            "reasoning": _safe_json(trace.get("reasoning")),
+            "decision": _safe_json(trace.get("decision")),
+            "output": _safe_json(trace.get("output")),
+            "duration_ms": (trace.get("metrics") or {}).get("duration_ms"),
+        }
+        for trace in final_state.get("decision_trace", [])
+    ]
+
+
+def trace_records(request_id: str, final_state: Dict[str, Any]) -> Tuple[Type, List[Dict[str, Any]]]:
+    """
+    (model, rows) to store for one run, in the configured TRACE_STORAGE_FORMAT:
+    one DecisionTrace row per agent, or one PackedDecisionTrace row per run.
+    """
+    if TRACE_STORAGE_FORMAT == "packed":
+        return PackedDecisionTrace, [
+            pack_record(request_id, final_state.get("decision_trace", []))
+        ]
+    return DecisionTrace, trace_rows(request_id, final_state)
+
+
+def _persist_traces(scope, request_id: str, final_state: Dict[str, Any]) -> None:
+    """
+    Handed to the write-behind queue when it is running (app startup);
+    otherwise written and committed here, in one short transaction on the
+    request's session (timed in pharmacy_trace_persist_duration_seconds).
+    """
+    model, rows = trace_records(request_id, final_state)
+
+    if trace_writer.running:
+        trace_writer.enqueue(rows, model)
+        return
 
-    graph.set_entry_point("memory_agent")
+    with timed(TRACE_PERSIST_DURATION), scope.write() as db:
+        db.add_all(model(**row) for row in rows)
 
-    graph.add_edge("memory_agent", "conversation_agent")
-    graph.add_edge("conversation_agent", "safety_agent")
-    graph.add_edge("safety_agent", "action_agent")
-    graph.add_edge("action_agent", "predictive_refill_agent")
-    graph.add_edge("predictive_refill_agent", END)
 
-    return graph.compile()
+def _observe_request(started: float, final_state: Dict[str, Any]) -> None:
+    """Request latency, labelled by the safety decision (or "none")"""
+    decision = (final_state.get("safety") or {}).get("decision") or "none"
+    REQUEST_DURATION.observe(time.perf_counter() - started, decision=decision)
 
 
 # -------------------------
@@ -58,53 +104,86 @@ def build_pharmacy_graph():
 # -------------------------
 
 def run_workflow(customer_id: int, message: str) -> Dict[str, Any]:
-    graph = build_pharmacy_graph()
-    db = SessionLocal()
+    # Compiled once per process — see app/graph/registry.py
+    graph = get_graph()
 
     request_id = str(uuid.uuid4())
+    state = _initial_state(customer_id, message)
+    started = time.perf_counter()
 
-    # ---- Initial State ----
-    state: PharmacyState = {
-        "conversation": {"message": message},
-        "customer": {"id": customer_id},
-        "extraction": {},
-        "safety": {},
-        "execution": {},
-        "decision_trace": [],
-        "meta": {},
-    }
+    try:
+        # One session for the whole turn: agents, order and traces share it
+        # (or it joins the caller's scope, e.g. /chat); the order and the
+        # traces are each committed in their own short transaction
+        with request_scope() as scope:
+            final_state = graph.invoke(state)
+            _persist_traces(scope, request_id, final_state)
+
+        _observe_request(started, final_state)
+        return final_state
 
-    # HARD ASSERT — NON NEGOTIABLE
-    assert isinstance(state, dict), f"STATE CORRUPTED AT START: {type(state)}"
+    except Exception as e:
+        raise RuntimeError(f"Workflow error: {str(e)}")
+
+
+async def arun_workflow(customer_id: int, message: str, persist_traces: bool = True) -> Dict[str, Any]:
+    """
+    Async twin of run_workflow() driven by graph.ainvoke.
+
+    Sync agent nodes run in the loop's executor; action_agent awaits the
+    warehouse webhook on the server's event loop.
+
+    persist_traces=False leaves trace persistence to the caller
+    (the batch runner bulk-inserts traces for many runs at once).
+    """
+    graph = get_graph()
+
+    request_id = str(uuid.uuid4())
+    state = _initial_state(customer_id, message)
+    started = time.perf_counter()
 
     try:
-        final_state = graph.invoke(state)
-
-        # HARD ASSERT — NON NEGOTIABLE
-        assert isinstance(final_state, dict), f"STATE CORRUPTED AT END: {type(final_state)}"
-
-        # -------------------------
-        # Persist Decision Traces
-        # -------------------------
-        traces = final_state.get("decision_trace", [])
-
-        for trace in traces:
-            trace_row = DecisionTrace(
-                request_id=request_id,
-                agent_name=trace.get("agent"),
-                input=_safe_json(trace.get("input")),
-                reasoning=_safe_json(trace.get("reasoning")),
-                decision=_safe_json(trace.get("decision")),
-                output=_safe_json(trace.get("output")),
-            )
-            db.add(trace_row)
-
-        db.commit()
+        async with async_request_scope() as scope:
+            final_state = await graph.ainvoke(state)
+            if persist_traces:
+                await asyncio.to_thread(_persist_traces, scope, request_id, final_state)
+
+        _observe_request(started, final_state)
         return final_state
 
     except Exception as e:
-        db.rollback()
         raise RuntimeError(f"Workflow error: {str(e)}")
 
-    finally:
-        db.close()
+
+async def astream_workflow(
+    customer_id: int, message: str
+) -> AsyncIterator[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """
+    Streaming twin of arun_workflow() driven by graph.astream.
+
+    Yields (node_name, node_update, state_so_far) as each node finishes.
+    The last yielded state is the final state; its traces are staged in the
+    active request scope once the graph completes.
+    """
+    graph = get_graph()
+
+    request_id = str(uuid.uuid4())
+    state = _initial_state(customer_id, message)
+    started = time.perf_counter()
+
+    try:
+        async with async_request_scope() as scope:
+            async for chunk in graph.astream(state):
+                # The client may read slowly: don't keep a pooled connection
+                # (or a read transaction) open while it does
+                await asyncio.to_thread(scope.release)
+                for node, update in chunk.items():
+                    apply_update(state, update or {})
+                    yield node, update or {}, state
+
+            await asyncio.to_thread(_persist_traces, scope, request_id, state)
+
+        _observe_request(started, state)
+
+    except Exception as e:
+        raise RuntimeError(f"Workflow error: {str(e)}")
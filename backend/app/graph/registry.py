@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from app.graph.builder import build_pharmacy_graph
+
+"""
+Compiled Graph Registry
+
+Purpose:
+- Build and compile each LangGraph workflow ONCE per process
+- Hand every request the same compiled graph (never mutated after build)
+- Record how long each build took, for startup logs and /health
+"""
+
+PHARMACY_GRAPH = "pharmacy"
+
+_BUILDERS: Dict[str, Callable[[], Any]] = {
+    PHARMACY_GRAPH: build_pharmacy_graph,
+}
+
+_compiled: Dict[str, Any] = {}
+_build_ms: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def get_graph(name: str = PHARMACY_GRAPH):
+    """
+    Return the compiled graph registered under `name`.
+
+    The first caller builds it; everyone after that gets the cached object.
+    """
+    graph = _compiled.get(name)
+    if graph is not None:
+        return graph
+
+    with _lock:
+        # Another thread may have finished the build while we waited
+        graph = _compiled.get(name)
+        if graph is None:
+            builder = _BUILDERS[name]
+
+            started = time.perf_counter()
+            graph = builder()
+            _build_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+
+            _compiled[name] = graph
+
+    return graph
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Build every registered graph up front (called on app startup).
+    Returns build durations in milliseconds, keyed by graph name.
+    """
+    for name in _BUILDERS:
+        get_graph(name)
+    return build_stats()
+
+
+def build_stats() -> Dict[str, float]:
+    """Build duration (ms) of every graph compiled so far."""
+    return dict(_build_ms)
@@ -0,0 +1,84 @@
+from typing import Any, Dict
+
+from app.graph.state import PharmacyState
+from app.agents.safety_agent import no_medicines_verdict
+
+"""
+Graph Routing
+
+Purpose:
+- Decide, after each gate, whether the rest of the chain has work to do
+- Small talk (nothing extracted) skips safety, action and refill prediction
+- Blocked / clarification turns skip action and refill prediction
+- Orders that could not be placed (stock conflict) skip refill prediction
+- Every skip is recorded in the decision trace by `short_circuit`
+
+`route_after_extraction` hangs off `context_join`, the fan-in point of
+the parallel memory / extraction branches.
+"""
+
+CONTEXT_JOIN = "context_join"
+SHORT_CIRCUIT = "short_circuit"
+
+# Nodes that run after each gate on the full path, in order
+_AFTER_EXTRACTION = ["safety_agent", "action_agent", "predictive_refill_agent"]
+_AFTER_SAFETY = ["action_agent", "predictive_refill_agent"]
+_AFTER_ACTION = ["predictive_refill_agent"]
+
+
+def context_join(state: PharmacyState) -> Dict[str, Any]:
+    """Fan-in barrier: all parallel context branches have merged by now"""
+    return {}
+
+
+def route_after_extraction(state: PharmacyState) -> str:
+    if state.get("extraction", {}).get("medicines"):
+        return "safety_agent"
+    return SHORT_CIRCUIT
+
+
+def route_after_safety(state: PharmacyState) -> str:
+    if state.get("safety", {}).get("approved"):
+        return "action_agent"
+    return SHORT_CIRCUIT
+
+
+def route_after_action(state: PharmacyState) -> str:
+    if state.get("execution", {}).get("order_id"):
+        return "predictive_refill_agent"
+    return SHORT_CIRCUIT
+
+
+def short_circuit(state: PharmacyState) -> Dict[str, Any]:
+    """
+    Terminal node for turns that have nothing left to do.
+    Fills in the verdict a skipped safety_agent would have produced and
+    records which nodes were skipped and why.
+    """
+    assert isinstance(state, dict), f"STATE CORRUPTED: {type(state)}"
+
+    update: Dict[str, Any] = {}
+    safety = state.get("safety")
+
+    if not safety:
+        # Nothing extracted — safety_agent never ran
+        safety = update["safety"] = no_medicines_verdict()
+        skipped = _AFTER_EXTRACTION
+        reason = "No medicines extracted"
+    elif any(step.get("agent") == "action_agent" for step in state.get("decision_trace", [])):
+        # action_agent ran but placed no order
+        skipped = _AFTER_ACTION
+        reason = "Order not placed"
+    else:
+        skipped = _AFTER_SAFETY
+        reason = f"Safety decision: {safety.get('decision', 'blocked')}"
+
+    update["decision_trace"] = [{
+        "agent": "router",
+        "input": {"decision": safety.get("decision")},
+        "reasoning": f"{reason} — skipping {', '.join(skipped)}",
+        "decision": "short_circuit",
+        "output": {"skipped": skipped},
+    }]
+
+    return update
@@ -1,4 +1,5 @@
-from typing import TypedDict, List, Dict, Any
+import operator
+from typing import Annotated, Callable, TypedDict, List, Dict, Any, get_type_hints
 
 class MedicineRequest(TypedDict):
     name: str
@@ -30,6 +31,16 @@ class PharmacyState(TypedDict):
     decision_trace: List[AgentDecision]
     meta: Dict[str, Any]
 
+
+def merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Reducer for `meta`: parallel nodes each contribute their own keys"""
+    return {**(left or {}), **(right or {})}
+
+
+# Nodes return PARTIAL updates (State -> Partial<State>).
+# Keys written by parallel branches carry a reducer so fan-in merges them:
+# - decision_trace: appended in node order
+# - meta: shallow dict merge
 class PharmacyState(TypedDict):
     conversation: Dict[str, str]   # INPUT ONLY
     customer: Dict[str, Any]
@@ -38,5 +49,21 @@ class PharmacyState(TypedDict):
     safety: Dict[str, Any]
     execution: Dict[str, Any]
 
-    decision_trace: List[Dict[str, Any]]
-    meta: Dict[str, Any]
\ No newline at end of file
+    decision_trace: Annotated[List[Dict[str, Any]], operator.add]
+    meta: Annotated[Dict[str, Any], merge_dicts]
+
+
+# key -> reducer, read from the Annotated fields above (the same ones the
+# graph uses), for code that folds node updates into a state by hand
+STATE_REDUCERS: Dict[str, Callable[[Any, Any], Any]] = {
+    key: hint.__metadata__[0]
+    for key, hint in get_type_hints(PharmacyState, include_extras=True).items()
+    if hasattr(hint, "__metadata__")
+}
+
+
+def apply_update(state: Dict[str, Any], update: Dict[str, Any]) -> None:
+    """Fold a node's partial update into `state` the way the graph does"""
+    for key, value in update.items():
+        reducer = STATE_REDUCERS.get(key)
+        state[key] = reducer(state[key], value) if reducer and key in state else value
@@ -2,6 +2,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.db.database import init_db
+from app.config import AUDIT_HASH_CHAIN, AUDIT_SIGNING_KEY, TRACE_WRITE_BEHIND
+from app.audit.trace_writer import trace_writer
+from app.audit.decision_logger import close_decision_log
+from app.graph.registry import warm_up, build_stats
+from app.extraction.registry import warm_up as warm_up_extraction
 from app.api.chat import router as chat_router
 from app.api.admin import router as admin_router
 from app.api.customers import router as customers_router
@@ -9,6 +14,8 @@ from app.api.medicines import router as medicines_router
 from app.api.orders import router as orders_router
 from app.api.decision_traces import router as decision_traces_router
 from app.api.refill_alerts import router as refill_alerts_router
+from app.api.metrics import router as metrics_router
+from app.api.medicine_aliases import router as medicine_aliases_router
 
 app = FastAPI(title="Agentic Pharmacy Backend")
 
@@ -24,8 +31,29 @@ app.add_middleware(
 
 @app.on_event("startup")
 def on_startup():
+    # Checkpoints signed with a well-known key would prove nothing
+    if AUDIT_HASH_CHAIN and not AUDIT_SIGNING_KEY:
+        raise RuntimeError("AUDIT_HASH_CHAIN is on but AUDIT_SIGNING_KEY is not set")
+
     init_db()
 
+    # Compile the workflow graphs once, before the first request arrives
+    build_ms = warm_up()
+    for name, ms in build_ms.items():
+        print(f"🧩 Graph '{name}' compiled in {ms}ms")
+    print(f"🔤 Alias matcher compiled in {warm_up_extraction()}ms")
+
+    # Decision traces are batched off the request path
+    if TRACE_WRITE_BEHIND:
+        trace_writer.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # Drain queued traces and sync the audit log before the process exits
+    trace_writer.stop()
+    close_decision_log()
+
 
 @app.get("/")
 def root():
@@ -34,7 +62,7 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "graph_build_ms": build_stats()}
 
 
 # Routers
@@ -42,6 +70,8 @@ app.include_router(chat_router)
 app.include_router(admin_router)
 app.include_router(customers_router)
 app.include_router(medicines_router)
+app.include_router(medicine_aliases_router)
 app.include_router(orders_router)
 app.include_router(decision_traces_router)
 app.include_router(refill_alerts_router)
+app.include_router(metrics_router)
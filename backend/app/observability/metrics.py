@@ -0,0 +1,239 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from app.db.base import Base
+from app.db.database import engine
+
+"""
+Metrics (Prometheus text format)
+
+Purpose:
+- Time every graph node, with the DB queries it issued and rows it read
+- Request latency histograms broken down by safety decision
+- Exposed at GET /metrics (app/api/metrics.py)
+
+No client library needed: counters and histograms are kept in-process
+and rendered in the Prometheus text exposition format (v0.0.4).
+"""
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[label]) for label in self.labels), 0)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {_num(value)}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values → [per-bucket counts..., +Inf count], sum
+        self._series: Dict[LabelValues, Tuple[list, list]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[label]) for label in self.labels)
+        with self._lock:
+            counts, total = self._series.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels[label]) for label in self.labels))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _num(bound)
+                    lines.append(
+                        f"{self.name}_bucket{_labels(self.labels + ('le',), key + (le,))} {cumulative}"
+                    )
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_num(total[0])}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return "\n".join(lines)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# -------------------------
+# Registry
+# -------------------------
+
+NODE_DURATION = Histogram(
+    "pharmacy_node_duration_seconds", "Wall time of each workflow graph node", ["node"]
+)
+NODE_DB_QUERIES = Counter(
+    "pharmacy_node_db_queries_total", "SQL statements issued by each graph node", ["node"]
+)
+NODE_ROWS_READ = Counter(
+    "pharmacy_node_db_rows_read_total", "ORM rows loaded by each graph node", ["node"]
+)
+REQUEST_DURATION = Histogram(
+    "pharmacy_request_duration_seconds", "End-to-end workflow latency by safety decision", ["decision"]
+)
+TRACE_PERSIST_DURATION = Histogram(
+    "pharmacy_trace_persist_duration_seconds", "Time spent writing decision traces"
+)
+TRACE_ROWS_DROPPED = Counter(
+    "pharmacy_trace_rows_dropped_total", "Decision trace rows lost to failed background flushes"
+)
+EXTRACTION_CACHE = Counter(
+    "pharmacy_extraction_cache_total", "Extraction cache lookups, by result (hit / miss)", ["result"]
+)
+VERDICT_CACHE = Counter(
+    "pharmacy_verdict_cache_total", "Safety verdict cache lookups, by result (hit / miss)", ["result"]
+)
+LLM_CALLS = Counter(
+    "pharmacy_llm_calls_total",
+    "LLM extraction prompts, by outcome (ok / cached / timeout / error / short_circuit)",
+    ["outcome"],
+)
+LLM_BATCH_DURATION = Histogram(
+    "pharmacy_llm_batch_duration_seconds", "Wall time of each batched LLM call"
+)
+WEBHOOKS = Counter(
+    "pharmacy_webhooks_total", "Warehouse webhooks triggered, by status", ["status"]
+)
+
+REGISTRY = [
+    NODE_DURATION,
+    NODE_DB_QUERIES,
+    NODE_ROWS_READ,
+    REQUEST_DURATION,
+    TRACE_PERSIST_DURATION,
+    TRACE_ROWS_DROPPED,
+    EXTRACTION_CACHE,
+    VERDICT_CACHE,
+    LLM_CALLS,
+    LLM_BATCH_DURATION,
+    WEBHOOKS,
+]
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# -------------------------
+# Per-node DB accounting
+# -------------------------
+
+class NodeStats:
+    __slots__ = ("queries", "rows")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+
+# Set by the node wrapper; each parallel branch runs in its own copied context
+_node_stats: contextvars.ContextVar[Optional[NodeStats]] = contextvars.ContextVar(
+    "node_stats", default=None
+)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    stats = _node_stats.get()
+    if stats is not None:
+        stats.queries += 1
+
+
+@event.listens_for(Base, "load", propagate=True)
+def _count_row_loaded(target, context):
+    stats = _node_stats.get()
+    if stats is not None:
+        stats.rows += 1
+
+
+@event.listens_for(Base, "refresh", propagate=True)
+def _count_row_refreshed(target, context, attrs):
+    stats = _node_stats.get()
+    if stats is not None:
+        stats.rows += 1
+
+
+@contextmanager
+def node_timer(node: str):
+    """
+    Measure one node execution. Yields a dict filled in on exit with
+    duration_ms, db_queries and rows_read.
+    """
+    stats = NodeStats()
+    token = _node_stats.set(stats)
+    result: Dict[str, float] = {}
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        elapsed = time.perf_counter() - started
+        _node_stats.reset(token)
+
+        NODE_DURATION.observe(elapsed, node=node)
+        NODE_DB_QUERIES.inc(stats.queries, node=node)
+        NODE_ROWS_READ.inc(stats.rows, node=node)
+
+        result.update({
+            "duration_ms": round(elapsed * 1000, 3),
+            "db_queries": stats.queries,
+            "rows_read": stats.rows,
+        })
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
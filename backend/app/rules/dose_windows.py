@@ -0,0 +1,161 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db.models import DoseBucket, Medicine, Order, OrderItem
+from app.db.versions import ORDERS, get_version
+from app.extraction.cache import LRUCache
+from app.rules.engine import MedicineRules, rules_for_name
+
+"""
+Rolling Dose Windows
+
+Purpose:
+- How much of each ingredient a customer bought in the last 24h / 7 days,
+  without scanning their order history
+- One row per (customer, ingredient, clock hour) in `dose_buckets`,
+  upserted in the same transaction as the order (record_doses)
+- A window total is a sum over at most 24 / 168 buckets, whatever the
+  length of the history; buckets older than a week are pruned on write
+- Totals are cached per (customer, orders version, hour): repeat turns cost
+  no query until the customer orders again or the clock hour changes
+
+Hour granularity: the window starts at the top of the hour, so it can
+reach up to 59 minutes further back than 24h / 7 days (errs towards
+blocking).
+
+Only our own orders are counted. The buckets are derived data:
+rebuild_dose_buckets() recomputes them from the orders of the last week.
+"""
+
+DAY = timedelta(hours=24)
+WEEK = timedelta(days=7)
+
+_UPSERT = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+_cache = LRUCache(4096)
+
+
+def _hour(moment: Optional[datetime] = None) -> datetime:
+    """UTC clock hour containing `moment` (naive, like the stored column)"""
+    moment = moment or datetime.utcnow()
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _window_starts(now: datetime) -> Tuple[datetime, datetime]:
+    hour = _hour(now)
+    return hour - DAY + timedelta(hours=1), hour - WEEK + timedelta(hours=1)
+
+
+def _dialect(db) -> str:
+    # Session or Connection
+    bind = db if hasattr(db, "dialect") else db.get_bind()
+    return bind.dialect.name
+
+
+def ingredient_mg(lines: Iterable[Tuple[MedicineRules, int]]) -> Dict[str, float]:
+    """Milligrams per ingredient for (rules, quantity) lines; quantity × strength"""
+    totals: Dict[str, float] = defaultdict(float)
+    for rules, quantity in lines:
+        if rules.cumulative:
+            totals[rules.ingredient] += quantity * rules.strength_mg
+    return dict(totals)
+
+
+def record_doses(db, customer_id: int, doses: Dict[str, float], at: Optional[datetime] = None) -> None:
+    """Add an order's doses to the customer's current hour buckets"""
+    if not doses:
+        return
+    hour = _hour(at)
+    rows = [
+        {"customer_id": customer_id, "ingredient": ingredient, "hour": hour, "mg": mg}
+        for ingredient, mg in doses.items()
+    ]
+
+    upsert = _UPSERT.get(_dialect(db))
+    if upsert is not None:
+        stmt = upsert(DoseBucket).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["customer_id", "ingredient", "hour"],
+            set_={"mg": DoseBucket.mg + stmt.excluded.mg},
+        ))
+    else:
+        for row in rows:
+            result = db.execute(
+                update(DoseBucket)
+                .where(
+                    DoseBucket.customer_id == customer_id,
+                    DoseBucket.ingredient == row["ingredient"],
+                    DoseBucket.hour == hour,
+                )
+                .values(mg=DoseBucket.mg + row["mg"])
+            )
+            if result.rowcount == 0:
+                db.execute(DoseBucket.__table__.insert().values(**row))
+
+    # Nothing older than the longest window is ever read again
+    db.execute(
+        delete(DoseBucket).where(
+            DoseBucket.customer_id == customer_id,
+            DoseBucket.hour < _window_starts(hour)[1],
+        )
+    )
+
+
+def window_totals(db, customer_id: int, versions: Optional[Dict[str, int]] = None,
+                  now: Optional[datetime] = None) -> Dict[str, Tuple[float, float]]:
+    """
+    ingredient → (mg bought in the last 24h, mg in the last 7 days).
+    `versions`: data versions already read this request (needs "orders").
+    """
+    version = (versions or {}).get(ORDERS)
+    if version is None:
+        version = get_version(db, ORDERS)
+    day_start, week_start = _window_starts(now or datetime.utcnow())
+
+    key = (customer_id, version, week_start)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    rows = db.execute(
+        select(
+            DoseBucket.ingredient,
+            func.sum(case((DoseBucket.hour >= day_start, DoseBucket.mg), else_=0)),
+            func.sum(DoseBucket.mg),
+        )
+        .where(DoseBucket.customer_id == customer_id, DoseBucket.hour >= week_start)
+        .group_by(DoseBucket.ingredient)
+    ).all()
+
+    totals = {ingredient: (day or 0.0, week or 0.0) for ingredient, day, week in rows}
+    _cache.put(key, totals)
+    return totals
+
+
+def rebuild_dose_buckets(db, now: Optional[datetime] = None) -> int:
+    """Recompute every bucket from the last week's orders. Returns rows written."""
+    now = now or datetime.utcnow()
+    db.execute(delete(DoseBucket))
+
+    rows = db.execute(
+        select(Order.customer_id, Order.created_at, OrderItem.quantity, Medicine.name)
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .join(Medicine, Medicine.id == OrderItem.medicine_id)
+        .where(Order.created_at >= now - WEEK)
+    ).all()
+
+    buckets: Dict[Tuple[int, datetime], Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for customer_id, created_at, quantity, name in rows:
+        for ingredient, mg in ingredient_mg([(rules_for_name(name), quantity)]).items():
+            buckets[(customer_id, _hour(created_at or now))][ingredient] += mg
+
+    for (customer_id, hour), doses in buckets.items():
+        record_doses(db, customer_id, doses, at=hour)
+    _cache.clear()
+    return sum(len(doses) for doses in buckets.values())
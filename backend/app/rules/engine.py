@@ -0,0 +1,210 @@
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.rules.safety_rules import DEFAULT_RULES, MEDICINE_RULES
+
+"""
+Safety Rule Engine
+
+Purpose:
+- Compile the declarative rule set (app/rules/safety_rules.py) against the
+  catalog index ONCE per catalog version: medicine id → MedicineRules
+- Evaluate a cart line with dictionary lookups only, so checking a cart
+  costs O(items) however many rules there are
+- Findings carry the exact violation / reasoning / clarification texts
+  safety_agent reports, in a fixed order per line:
+  blocked → quantity → stock → dosage → prescription
+- Cumulative 24h / 7 day limits are checked per ingredient over the whole
+  cart plus the customer's recent purchases (check_cumulative)
+
+RULES_VERSION fingerprints the rule set (changes whenever the policy does).
+"""
+
+
+class MedicineRules(NamedTuple):
+    max_qty_per_order: int
+    max_daily_mg: float
+    prescription_required: bool
+    blocked: bool
+    ingredient: Optional[str] = None    # longest MEDICINE_RULES key matched
+    strength_mg: int = 0                # per unit, from the catalog name
+    max_mg_24h: float = float("inf")
+    max_mg_7d: float = float("inf")
+
+    @property
+    def cumulative(self) -> bool:
+        """Purchases of this medicine count towards rolling-window limits"""
+        return bool(self.ingredient) and self.strength_mg > 0 and (
+            self.max_mg_24h != float("inf") or self.max_mg_7d != float("inf")
+        )
+
+
+class Finding(NamedTuple):
+    reasoning: str
+    error_type: Optional[str] = None    # VALIDATION / SAFETY when violated
+    violation: Optional[str] = None
+    question: Optional[str] = None      # clarification instead of a block
+
+
+def _fingerprint(*tables: Dict[str, Any]) -> str:
+    canonical = json.dumps(tables, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:12]
+
+
+RULES_VERSION = _fingerprint(DEFAULT_RULES, MEDICINE_RULES)
+
+# Longest key last, so it overrides broader ones field by field
+_PATTERNS = sorted(MEDICINE_RULES.items(), key=lambda item: len(item[0]))
+
+
+def rules_for_name(name: str, rx: bool = False) -> MedicineRules:
+    merged = dict(DEFAULT_RULES)
+    lowered = name.lower()
+    ingredient = None
+    for pattern, fields in _PATTERNS:
+        if pattern in lowered:
+            merged.update(fields)
+            ingredient = pattern
+    return MedicineRules(
+        max_qty_per_order=merged["max_qty_per_order"],
+        max_daily_mg=merged["max_daily_mg"],
+        prescription_required=rx or merged["prescription_required"],
+        blocked=merged["blocked"],
+        ingredient=ingredient,
+        strength_mg=dosage_value_mg(name),
+        max_mg_24h=merged["max_mg_24h"],
+        max_mg_7d=merged["max_mg_7d"],
+    )
+
+
+class CompiledRules:
+    """Per-medicine rule table for one catalog version"""
+
+    def __init__(self, catalog):
+        self.catalog_version = catalog.version
+        self.by_id: Dict[int, MedicineRules] = {
+            entry.id: rules_for_name(entry.name, entry.rx) for entry in catalog.entries
+        }
+
+    def get(self, entry) -> MedicineRules:
+        rules = self.by_id.get(entry.id)
+        return rules if rules is not None else rules_for_name(entry.name, entry.rx)
+
+    def check_line(self, entry, quantity: int, dosage: str, stock: int, prescription) -> List[Finding]:
+        """Every rule for one cart line, in report order"""
+        rules = self.get(entry)
+        findings: List[Finding] = []
+
+        if rules.blocked:
+            findings.append(Finding(
+                f"⛔ '{entry.name}' cannot be ordered through chat",
+                "SAFETY",
+                f"{entry.name} is not available for online orders",
+            ))
+
+        # Quantity rule
+        if quantity > rules.max_qty_per_order:
+            findings.append(Finding(
+                f"⚠️ Quantity {quantity} exceeds max limit of {rules.max_qty_per_order}",
+                "SAFETY",
+                f"Quantity {quantity} exceeds allowed limit ({rules.max_qty_per_order})",
+            ))
+
+        # Stock check (always required)
+        if stock < quantity:
+            findings.append(Finding(
+                f"❌ Stock insufficient: {stock} available, {quantity} requested",
+                "VALIDATION",
+                f"Insufficient stock for {entry.name} (available: {stock}, requested: {quantity})",
+            ))
+        else:
+            findings.append(Finding(f"✅ Stock available: {stock} units"))
+
+        # Max dosage: block above the safe limit, ask when dosage is missing
+        dosage_value = dosage_value_mg(dosage)
+        limit = rules.max_daily_mg
+        if dosage_value > 0 and limit != float("inf"):
+            if dosage_value > limit:
+                findings.append(Finding(
+                    f"⚠️ Dosage {dosage_value}mg exceeds safe daily limit of {limit}mg",
+                    "SAFETY",
+                    f"Dosage {dosage_value}mg exceeds safe daily limit ({limit}mg)",
+                ))
+            else:
+                findings.append(Finding(f"✅ Dosage {dosage_value}mg within safe limit ({limit}mg/day)"))
+        elif dosage_value == 0:
+            findings.append(Finding(
+                f"❓ Dosage not specified for {entry.name}",
+                question=f"How many mg per dose of {entry.name}? (e.g., 500mg)",
+            ))
+
+        # Prescription check — ONLY if required (OTC allowlist otherwise)
+        if rules.prescription_required:
+            if not prescription:
+                findings.append(Finding(
+                    f"❌ No valid prescription found for Rx medicine '{entry.name}'",
+                    "SAFETY",
+                    f"Valid prescription required for {entry.name}",
+                ))
+            else:
+                findings.append(Finding(f"✅ Valid prescription found for Rx medicine '{entry.name}'"))
+        else:
+            findings.append(Finding(
+                f"✅ '{entry.name}' is OTC — no prescription required (OTC allowlist)"
+            ))
+
+        return findings
+
+    def check_cumulative(self, rules: MedicineRules, cart_mg: float, history: Tuple[float, float]) -> List[Finding]:
+        """
+        Rolling-window limits for one ingredient: `cart_mg` across every
+        line in the cart, `history` = (mg bought in the last 24h, last 7 days)
+        """
+        findings: List[Finding] = []
+        for window, bought, limit in (
+            ("24h", history[0], rules.max_mg_24h),
+            ("7 days", history[1], rules.max_mg_7d),
+        ):
+            if limit == float("inf"):
+                continue
+            total = bought + cart_mg
+            if total > limit:
+                findings.append(Finding(
+                    f"⚠️ Cumulative {rules.ingredient}: {total:g}mg in {window} "
+                    f"({bought:g}mg already bought) exceeds limit of {limit:g}mg",
+                    "SAFETY",
+                    f"Cumulative {rules.ingredient} {total:g}mg in the last {window} exceeds limit ({limit:g}mg)",
+                ))
+            else:
+                findings.append(Finding(
+                    f"✅ Cumulative {rules.ingredient}: {total:g}mg in {window} within limit ({limit:g}mg)"
+                ))
+        return findings
+
+
+def dosage_value_mg(dosage: str) -> int:
+    """Numeric dosage from a string (e.g., '500mg' -> 500; missing -> 0)"""
+    if not dosage:
+        return 0
+    match = re.search(r"(\d+)", dosage)
+    return int(match.group(1)) if match else 0
+
+
+_compiled: Optional[CompiledRules] = None
+_lock = threading.Lock()
+
+
+def compiled_rules(catalog) -> CompiledRules:
+    """Rule tables for this catalog index, compiled once per catalog version"""
+    global _compiled
+
+    compiled = _compiled
+    if compiled is None or compiled.catalog_version != catalog.version:
+        with _lock:
+            if _compiled is None or _compiled.catalog_version != catalog.version:
+                _compiled = CompiledRules(catalog)
+            compiled = _compiled
+    return compiled
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.config import INTERACTIONS_FILE
+
+"""
+Drug–Drug Interaction Screening
+
+Purpose:
+- Check every cart item against the rest of the cart AND the customer's
+  active medications (recent orders, valid prescriptions)
+- Interaction pairs come from a local data file (rules/data/interactions.json)
+  keyed by ingredient; compiled once per catalog version into a bitset
+  matrix: medicine → bit, one int mask per medicine per severity
+- Screening a cart is a few AND operations per item: microseconds, cheap
+  enough for every chat turn
+- major: SAFETY violation (blocks); moderate: reasoning only
+
+INTERACTIONS_VERSION fingerprints the data file.
+"""
+
+MAJOR = "major"
+MODERATE = "moderate"
+SEVERITIES = (MAJOR, MODERATE)
+
+
+class InteractionHit(NamedTuple):
+    severity: str
+    medicine: str           # cart item
+    other: str              # cart item or active medication
+    note: str
+    active: bool            # `other` is an active medication, not in the cart
+
+
+def load_interactions(path: str = INTERACTIONS_FILE) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    pairs = data.get("interactions", [])
+    for pair in pairs:
+        if pair.get("severity") not in SEVERITIES:
+            raise ValueError(f"Unknown interaction severity: {pair}")
+    return pairs
+
+
+def _fingerprint(pairs: List[dict]) -> str:
+    return hashlib.sha256(json.dumps(pairs, sort_keys=True).encode()).hexdigest()[:12]
+
+
+INTERACTIONS = load_interactions()
+INTERACTIONS_VERSION = _fingerprint(INTERACTIONS)
+
+
+def _bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class InteractionMatrix:
+    """Symmetric interaction bitsets over one catalog version"""
+
+    def __init__(self, catalog, pairs: List[dict] = INTERACTIONS):
+        self.catalog_version = catalog.version
+        self.bit: Dict[int, int] = {}
+        self.names: List[str] = []
+        self.masks: Dict[str, List[int]] = {severity: [] for severity in SEVERITIES}
+        self.notes: Dict[Tuple[int, int], str] = {}
+
+        lowered = [(entry, entry.name.lower()) for entry in catalog.entries]
+        for pair in pairs:
+            side_a = [entry for entry, name in lowered if pair["a"] in name]
+            side_b = [entry for entry, name in lowered if pair["b"] in name]
+            for a in side_a:
+                for b in side_b:
+                    if a.id != b.id:
+                        self._link(a, b, pair["severity"], pair.get("note", ""))
+
+    def _index(self, entry) -> int:
+        index = self.bit.get(entry.id)
+        if index is None:
+            index = self.bit[entry.id] = len(self.names)
+            self.names.append(entry.name)
+            for masks in self.masks.values():
+                masks.append(0)
+        return index
+
+    def _link(self, a, b, severity: str, note: str) -> None:
+        i, j = self._index(a), self._index(b)
+        self.masks[severity][i] |= 1 << j
+        self.masks[severity][j] |= 1 << i
+        self.notes[(min(i, j), max(i, j))] = note
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _mask(self, medicine_ids: Iterable[int]) -> int:
+        mask = 0
+        for medicine_id in medicine_ids:
+            index = self.bit.get(medicine_id)
+            if index is not None:
+                mask |= 1 << index
+        return mask
+
+    def screen(self, cart_ids: List[int], active_ids: Iterable[int] = ()) -> List[InteractionHit]:
+        """Every interacting (cart, cart) and (cart, active) pair, each reported once"""
+        cart = [m for m in dict.fromkeys(cart_ids) if m in self.bit]
+        if not cart:
+            return []
+
+        cart_mask = self._mask(cart)
+        # A medication already in the cart is screened as a cart item
+        active_mask = self._mask(active_ids) & ~cart_mask
+
+        hits: List[InteractionHit] = []
+        remaining = cart_mask
+        for medicine_id in cart:
+            i = self.bit[medicine_id]
+            remaining &= ~(1 << i)  # cart pairs: only against later items
+            for severity in SEVERITIES:
+                row = self.masks[severity][i]
+                for j in _bits(row & remaining):
+                    hits.append(self._hit(severity, i, j, active=False))
+                for j in _bits(row & active_mask):
+                    hits.append(self._hit(severity, i, j, active=True))
+        return hits
+
+    def _hit(self, severity: str, i: int, j: int, active: bool) -> InteractionHit:
+        note = self.notes[(min(i, j), max(i, j))]
+        return InteractionHit(severity, self.names[i], self.names[j], note, active)
+
+
+_matrix: Optional[InteractionMatrix] = None
+_lock = threading.Lock()
+
+
+def interaction_matrix(catalog) -> InteractionMatrix:
+    """Bitsets for this catalog index, compiled once per catalog version"""
+    global _matrix
+
+    matrix = _matrix
+    if matrix is None or matrix.catalog_version != catalog.version:
+        with _lock:
+            if _matrix is None or _matrix.catalog_version != catalog.version:
+                _matrix = InteractionMatrix(catalog)
+            matrix = _matrix
+    return matrix
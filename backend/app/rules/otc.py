@@ -1,8 +0,0 @@
-OTC_MEDICINES = {
-    "paracetamol": {
-        "max_qty_per_order": 20
-    },
-    "ibuprofen": {
-        "max_qty_per_order": 15
-    }
-}
@@ -1,9 +1,49 @@
-MAX_QTY_PER_ORDER = 100
+from app.config import MAX_QTY_PER_ORDER
 
-PRESCRIPTION_REQUIRED = {
-    "Amoxicillin",
-    "Azithromycin",
-    "Ciprofloxacin"
+"""
+Safety Rule Set (declarative)
+
+Purpose:
+- The ONE place safety policy is written down; compiled per catalog into
+  per-medicine lookup tables by app/rules/engine.py
+- DEFAULT_RULES apply to every medicine; MEDICINE_RULES entries apply to
+  catalog medicines whose lower-cased name contains the key (the longest
+  matching key wins field by field)
+
+Fields:
+- max_qty_per_order:     units per order line
+- max_daily_mg:          safe daily dose (mg/day); no entry = no known limit
+- max_mg_24h / max_mg_7d: cumulative amount of the ingredient a customer may
+                         buy in any 24h / 7 day window, this cart included
+                         (quantity × strength; app/rules/dose_windows.py)
+- prescription_required: Rx even if the catalog row says OTC
+- blocked:               never sold through chat ordering
+"""
+
+DEFAULT_RULES = {
+    "max_qty_per_order": MAX_QTY_PER_ORDER,
+    "max_daily_mg": float("inf"),
+    "max_mg_24h": float("inf"),
+    "max_mg_7d": float("inf"),
+    "prescription_required": False,
+    "blocked": False,
 }
 
-BLOCKED_MEDICINES = set()
+MEDICINE_RULES = {
+    # OTC per-order caps
+    "paracetamol": {
+        "max_qty_per_order": 20, "max_daily_mg": 4000,
+        "max_mg_24h": 10000, "max_mg_7d": 40000,
+    },
+    "ibuprofen": {
+        "max_qty_per_order": 15, "max_daily_mg": 3200,
+        "max_mg_24h": 6000, "max_mg_7d": 24000,
+    },
+
+    "aspirin": {"max_daily_mg": 4000},
+
+    # Prescription-only whatever the catalog says
+    "amoxicillin": {"max_daily_mg": 3000, "prescription_required": True},
+    "azithromycin": {"prescription_required": True},
+    "ciprofloxacin": {"max_daily_mg": 1500, "prescription_required": True},
+}
@@ -0,0 +1,85 @@
+import copy
+import hashlib
+import json
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from app.config import VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL_SECONDS
+from app.db.versions import ALIASES, CATALOG, INVENTORY, ORDERS, PRESCRIPTIONS, get_versions
+from app.extraction.cache import LRUCache
+from app.observability.metrics import VERDICT_CACHE
+from app.rules.engine import RULES_VERSION
+from app.rules.interactions import INTERACTIONS_VERSION
+
+"""
+Safety Verdict Cache
+
+Purpose:
+- A retry after a timeout, or a re-ask after a clarification, sends the same
+  cart again; answer it without re-running stock / prescription checks
+- Key: customer id, canonical cart hash, and every version a verdict
+  depends on (inventory, prescriptions, orders, catalog, aliases, rule set,
+  interaction table).
+  Any relevant write moves a version, so stale verdicts are never served.
+- Short TTL (VERDICT_CACHE_TTL_SECONDS) on top, as a backstop
+- ONLY non-approving verdicts are stored: an approval always re-checks
+  stock, so the cache can never let an order through
+"""
+
+DEPENDS_ON = (INVENTORY, PRESCRIPTIONS, ORDERS, CATALOG, ALIASES)
+
+
+def cart_hash(medicines: List[Dict[str, Any]]) -> str:
+    """Order-independent fingerprint of the requested lines"""
+    lines = sorted(
+        (str(item.get("name", "")).lower(), item.get("quantity"), item.get("dosage") or "")
+        for item in medicines
+    )
+    return hashlib.sha256(json.dumps(lines, default=str).encode()).hexdigest()
+
+
+def verdict_key(db, customer_id: int, medicines: List[Dict[str, Any]]) -> Tuple[Hashable, Dict[str, int]]:
+    """
+    (cache key, data versions). One query, in the request's own transaction;
+    the versions are handed back so callers need not read them again.
+    """
+    versions = get_versions(db, DEPENDS_ON)
+    key = (
+        customer_id,
+        cart_hash(medicines),
+        tuple(versions[name] for name in DEPENDS_ON),
+        RULES_VERSION,
+        INTERACTIONS_VERSION,
+    )
+    return key, versions
+
+
+class VerdictCache:
+    def __init__(self, maxsize: int = VERDICT_CACHE_SIZE, ttl_seconds: float = VERDICT_CACHE_TTL_SECONDS):
+        self.ttl = ttl_seconds
+        self._lru = LRUCache(maxsize)
+
+    def get(self, key: Hashable) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(safety update, age in seconds) or None"""
+        entry = self._lru.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            VERDICT_CACHE.inc(result="miss")
+            return None
+        VERDICT_CACHE.inc(result="hit")
+        return copy.deepcopy(entry[1]), time.monotonic() - entry[0]
+
+    def put(self, key: Hashable, update: Dict[str, Any]) -> bool:
+        """Stores non-approving verdicts only; returns whether it was stored"""
+        if update["safety"].get("approved"):
+            return False
+        self._lru.put(key, (time.monotonic(), copy.deepcopy(update)))
+        return True
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self._lru.stats()
+
+
+verdict_cache = VerdictCache()
@@ -1,7 +1,24 @@
 # backend/app/services/inventory_service.py
 
+from typing import Dict, List
+
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
+from app.db.database import begin_write
 from app.db.models import Medicine
+from app.db.versions import INVENTORY, touch
+
+
+class InsufficientStock(ValueError):
+    """
+    A cart line could not be reserved; nothing in the cart was.
+    shortfalls: [{"medicine_id", "requested", "available"}]
+    """
+
+    def __init__(self, shortfalls: List[Dict[str, int]]):
+        self.shortfalls = shortfalls
+        super().__init__(f"Insufficient stock: {shortfalls}")
+
 
 def get_all_medicines(db: Session):
     return db.query(Medicine).all()
@@ -17,3 +34,45 @@ def update_stock(db: Session, medicine_id: int, quantity_change: int):
     db.commit()
     db.refresh(medicine)
     return medicine
+
+def _decrement(db: Session, medicine_id: int, quantity: int) -> bool:
+    result = db.execute(
+        update(Medicine)
+        .where(Medicine.id == medicine_id, Medicine.stock_quantity >= quantity)
+        .values(stock_quantity=Medicine.stock_quantity - quantity)
+        .execution_options(synchronize_session="fetch")
+    )
+    return result.rowcount == 1
+
+def reserve_stock(db: Session, quantities: Dict[int, int]) -> None:
+    """
+    Take `quantities` (medicine id → units) out of stock, all or nothing.
+
+    Each line is ONE conditional UPDATE (`... WHERE id = :id AND
+    stock_quantity >= :q`): the check and the decrement are atomic in the
+    database, so concurrent orders can never oversell, whatever safety_agent
+    saw earlier. Lines run in id order (no lock-order deadlocks) inside a
+    SAVEPOINT: if a line fails, the savepoint is rolled back (the lines
+    already taken with it) and InsufficientStock is raised. Not committed:
+    the caller's unit of work is.
+    """
+    if not quantities:
+        return
+
+    begin_write(db)
+    with db.begin_nested():
+        for medicine_id, quantity in sorted(quantities.items()):
+            if _decrement(db, medicine_id, quantity):
+                continue
+
+            available = db.execute(
+                select(Medicine.stock_quantity).where(Medicine.id == medicine_id)
+            ).scalar()
+            raise InsufficientStock([{
+                "medicine_id": medicine_id,
+                "requested": quantity,
+                "available": available or 0,
+            }])
+
+    # Bulk UPDATEs bypass the flush listener; bumped in the caller's transaction
+    touch(db, INVENTORY)
@@ -6,8 +6,7 @@ from app.db.models import Order, OrderItem
 def create_order(db: Session, customer_id: int, items: list):
     order = Order(customer_id=customer_id)
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    db.flush()  # assigns order.id; the caller's unit of work commits
 
     for item in items:
         db.add(OrderItem(
@@ -17,5 +16,5 @@ def create_order(db: Session, customer_id: int, items: list):
             dosage=item.get("dosage", "")
         ))
 
-    db.commit()
+    db.flush()
     return order
@@ -5,8 +5,8 @@ In production, this would POST to actual warehouse systems
 
 import json
 from datetime import datetime
-from app.db.database import SessionLocal
-from app.db.models import Order, Customer
+from app.db.unit_of_work import request_scope
+from app.observability.metrics import WEBHOOKS
 
 
 class WebhookPayload:
@@ -42,6 +42,7 @@ async def trigger_warehouse_webhook(order_id: int, medicines: list, customer_id:
     
     # MOCK: Print webhook payload
     print(f"🚀 WEBHOOK TRIGGERED: {payload.to_json()}")
+    WEBHOOKS.inc(status=200)
     
     # In production, this would be:
     # async with httpx.AsyncClient() as client:
@@ -65,10 +66,10 @@ def send_order_confirmation(customer_id: int, order_id: int, medicines: list) ->
     Mock order confirmation: Email + SMS
     In production: Integrate Twilio/SendGrid
     """
-    db = SessionLocal()
-    try:
-        customer = db.query(Customer).filter(Customer.id == customer_id).first()
-        
+    with request_scope() as scope:
+        # Usually already in the request's identity map (loaded by /chat)
+        customer = scope.customer(customer_id)
+
         if not customer:
             return {"status": "failed", "reason": "Customer not found"}
         
@@ -107,5 +108,3 @@ Thank you for trusting AI Pharmacy!
             "phone": customer.phone,
             "message": "Confirmation sent via email and SMS"
         }
-    finally:
-        db.close()
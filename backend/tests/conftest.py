@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+
+# Point the app at a throwaway database BEFORE any app module is imported
+# (app/db/database.py reads DATABASE_URL at import): the suite never writes
+# to the dev pharmacy.db and can be re-run any number of times
+_DB_DIR = tempfile.mkdtemp(prefix="pharmacy-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'pharmacy.db')}"
+
+import pytest  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def seeded_database():
+    """Fresh schema + seed data once per test session"""
+    from app.db.database import init_db
+    from app.db.seed_data import seed
+
+    init_db()
+    seed()
+    yield
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def customer_id(seeded_database):
+    """Id of the first seeded customer"""
+    from app.db.database import SessionLocal
+    from app.db.models import Customer
+
+    db = SessionLocal()
+    try:
+        return db.query(Customer).first().id
+    finally:
+        db.close()
+
+
+@pytest.fixture(autouse=True)
+def empty_dose_windows(seeded_database):
+    """
+    Orders placed by earlier tests must not count towards this test's
+    cumulative dose limits (every test orders for the same seeded customers)
+    """
+    from app.db.database import engine
+    from app.db.models import DoseBucket
+    from app.db.versions import ORDERS, bump
+
+    with engine.begin() as conn:
+        conn.execute(delete(DoseBucket))
+        bump(conn, ORDERS)  # cached window totals are keyed on it
+    yield
@@ -0,0 +1,98 @@
+from fastapi.testclient import TestClient
+
+from app.agents.conversation_agent import conversation_agent
+from app.db.database import SessionLocal
+from app.db.models import Medicine, MedicineAlias
+from app.db.versions import ALIASES, get_version
+from app.extraction import registry
+from app.main import app
+
+client = TestClient(app)
+ADMIN = {"X-ADMIN-KEY": "dev-admin-key"}
+
+
+def _extract(message):
+    update = conversation_agent({"conversation": {"message": message}})
+    return update["extraction"]["medicines"]
+
+
+def _version():
+    db = SessionLocal()
+    try:
+        return get_version(db, ALIASES)
+    finally:
+        db.close()
+
+
+def test_matcher_is_built_from_alias_table():
+    medicines = _extract("two tylenol please")
+    assert medicines[0]["name"] == "Paracetamol 500mg"
+    assert registry.current().matcher.match("tylenol")[0]["medicine_id"] is not None
+
+
+def test_new_alias_is_live_without_restart():
+    db = SessionLocal()
+    try:
+        medicine = db.query(Medicine).filter(Medicine.name == "Ibuprofen 200mg").first()
+        medicine_id = medicine.id
+    finally:
+        db.close()
+
+    assert _extract("I need nurofen") == []
+    before = _version()
+
+    response = client.post("/admin/aliases/", headers=ADMIN, json={
+        "medicine_id": medicine_id, "alias": "Nurofen", "default_dosage": "200mg", "otc_hint": True,
+    })
+    assert response.status_code == 200
+    alias_id = response.json()["id"]
+
+    try:
+        assert _version() == before + 1
+        assert registry.current().version == before + 1
+        assert _extract("I need nurofen")[0]["name"] == "Ibuprofen 200mg"
+
+        duplicate = client.post("/admin/aliases/", headers=ADMIN, json={
+            "medicine_id": medicine_id, "alias": "nurofen",
+        })
+        assert duplicate.status_code == 409
+    finally:
+        client.delete(f"/admin/aliases/{alias_id}", headers=ADMIN)
+
+    assert _extract("I need nurofen") == []
+
+
+def test_other_workers_pick_up_changes_on_next_check(monkeypatch):
+    monkeypatch.setattr(registry, "ALIAS_RELOAD_INTERVAL_SECONDS", 0)
+    registry.current()
+
+    db = SessionLocal()
+    try:
+        medicine = db.query(Medicine).filter(Medicine.name == "Aspirin 81mg").first()
+        alias = MedicineAlias(medicine_id=medicine.id, alias="bayer", default_dosage="81mg")
+        db.add(alias)
+        db.commit()
+
+        assert _extract("bayer")[0]["name"] == "Aspirin 81mg"
+        assert _extract("bayer")[0]["otc_hint"] is True  # falls back to Medicine.prescription_required
+
+        db.delete(alias)
+        db.commit()
+    finally:
+        db.close()
+
+    assert _extract("bayer") == []
+
+
+def test_stock_updates_do_not_bump_alias_version():
+    before = _version()
+    db = SessionLocal()
+    try:
+        medicine = db.query(Medicine).first()
+        medicine.stock_quantity += 1
+        db.commit()
+        medicine.stock_quantity -= 1
+        db.commit()
+    finally:
+        db.close()
+    assert _version() == before
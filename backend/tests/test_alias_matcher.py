@@ -0,0 +1,48 @@
+from app.extraction.aliases import MEDICINE_ALIASES
+from app.extraction.matcher import AhoCorasick, AliasMatcher
+from app.agents.conversation_agent import conversation_agent
+
+matcher = AliasMatcher(MEDICINE_ALIASES)
+
+
+def _names(message):
+    return [details["name"] for details in matcher.match(message)]
+
+
+def test_overlapping_aliases_yield_one_medicine():
+    assert _names("I need ciprofloxacin") == ["Ciprofloxacin 500mg"]
+    assert _names("cipro please, ciprofloxacin 500mg") == ["Ciprofloxacin 500mg"]
+
+
+def test_word_boundaries():
+    assert _names("xaspirin") == []
+    assert _names("aspirin, then advil.") == ["Aspirin 81mg", "Ibuprofen 200mg"]
+
+
+def test_multi_word_alias_and_message_order():
+    assert _names("Vitamin C and Tylenol") == ["Vitamin C 500mg", "Paracetamol 500mg"]
+
+
+def test_leftmost_longest_prefers_longer_overlap():
+    automaton = AhoCorasick({"he": 1, "she": 2, "hers": 3})
+    hits = sorted((m.start, m.keyword) for m in automaton.iter_matches("ushers"))
+    assert hits == [(1, "she"), (2, "he"), (2, "hers")]
+
+    long_short = AliasMatcher({
+        "vitamin": {"name": "Vitamin"},
+        "vitamin c": {"name": "Vitamin C 500mg"},
+    })
+    assert [d["name"] for d in long_short.match("vitamin c")] == ["Vitamin C 500mg"]
+
+
+def test_scales_to_thousands_of_aliases():
+    aliases = {f"brand{i:05d}": {"name": f"Medicine {i}"} for i in range(5000)}
+    big = AliasMatcher(aliases)
+    assert [d["name"] for d in big.match("need brand04999 and brand00001")] == [
+        "Medicine 4999", "Medicine 1"
+    ]
+
+
+def test_conversation_agent_dedupes_by_canonical_name():
+    update = conversation_agent({"conversation": {"message": "cipro or ciprofloxacin"}})
+    assert [m["name"] for m in update["extraction"]["medicines"]] == ["Ciprofloxacin 500mg"]
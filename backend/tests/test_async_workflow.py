@@ -0,0 +1,105 @@
+import asyncio
+
+from app.graph.pharmacy_workflow import arun_workflow
+from app.db.database import SessionLocal
+from app.db.models import Customer, Medicine
+
+
+def test_async_workflow_places_order():
+    """
+    graph.ainvoke path must behave exactly like run_workflow():
+    same agent order, order created, stock committed.
+    """
+    db = SessionLocal()
+    try:
+        customer = db.query(Customer).first()
+        medicine = (
+            db.query(Medicine)
+            .filter(Medicine.name.ilike("%Paracetamol%"))
+            .first()
+        )
+        initial_stock = medicine.stock_quantity
+
+        final_state = asyncio.run(
+            arun_workflow(customer_id=customer.id, message="I need paracetamol 500mg")
+        )
+
+        assert final_state["safety"]["approved"] is True
+        assert final_state["execution"].get("order_id") is not None
+        assert final_state["execution"].get("webhook_status") == 200
+
+        db.refresh(medicine)
+        assert medicine.stock_quantity == initial_stock - 1
+
+        agents = [step["agent"] for step in final_state["decision_trace"]]
+        assert agents == [
+            "memory_agent",
+            "conversation_agent",
+            "safety_agent",
+            "action_agent",
+            "predictive_refill_agent",
+        ]
+    finally:
+        db.close()
+
+
+def test_concurrent_chat_turns_are_capped_at_the_pool_size(monkeypatch):
+    """
+    More concurrent /chat turns than pooled connections: all complete,
+    stock drops by exactly the number of orders, and no more scopes are
+    open at once than the in-flight limit.
+    """
+    import httpx
+
+    from app.db import unit_of_work
+    from app.main import app
+
+    limit = unit_of_work._inflight_limit()
+    open_scopes = []
+    peak = []
+
+    class CountingScope(unit_of_work.RequestScope):
+        def __init__(self, **preloaded):
+            super().__init__(**preloaded)
+            open_scopes.append(self)
+            peak.append(len(open_scopes))
+
+        def close(self):
+            open_scopes.remove(self)
+            super().close()
+
+    monkeypatch.setattr(unit_of_work, "RequestScope", CountingScope)
+
+    db = SessionLocal()
+    try:
+        customer_ids = [c.id for c in db.query(Customer).limit(4)]
+        medicine = db.query(Medicine).filter(Medicine.name == "Paracetamol 500mg").first()
+        initial_stock = medicine.stock_quantity
+    finally:
+        db.close()
+
+    turns = limit * 4
+
+    async def chat_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+            return await asyncio.gather(*(
+                client.post("/chat/", json={
+                    "customer_id": customer_ids[i % len(customer_ids)],
+                    "message": "I need paracetamol 500mg",
+                })
+                for i in range(turns)
+            ))
+
+    responses = asyncio.run(chat_all())
+
+    assert [r.status_code for r in responses] == [200] * turns
+    assert all(r.json()["approved"] for r in responses)
+    assert max(peak) <= limit
+    assert not open_scopes
+
+    db = SessionLocal()
+    try:
+        assert db.get(Medicine, medicine.id).stock_quantity == initial_stock - turns
+    finally:
+        db.close()
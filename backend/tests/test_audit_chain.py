@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from app.audit import decision_logger
+from app.audit.decision_logger import AuditLog, GENESIS_HASH
+
+
+def _chained(path, **kwargs):
+    return AuditLog(path, chained=True, signing_key="test-key", **kwargs)
+
+
+def _write(log, count, start=0):
+    ids = []
+    for i in range(start, start + count):
+        run_id = f"00000000-0000-0000-0000-{i:012d}"
+        log.append({"run_id": run_id, "safety": {"approved": True}}, 1, 1000.0 + i)
+        ids.append(run_id)
+    return ids
+
+
+def test_chain_verifies_across_segments_and_restarts(tmp_path):
+    log = _chained(tmp_path, max_bytes=600, checkpoint_every=3)
+    ids = _write(log, 10)
+    log.close()
+
+    # A new process continues the chain in a fresh segment
+    restarted = _chained(tmp_path, checkpoint_every=3)
+    ids += _write(restarted, 2, start=10)
+    restarted.close()
+
+    report = restarted.verify()
+    assert report["ok"], report
+    assert sum(s["records"] for s in report["segments"]) == 12
+    assert all(s["unsigned"] == 0 for s in report["segments"])
+    assert len(report["segments"]) > 2
+
+    record = restarted.find(ids[0])
+    assert record["prev_hash"] == GENESIS_HASH
+    assert restarted.find(ids[1])["prev_hash"] == record["hash"]
+
+
+def test_edited_record_is_detected(tmp_path):
+    log = _chained(tmp_path)
+    _write(log, 5)
+    log.close()
+
+    segment = tmp_path / "decisions-000001.jsonl"
+    lines = segment.read_text().splitlines()
+    record = json.loads(lines[2])
+    record["safety"]["approved"] = False
+    lines[2] = json.dumps(record, sort_keys=True, separators=(",", ":"))
+    segment.write_text("\n".join(lines) + "\n")
+
+    report = log.verify()
+    assert not report["ok"]
+    assert report["segments"][0]["line"] == 3
+    assert "hash mismatch" in report["segments"][0]["error"]
+
+
+def test_deleted_record_and_forged_checkpoint_are_detected(tmp_path):
+    log = _chained(tmp_path)
+    _write(log, 4)
+    log.close()
+
+    segment = tmp_path / "decisions-000001.jsonl"
+    lines = segment.read_text().splitlines()
+    segment.write_text("\n".join(lines[:1] + lines[2:]) + "\n")
+    assert "chain broken" in log.verify()["segments"][0]["error"]
+
+    segment.write_text("\n".join(lines) + "\n")
+    assert log.verify()["ok"]
+
+    forged = _chained(tmp_path)
+    forged.signing_key = "wrong-key"
+    assert forged.verify()["segments"][0]["error"] == "bad checkpoint signature"
+
+
+def test_records_share_fsyncs(tmp_path, monkeypatch):
+    fsyncs = []
+    real_fsync = decision_logger.os.fsync
+    monkeypatch.setattr(decision_logger.os, "fsync", lambda fd: (fsyncs.append(fd), real_fsync(fd)))
+
+    log = _chained(tmp_path, fsync_batch=50, fsync_interval_ms=60_000, checkpoint_every=10_000)
+    _write(log, 100)
+
+    # data + index file per sync: one sync per 50 records
+    assert len(fsyncs) == 4
+    log.close()
+
+
+def test_chain_requires_a_signing_key(tmp_path):
+    with pytest.raises(ValueError):
+        AuditLog(tmp_path, chained=True, signing_key="")
+
+    AuditLog(tmp_path, chained=False, signing_key="").close()  # plain log needs no key
@@ -0,0 +1,74 @@
+from app.agents.safety_agent import safety_agent
+from app.db.catalog import catalog_index
+from app.db.database import SessionLocal
+from app.db.models import Medicine
+from app.db.unit_of_work import request_scope
+from app.observability.metrics import node_timer
+
+
+def _safety(medicines, customer_id):
+    state = {"customer": {"id": customer_id}, "extraction": {"medicines": medicines}}
+    return safety_agent(state)
+
+
+PARACETAMOL = [{"name": "Paracetamol 500mg", "quantity": 2, "dosage": "500mg"}]
+
+
+def test_index_is_shared_until_catalog_changes():
+    db = SessionLocal()
+    try:
+        first = catalog_index(db)
+        assert catalog_index(db) is first
+        assert first.lookup("paracetamol 500mg").name == "Paracetamol 500mg"
+
+        # Stock is not catalog data
+        medicine = db.query(Medicine).filter(Medicine.name == "Cetirizine 10mg").first()
+        medicine.stock_quantity += 1
+        db.commit()
+        assert catalog_index(db) is first
+
+        medicine.prescription_required = True
+        db.commit()
+        try:
+            rebuilt = catalog_index(db)
+            assert rebuilt is not first
+            assert rebuilt.get(medicine.id).rx is True
+        finally:
+            medicine.prescription_required = False
+            medicine.stock_quantity -= 1
+            db.commit()
+    finally:
+        db.close()
+
+
+def test_safety_reads_stock_fresh(customer_id):
+    db = SessionLocal()
+    try:
+        medicine = db.query(Medicine).filter(Medicine.name == "Paracetamol 500mg").first()
+        original = medicine.stock_quantity
+        medicine.stock_quantity = 1
+        db.commit()
+        try:
+            verdict = _safety(PARACETAMOL, customer_id)["safety"]
+            assert verdict["decision"] == "blocked"
+            assert any("Insufficient stock" in v for v in verdict["violations"])
+        finally:
+            medicine.stock_quantity = original
+            db.commit()
+    finally:
+        db.close()
+
+    assert _safety(PARACETAMOL, customer_id)["safety"]["approved"] is True
+
+
+def test_safety_does_not_load_the_catalog(customer_id):
+    _safety(PARACETAMOL, customer_id)  # warm the index
+    medicines = PARACETAMOL + [{"name": "Ibuprofen 200mg", "quantity": 1, "dosage": "200mg"}]
+
+    with request_scope():
+        with node_timer("test_catalog") as metrics:
+            _safety(medicines, customer_id)
+
+    # data versions + one stock read for both items; no Medicine rows loaded
+    assert metrics["db_queries"] == 2
+    assert metrics["rows_read"] == 0
@@ -0,0 +1,76 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.db.database import SessionLocal
+from app.db.models import Customer, Medicine, DecisionTrace
+
+client = TestClient(app)
+
+
+def test_batch_results_in_order_with_per_customer_stock():
+    """
+    /chat/batch returns one ChatResponse per item, in request order,
+    and applies every approved order's stock decrement.
+    """
+    db = SessionLocal()
+    try:
+        customers = db.query(Customer).limit(2).all()
+        medicine = (
+            db.query(Medicine)
+            .filter(Medicine.name.ilike("%Paracetamol%"))
+            .first()
+        )
+        initial_stock = medicine.stock_quantity
+        initial_traces = db.query(DecisionTrace).count()
+
+        items = [
+            {"customer_id": customers[0].id, "message": "I need paracetamol 500mg"},
+            {"customer_id": customers[1].id, "message": "hello"},
+            {"customer_id": 999999, "message": "I need paracetamol 500mg"},
+            {"customer_id": customers[0].id, "message": "I need 2 tablets paracetamol 500mg"},
+        ]
+
+        response = client.post("/chat/batch", json={"items": items})
+        assert response.status_code == 200
+
+        results = response.json()["results"]
+        assert len(results) == 4
+
+        assert results[0]["approved"] is True
+        assert results[1]["error_type"] == "VALIDATION"
+        assert results[2]["violations"] == ["Customer not found"]
+        assert results[3]["approved"] is True
+        assert results[3]["order_id"] > results[0]["order_id"], \
+            "Same-customer messages must be processed in order"
+
+        db.expire_all()
+        assert db.get(Medicine, medicine.id).stock_quantity == initial_stock - 3
+
+        # Traces for the three processed messages, written in one bulk insert
+        assert db.query(DecisionTrace).count() > initial_traces
+    finally:
+        db.close()
+
+
+def test_batch_crash_returns_generic_system_error(monkeypatch):
+    """A crashed item is reported as SYSTEM without leaking the exception text"""
+    from app.graph import batch
+
+    async def crash(**kwargs):
+        raise RuntimeError("(sqlite3.OperationalError) database is locked [SQL: UPDATE medicines ...]")
+
+    monkeypatch.setattr(batch, "arun_workflow", crash)
+
+    db = SessionLocal()
+    try:
+        customer_id = db.query(Customer).first().id
+    finally:
+        db.close()
+
+    response = client.post("/chat/batch", json={"items": [{"customer_id": customer_id, "message": "hello"}]})
+    assert response.status_code == 200
+
+    result = response.json()["results"][0]
+    assert result["error_type"] == "SYSTEM"
+    assert result["violations"] == ["Request could not be processed"]
+    assert "sqlite" not in response.text
@@ -0,0 +1,69 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_emits_safety_before_order_and_done_last():
+    response = client.post("/chat/stream", json={
+        "customer_id": 1,
+        "message": "I need paracetamol 500mg"
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    names = [name for name, _ in _events(response.text)]
+    assert names.index("safety") < names.index("order") < names.index("refill_alerts")
+    assert names[-1] == "done"
+
+    done = _events(response.text)[-1][1]
+    assert done["approved"] is True
+    assert done["order_id"] is not None
+
+
+def test_stream_unknown_customer_is_404():
+    response = client.post("/chat/stream", json={"customer_id": 999999, "message": "hi"})
+    assert response.status_code == 404
+
+
+def test_stream_error_event_hides_exception_details(monkeypatch):
+    from app.api import chat
+
+    async def failing(customer_id, message):
+        raise RuntimeError("Workflow error: (sqlite3.OperationalError) database is locked")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(chat, "astream_workflow", failing)
+
+    response = client.post("/chat/stream", json={"customer_id": 1, "message": "hi"})
+    assert _events(response.text) == [("error", {"detail": "Request could not be processed"})]
+
+
+def test_streamed_state_folds_updates_like_the_graph():
+    """astream_workflow's running state == ainvoke's final state (same reducers)"""
+    import asyncio
+
+    from app.graph.pharmacy_workflow import arun_workflow, astream_workflow
+
+    async def streamed():
+        state = None
+        async for _, _, state in astream_workflow(1, "hello"):
+            pass
+        return state
+
+    invoked = asyncio.run(arun_workflow(customer_id=1, message="hello"))
+    state = asyncio.run(streamed())
+
+    assert [s["agent"] for s in state["decision_trace"]] == [s["agent"] for s in invoked["decision_trace"]]
+    assert state["meta"].keys() == invoked["meta"].keys()
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from app.audit import decision_logger
+from app.audit.decision_logger import AuditLog, INDEX_ENTRY
+
+
+def _state(customer_id, message="I need paracetamol 500mg"):
+    return {
+        "customer": {"id": customer_id},
+        "conversation": {"message": message},
+        "safety": {"approved": True},
+        "decision_trace": [{"agent": "safety_agent"}],
+    }
+
+
+def test_write_and_find_by_run_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(decision_logger, "_log", AuditLog(tmp_path))
+
+    run_id = decision_logger.write_decision_log(_state(1))
+    decision_logger.write_decision_log(_state(2))
+
+    record = decision_logger.read_decision_log(run_id)
+    assert record["run_id"] == run_id
+    assert record["customer"] == {"id": 1}
+
+    # One JSONL segment + one index, not one file per run
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "decisions-000001.idx", "decisions-000001.jsonl"
+    ]
+    assert (tmp_path / "decisions-000001.idx").stat().st_size == 2 * INDEX_ENTRY.size
+
+
+def test_rotation_by_size_and_lookup_across_segments(tmp_path):
+    log = AuditLog(tmp_path, max_bytes=300)
+    ids = []
+    for i in range(6):
+        record = {"run_id": f"00000000-0000-0000-0000-00000000000{i}", "pad": "x" * 100}
+        log.append(record, customer_id=i % 2, timestamp=1000.0 + i)
+        ids.append(record["run_id"])
+
+    assert len(log.segments()) > 1
+    assert all(log.find(run_id)["run_id"] == run_id for run_id in ids)
+    assert log.find("11111111-1111-1111-1111-111111111111") is None
+
+    assert [r["run_id"] for r in log.query(customer_id=1)] == ids[1::2]
+    assert [r["run_id"] for r in log.query(since=1002.0, until=1004.0)] == ids[2:4]
+
+
+def test_rotation_by_age(tmp_path):
+    log = AuditLog(tmp_path, max_age_seconds=0.05)
+    log.append({"run_id": "00000000-0000-0000-0000-000000000001"}, 1, time.time())
+    time.sleep(0.1)
+    log.append({"run_id": "00000000-0000-0000-0000-000000000002"}, 1, time.time())
+    log.close()
+
+    assert log.segments() == [1, 2]
+
+
+def test_group_commit_shares_fsyncs(tmp_path, monkeypatch):
+    log = AuditLog(tmp_path)
+    fsyncs = []
+    real_fsync = decision_logger.os.fsync
+
+    def slow_fsync(fd):
+        fsyncs.append(fd)
+        time.sleep(0.01)
+        real_fsync(fd)
+
+    monkeypatch.setattr(decision_logger.os, "fsync", slow_fsync)
+
+    def writer(n):
+        for i in range(10):
+            log.append({"run_id": f"00000000-0000-0000-{n:04d}-{i:012d}"}, n, time.time())
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(log.query()) == 80
+    # Two files per fsync round; far fewer rounds than records
+    assert len(fsyncs) / 2 < 80
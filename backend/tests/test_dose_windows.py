@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.agents.safety_agent import safety_agent
+from app.db.base import Base
+from app.db.database import SessionLocal, engine
+from app.db.models import DoseBucket
+from app.db.versions import ORDERS, bump
+from app.graph.pharmacy_workflow import run_workflow
+from app.rules.dose_windows import record_doses, window_totals
+from app.rules.engine import rules_for_name
+
+NOW = datetime(2026, 3, 1, 12, 30)
+
+
+def _scratch_session(tmp_path):
+    scratch = create_engine(f"sqlite:///{tmp_path / 'doses.db'}")
+    Base.metadata.create_all(scratch)
+    return sessionmaker(bind=scratch)()
+
+
+def _record(customer_id, doses):
+    with engine.begin() as conn:
+        record_doses(conn, customer_id, doses)
+        bump(conn, ORDERS)  # raw writes bypass the version listener
+
+
+def test_orders_in_the_same_hour_share_a_bucket(tmp_path):
+    db = _scratch_session(tmp_path)
+
+    record_doses(db, 1, {"paracetamol": 1000}, at=NOW)
+    record_doses(db, 1, {"paracetamol": 500, "ibuprofen": 400}, at=NOW + timedelta(minutes=20))
+
+    assert db.execute(select(func.count()).select_from(DoseBucket)).scalar() == 2
+    assert window_totals(db, 1, {ORDERS: 1}, now=NOW) == {
+        "paracetamol": (1500, 1500),
+        "ibuprofen": (400, 400),
+    }
+
+
+def test_windows_slide_and_old_buckets_are_pruned(tmp_path):
+    db = _scratch_session(tmp_path)
+
+    record_doses(db, 1, {"paracetamol": 4000}, at=NOW - timedelta(days=8))
+    record_doses(db, 1, {"paracetamol": 2000}, at=NOW - timedelta(hours=30))
+    record_doses(db, 1, {"paracetamol": 1000}, at=NOW - timedelta(hours=2))
+    record_doses(db, 2, {"paracetamol": 9000}, at=NOW)
+
+    assert window_totals(db, 1, {ORDERS: 2}, now=NOW) == {"paracetamol": (1000, 3000)}
+    # the 8-day-old bucket was dropped by the later writes
+    assert db.execute(
+        select(func.count()).select_from(DoseBucket).where(DoseBucket.customer_id == 1)
+    ).scalar() == 2
+
+
+def test_cumulative_limit_blocks_across_orders(customer_id):
+    cart = [{"name": "Paracetamol 500mg", "quantity": 2, "dosage": "500mg"}]
+    limit = rules_for_name("Paracetamol 500mg").max_mg_24h
+    bought = limit - 500
+
+    _record(customer_id, {"paracetamol": bought})
+    try:
+        verdict = safety_agent({"customer": {"id": customer_id}, "extraction": {"medicines": cart}})["safety"]
+        assert verdict["decision"] == "blocked"
+        assert verdict["error_type"] == "SAFETY"
+        assert any(v.startswith("Cumulative paracetamol") and "24h" in v for v in verdict["violations"])
+    finally:
+        _record(customer_id, {"paracetamol": -bought})
+
+
+def test_placed_order_updates_the_window(customer_id):
+
+    db = SessionLocal()
+    try:
+        before = window_totals(db, customer_id).get("paracetamol", (0.0, 0.0))
+    finally:
+        db.close()
+
+    final_state = run_workflow(customer_id=customer_id, message="I need 2 pills of paracetamol 500mg")
+    assert final_state["safety"]["approved"] is True
+
+    db = SessionLocal()
+    try:
+        after = window_totals(db, customer_id)["paracetamol"]
+    finally:
+        db.close()
+
+    assert after == (before[0] + 1000, before[1] + 1000)
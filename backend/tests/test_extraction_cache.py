@@ -0,0 +1,51 @@
+from app.agents.conversation_agent import conversation_agent
+from app.extraction import cache, registry
+from app.extraction.cache import LRUCache, extraction_cache
+
+
+def _extract(message):
+    return conversation_agent({"conversation": {"message": message}})["extraction"]
+
+
+def test_repeat_phrasings_hit_the_cache():
+    before = extraction_cache.stats()
+
+    first = _extract("need paracetamol 10 tablets")
+    second = _extract("  Need   PARACETAMOL 10 tablets ")
+
+    after = extraction_cache.stats()
+    assert second == first
+    assert after["hits"] - before["hits"] >= 1
+
+
+def test_results_are_copies():
+    first = _extract("need ibuprofen 2 tablets")
+    first["medicines"][0]["quantity"] = 999
+    assert _extract("need ibuprofen 2 tablets")["medicines"][0]["quantity"] == 2
+
+
+def test_alias_version_change_invalidates(monkeypatch):
+    calls = []
+
+    def extract(text):
+        calls.append(text)
+        return {"n": len(calls)}
+
+    loaded = registry.current()
+    assert cache.cached_extraction("versioned message", extract) == {"n": 1}
+    assert cache.cached_extraction("versioned message", extract) == {"n": 1}
+
+    monkeypatch.setattr(registry, "current", lambda: loaded._replace(version=loaded.version + 1))
+    assert cache.cached_extraction("versioned message", extract) == {"n": 2}
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    lru.get("a")
+    lru.put("c", 3)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 1}
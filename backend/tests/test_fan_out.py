@@ -0,0 +1,54 @@
+import operator
+
+from app.db.database import SessionLocal
+from app.db.models import Customer
+from app.graph.pharmacy_workflow import run_workflow
+from app.graph.state import STATE_REDUCERS, apply_update, merge_dicts
+
+
+def _first_customer_id():
+    db = SessionLocal()
+    try:
+        return db.query(Customer).first().id
+    finally:
+        db.close()
+
+
+def test_state_declares_reducers_for_parallel_keys():
+    assert STATE_REDUCERS == {"decision_trace": operator.add, "meta": merge_dicts}
+
+
+def test_merge_dicts_keeps_both_branches_keys():
+    assert merge_dicts({"customer_history": [1]}, {"extraction_ms": 2}) == {
+        "customer_history": [1],
+        "extraction_ms": 2,
+    }
+    assert merge_dicts(None, {"a": 1}) == {"a": 1}
+    assert merge_dicts({"a": 1}, {"a": 2}) == {"a": 2}  # later branch wins
+
+
+def test_apply_update_uses_reducers_and_overwrites_the_rest():
+    state = {"decision_trace": [{"agent": "memory_agent"}], "meta": {"a": 1}, "safety": {"approved": False}}
+
+    apply_update(state, {
+        "decision_trace": [{"agent": "conversation_agent"}],
+        "meta": {"b": 2},
+        "safety": {"approved": True},
+        "extraction": {"medicines": []},
+    })
+
+    assert [s["agent"] for s in state["decision_trace"]] == ["memory_agent", "conversation_agent"]
+    assert state["meta"] == {"a": 1, "b": 2}
+    assert state["safety"] == {"approved": True}
+    assert state["extraction"] == {"medicines": []}
+
+
+def test_parallel_context_branches_merge_into_one_state():
+    """memory_agent and conversation_agent run concurrently; both updates survive the join"""
+    final_state = run_workflow(customer_id=_first_customer_id(), message="I need paracetamol 500mg")
+
+    agents = [step["agent"] for step in final_state["decision_trace"]]
+    assert agents[:2] == ["memory_agent", "conversation_agent"], "Merged in registration order"
+
+    assert "customer_history" in final_state["meta"]  # memory branch
+    assert final_state["extraction"]["medicines"]     # conversation branch
@@ -0,0 +1,45 @@
+import time
+
+from app.agents.conversation_agent import conversation_agent
+from app.agents.safety_agent import safety_agent
+from app.extraction.fuzzy import TrigramIndex
+
+
+def _extract(message):
+    return conversation_agent({"conversation": {"message": message}})
+
+
+def test_misspellings_are_corrected():
+    update = _extract("i need amoxicilin and paracetamole 500mg")
+    names = [m["name"] for m in update["extraction"]["medicines"]]
+    assert names == ["Amoxicillin 500mg", "Paracetamol 500mg"]
+    assert "typo-corrected" in update["decision_trace"][0]["reasoning"]
+
+
+def test_common_words_are_not_corrected():
+    assert _extract("I need some medicine please, without dosage")["extraction"]["medicines"] == []
+
+
+def test_safety_lookup_is_typo_tolerant():
+    update = safety_agent({
+        "customer": {"id": 1},
+        "extraction": {"medicines": [
+            {"name": "Paracetamole 500mg", "quantity": 1, "dosage": "500mg", "otc_hint": True}
+        ]},
+    })
+    assert update["safety"]["approved"] is True
+    assert any("matched 'Paracetamol 500mg'" in step for step in update["decision_trace"][0]["reasoning"])
+
+
+def test_ranked_results_and_large_catalog_speed():
+    catalog = {f"medicine{i:05d}": i for i in range(50_000)}
+    catalog["amoxicillin"] = "amox"
+    index = TrigramIndex(catalog)
+
+    assert index.best("amoxicilin").payload == "amox"
+
+    started = time.perf_counter()
+    for _ in range(100):
+        index.search("amoxicilin")
+    per_lookup_ms = (time.perf_counter() - started) * 1000 / 100
+    assert per_lookup_ms < 5
@@ -0,0 +1,18 @@
+from app.graph.registry import get_graph, warm_up, build_stats, PHARMACY_GRAPH
+
+
+def test_graph_compiled_once_and_shared():
+    """Every caller must receive the same compiled graph object"""
+    first = get_graph()
+    second = get_graph(PHARMACY_GRAPH)
+
+    assert first is second, "Graph must be compiled once per process"
+
+
+def test_build_duration_reported():
+    """warm_up() reports how long each graph took to compile"""
+    stats = warm_up()
+
+    assert PHARMACY_GRAPH in stats
+    assert stats[PHARMACY_GRAPH] >= 0
+    assert build_stats() == stats
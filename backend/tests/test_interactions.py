@@ -0,0 +1,102 @@
+from app.agents.safety_agent import safety_agent
+from app.db.catalog import CatalogEntry, CatalogIndex
+from app.db.database import SessionLocal
+from app.db.models import Medicine, Order, OrderItem
+from app.rules.interactions import MAJOR, MODERATE, InteractionMatrix, interaction_matrix
+
+CATALOG = CatalogIndex(
+    [
+        CatalogEntry(1, "Paracetamol 500mg", False),
+        CatalogEntry(2, "Ibuprofen 200mg", False),
+        CatalogEntry(3, "Aspirin 81mg", False),
+        CatalogEntry(4, "Warfarin 5mg", True),
+    ],
+    version=-1,
+)
+
+PAIRS = [
+    {"a": "warfarin", "b": "aspirin", "severity": MAJOR, "note": "bleeding"},
+    {"a": "aspirin", "b": "ibuprofen", "severity": MODERATE, "note": "antiplatelet"},
+]
+
+
+def _safety(customer_id, medicines):
+    return safety_agent({"customer": {"id": customer_id}, "extraction": {"medicines": medicines}})
+
+
+def test_major_pair_in_cart_is_reported_once():
+    matrix = InteractionMatrix(CATALOG, PAIRS)
+
+    hits = matrix.screen([3, 4])
+    assert [(h.severity, h.medicine, h.other, h.active) for h in hits] == [
+        (MAJOR, "Aspirin 81mg", "Warfarin 5mg", False)
+    ]
+    assert matrix.screen([4, 3, 4]) == matrix.screen([4, 3])
+
+
+def test_cart_is_screened_against_active_medications():
+    matrix = InteractionMatrix(CATALOG, PAIRS)
+
+    hits = matrix.screen([3], active_ids=[4, 2])
+    assert {(h.severity, h.other, h.active) for h in hits} == {
+        (MAJOR, "Warfarin 5mg", True),
+        (MODERATE, "Ibuprofen 200mg", True),
+    }
+    # Already in the cart: screened as a cart pair, not twice
+    assert [h.active for h in matrix.screen([3, 4], active_ids=[4])] == [False]
+
+
+def test_unrelated_medicines_have_no_hits():
+    matrix = InteractionMatrix(CATALOG, PAIRS)
+
+    assert matrix.screen([1], active_ids=[2, 3, 4]) == []
+    assert matrix.screen([99]) == []
+    assert 1 not in matrix.bit
+
+
+def test_matrix_is_compiled_once_per_catalog_version():
+    matrix = interaction_matrix(CATALOG)
+    assert interaction_matrix(CATALOG) is matrix
+
+    bumped = CatalogIndex(CATALOG.entries, version=-2)
+    assert interaction_matrix(bumped) is not matrix
+
+
+def test_moderate_interaction_is_noted_not_blocked(customer_id):
+    update = _safety(customer_id, [
+        {"name": "Aspirin 81mg", "quantity": 1, "dosage": "81mg"},
+        {"name": "Ibuprofen 200mg", "quantity": 1, "dosage": "200mg"},
+    ])
+
+    assert update["safety"]["approved"] is True
+    reasoning = update["decision_trace"][0]["reasoning"]
+    assert any(step.startswith("⚠️ Moderate interaction") for step in reasoning)
+
+
+def test_recent_order_blocks_major_interaction(customer_id):
+    cart = [{"name": "Aspirin 81mg", "quantity": 1, "dosage": "81mg"}]
+
+    db = SessionLocal()
+    try:
+        warfarin = Medicine(name="Warfarin 5mg", stock_quantity=10, prescription_required=True)
+        db.add(warfarin)
+        db.flush()
+        order = Order(customer_id=customer_id)
+        db.add(order)
+        db.flush()
+        db.add(OrderItem(order_id=order.id, medicine_id=warfarin.id, quantity=1, dosage="5mg"))
+        db.commit()
+        try:
+            verdict = _safety(customer_id, cart)["safety"]
+            assert verdict["decision"] == "blocked"
+            assert verdict["error_type"] == "SAFETY"
+            assert any(v.startswith("Interaction: Aspirin 81mg + Warfarin 5mg") for v in verdict["violations"])
+        finally:
+            db.query(OrderItem).filter(OrderItem.order_id == order.id).delete()
+            db.delete(order)
+            db.delete(warfarin)
+            db.commit()
+    finally:
+        db.close()
+
+    assert _safety(customer_id, cart)["safety"]["approved"] is True
@@ -0,0 +1,87 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.agents.conversation_agent import conversation_agent
+from app.db.database import SessionLocal
+from app.db.migrations import run_migrations
+from app.db.models import Customer
+from app.extraction import registry
+
+
+def _extract(message, language):
+    state = {"conversation": {"message": message}, "customer": {"language": language}}
+    return conversation_agent(state)["extraction"]
+
+
+def test_spanish_aliases_quantities_and_accents():
+    extraction = _extract("Necesito 2 cajas de ibuprofeno y acetaminofen", "es")
+
+    assert [m["name"] for m in extraction["medicines"]] == ["Ibuprofen 200mg", "Paracetamol 500mg"]
+    assert {m["quantity"] for m in extraction["medicines"]} == {2}
+    assert extraction["language"] == "es"
+
+
+def test_chinese_aliases_match_without_word_boundaries():
+    extraction = _extract("我要3片布洛芬和阿司匹林", "zh")
+
+    assert [m["name"] for m in extraction["medicines"]] == ["Ibuprofen 200mg", "Aspirin 81mg"]
+    assert extraction["medicines"][0]["quantity"] == 3
+
+
+def test_english_brand_names_work_in_every_language():
+    assert _extract("necesito advil", "es")["medicines"][0]["name"] == "Ibuprofen 200mg"
+    assert _extract("tylenol 两盒", "zh")["medicines"][0]["name"] == "Paracetamol 500mg"
+
+
+def test_english_matcher_stays_english():
+    assert _extract("我要布洛芬和阿司匹林", "en")["medicines"] == []
+    # unknown languages are handled as English
+    assert _extract("ibuprofeno", "fr")["language"] == "en"
+
+
+def test_language_matchers_are_built_lazily_and_cached(monkeypatch):
+    registry.current()
+    monkeypatch.setattr(registry, "_loaded", {"en": registry.current()})
+
+    assert registry.built_languages() == ["en"]
+    spanish = registry.current("es")
+    assert registry.built_languages() == ["en", "es"]
+    assert registry.current("es") is spanish
+    assert registry.current("es-MX") is spanish
+
+
+def test_language_comes_from_customer_profile():
+    db = SessionLocal()
+    try:
+        customer = db.query(Customer).filter(Customer.preferred_language == "zh").first()
+        customer_id = customer.id
+    finally:
+        db.close()
+
+    update = conversation_agent({"conversation": {"message": "布洛芬"}, "customer": {"id": customer_id}})
+    assert update["extraction"]["language"] == "zh"
+    assert update["extraction"]["medicines"][0]["name"] == "Ibuprofen 200mg"
+
+
+def test_migration_makes_aliases_unique_per_language(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE decision_traces (id INTEGER PRIMARY KEY, request_id VARCHAR)"))
+        conn.execute(text("CREATE TABLE medicines (id INTEGER PRIMARY KEY, name VARCHAR)"))
+        conn.execute(text("INSERT INTO medicines (id, name) VALUES (1, 'Paracetamol 500mg')"))
+        conn.execute(text(
+            "CREATE TABLE medicine_aliases (id INTEGER PRIMARY KEY, medicine_id INTEGER NOT NULL, "
+            "alias VARCHAR NOT NULL UNIQUE, default_dosage VARCHAR, otc_hint BOOLEAN, created_at DATETIME)"
+        ))
+        conn.execute(text("INSERT INTO medicine_aliases (medicine_id, alias) VALUES (1, 'paracetamol')"))
+
+    run_migrations(engine)
+
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT alias, language FROM medicine_aliases ORDER BY language, alias")).all()
+        conn.execute(text(
+            "INSERT INTO medicine_aliases (medicine_id, alias, language) VALUES (1, 'paracetamol', 'fr')"
+        ))
+
+    assert ("paracetamol", "en") in rows
+    assert ("对乙酰氨基酚", "zh") in rows
+    assert any(c["name"] == "language" for c in inspect(engine).get_columns("medicine_aliases"))
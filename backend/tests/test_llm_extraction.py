@@ -0,0 +1,158 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.extraction import extractor
+from app.extraction.llm_adapter import CircuitBreaker, LLMAdapter
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Answers /api/generate like Ollama: every 'N. message' naming paracetmol → 3 paracetamol"""
+
+    calls = []
+    delay = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeOllama.calls.append(body)
+        time.sleep(FakeOllama.delay)
+
+        results = []
+        for number, text in re.findall(r"^(\d+)\. (.*)$", body["prompt"], re.MULTILINE):
+            medicines = [{"name": "paracetamol", "quantity": 3}] if "paracetmol" in text else []
+            results.append({"id": int(number), "medicines": medicines})
+
+        payload = json.dumps({"response": json.dumps({"results": results})}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama():
+    FakeOllama.calls = []
+    FakeOllama.delay = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_prompts_share_one_call(ollama):
+    adapter = LLMAdapter(url=ollama, batch_window_ms=100, timeout_ms=2000)
+    messages = ["need paracetmol", "paracetmol x3 please", "hello there", "need paracetmol"]
+    results = [None] * len(messages)
+
+    def ask(i):
+        results[i] = adapter.extract(messages[i])
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(len(messages))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(FakeOllama.calls) == 1
+    # duplicate message sent once
+    assert FakeOllama.calls[0]["prompt"].count("need paracetmol") == 1
+    assert results[0] == results[1] == results[3] == [{"name": "paracetamol", "quantity": 3}]
+    assert results[2] == []
+
+
+def test_responses_are_cached(ollama):
+    adapter = LLMAdapter(url=ollama, batch_window_ms=0)
+    adapter.extract("need paracetmol")
+    adapter.extract("  Need PARACETMOL ")
+
+    assert len(FakeOllama.calls) == 1
+
+
+def test_timeouts_trip_the_breaker(ollama):
+    FakeOllama.delay = 0.5
+    adapter = LLMAdapter(
+        url=ollama, batch_window_ms=0, timeout_ms=100,
+        breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60),
+    )
+
+    assert adapter.extract("slow one paracetmol") is None
+    assert adapter.extract("slow two paracetmol") is None
+    # the worker records the failed call once its own socket timeout fires
+    time.sleep(0.3)
+    assert adapter.breaker.state == "open"
+
+    sent = len(FakeOllama.calls)
+    assert adapter.extract("slow three paracetmol") is None
+    assert len(FakeOllama.calls) == sent
+
+
+def test_breaker_half_open_allows_one_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+class StubAdapter:
+    def __init__(self, answer):
+        self.answer = answer
+        self.asked = []
+
+    def extract(self, message):
+        self.asked.append(message)
+        return self.answer
+
+
+def test_confident_messages_skip_the_llm(monkeypatch):
+    stub = StubAdapter([{"name": "ibuprofen", "quantity": 1}])
+    monkeypatch.setattr(extractor, "LLM_EXTRACTION_ENABLED", True)
+    monkeypatch.setattr(extractor, "get_llm_adapter", lambda: stub)
+
+    result = extractor.extract_tiered("need paracetamol")
+
+    assert result["tier"] == "rules" and result["confidence"] == 1.0
+    assert stub.asked == []
+
+
+def test_low_confidence_goes_to_llm_and_resolves_to_catalog(monkeypatch):
+    stub = StubAdapter([{"name": "paracetamol", "quantity": 2}, {"name": "unicorn dust", "quantity": 1}])
+    monkeypatch.setattr(extractor, "LLM_EXTRACTION_ENABLED", True)
+    monkeypatch.setattr(extractor, "get_llm_adapter", lambda: stub)
+
+    result = extractor.extract_tiered("something for my headache")
+
+    assert result["tier"] == "llm"
+    assert [m["match"] for m in result["medicines"]] == ["llm"]
+    assert result["medicines"][0]["quantity"] == 2
+    assert "paracetamol" in result["medicines"][0]["name"].lower()
+
+
+def test_no_llm_answer_falls_back_to_rules(monkeypatch):
+    monkeypatch.setattr(extractor, "LLM_EXTRACTION_ENABLED", True)
+    monkeypatch.setattr(extractor, "get_llm_adapter", lambda: StubAdapter(None))
+
+    result = extractor.extract_tiered("something for my headache")
+
+    assert result == {"medicines": [], "tier": "rules_fallback", "confidence": 0.0}
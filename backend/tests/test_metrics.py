@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.database import SessionLocal
+from app.db.migrations import MIGRATIONS, run_migrations
+from app.db.models import DecisionTrace
+from app.graph.pharmacy_workflow import run_workflow
+from app.main import app
+from app.observability.metrics import NODE_DB_QUERIES, NODE_DURATION, Histogram
+
+client = TestClient(app)
+
+
+def test_every_trace_entry_carries_node_metrics():
+    final_state = run_workflow(customer_id=1, message="I need paracetamol 500mg")
+
+    for step in final_state["decision_trace"]:
+        assert step["metrics"]["duration_ms"] >= 0
+        assert step["metrics"]["db_queries"] >= 0
+
+    assert NODE_DURATION.count(node="safety_agent") >= 1
+    assert NODE_DB_QUERIES.value(node="memory_agent") >= 1
+
+
+def test_duration_is_persisted_on_decision_trace_rows():
+    run_workflow(customer_id=1, message="I need paracetamol 500mg")
+
+    db = SessionLocal()
+    try:
+        latest = db.query(DecisionTrace).order_by(DecisionTrace.id.desc()).first()
+        assert latest.duration_ms is not None
+    finally:
+        db.close()
+
+
+def test_metrics_endpoint_is_prometheus_text():
+    run_workflow(customer_id=1, message="I need paracetamol 500mg")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    body = response.text
+    assert "# TYPE pharmacy_node_duration_seconds histogram" in body
+    assert 'pharmacy_node_duration_seconds_bucket{node="action_agent",le="+Inf"}' in body
+    assert 'pharmacy_request_duration_seconds_count{decision="approved"}' in body
+    assert "pharmacy_trace_persist_duration_seconds_count" in body
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "test", ["kind"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, kind="a")
+    histogram.observe(0.5, kind="a")
+    histogram.observe(5, kind="a")
+
+    rendered = histogram.render()
+    assert 'test_seconds_bucket{kind="a",le="0.1"} 1' in rendered
+    assert 'test_seconds_bucket{kind="a",le="1"} 2' in rendered
+    assert 'test_seconds_bucket{kind="a",le="+Inf"} 3' in rendered
+    assert 'test_seconds_count{kind="a"} 3' in rendered
+
+
+def test_migrations_add_missing_column_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE decision_traces (id INTEGER PRIMARY KEY, request_id VARCHAR)"))
+
+    assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+    assert run_migrations(engine) == []
+
+    columns = {c["name"] for c in inspect(engine).get_columns("decision_traces")}
+    assert "duration_ms" in columns
@@ -0,0 +1,72 @@
+import json
+import zlib
+
+from fastapi.testclient import TestClient
+
+from app.audit import trace_codec
+from app.db.database import SessionLocal
+from app.db.models import PackedDecisionTrace
+from app.graph import pharmacy_workflow
+from app.graph.pharmacy_workflow import run_workflow
+from app.main import app
+
+client = TestClient(app)
+ADMIN = {"X-ADMIN-KEY": "dev-admin-key"}
+
+
+def _sample_trace():
+    extraction = {"medicines": [{"name": "Paracetamol", "dosage": "500mg", "quantity": 1}]}
+    safety = {"approved": True, "decision": "approved", "violations": []}
+    return [
+        {"agent": "conversation_agent", "input": {"message": "hi"}, "output": extraction},
+        {"agent": "safety_agent", "input": extraction, "decision": "approved", "output": safety},
+        {"agent": "action_agent", "input": safety, "output": {"order_id": 7},
+         "metrics": {"duration_ms": 1.5}},
+    ]
+
+
+def test_codec_round_trip_and_dedupe():
+    trace = _sample_trace()
+    payload = trace_codec.encode(trace)
+
+    assert trace_codec.decode(payload) == trace
+
+    body = json.loads(zlib.decompress(payload))
+    # extraction and safety verdict stored once each
+    assert len(body["objects"]) == 2
+
+
+def test_packed_run_is_one_row_and_decoded_by_admin_api(monkeypatch):
+    monkeypatch.setattr(pharmacy_workflow, "TRACE_STORAGE_FORMAT", "packed")
+
+    final_state = run_workflow(customer_id=1, message="I need paracetamol 500mg")
+    agents = [step["agent"] for step in final_state["decision_trace"]]
+
+    db = SessionLocal()
+    try:
+        pack = db.query(PackedDecisionTrace).order_by(PackedDecisionTrace.id.desc()).first()
+        assert pack.steps == len(agents)
+        request_id = pack.request_id
+    finally:
+        db.close()
+
+    steps = client.get(f"/admin/decision-traces/request/{request_id}", headers=ADMIN).json()
+    assert [step["agent_name"] for step in steps] == agents
+    assert json.loads(steps[-1]["decision"]) == final_state["decision_trace"][-1]["decision"]
+    assert steps[0]["duration_ms"] is not None
+
+    listed = client.get("/admin/decision-traces/", params={"limit": 500}, headers=ADMIN).json()
+    assert steps[0] in listed
+
+    single = client.get(f"/admin/decision-traces/{steps[1]['id']}", headers=ADMIN).json()
+    assert single == steps[1]
+
+
+def test_packed_smaller_than_rows():
+    trace = _sample_trace() * 3
+    rows_bytes = sum(
+        len(json.dumps(entry.get(key), default=str))
+        for entry in trace
+        for key in ("input", "reasoning", "decision", "output")
+    )
+    assert len(trace_codec.encode(trace)) < rows_bytes / 2
@@ -0,0 +1,62 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.database import SessionLocal, engine
+from app.db.migrations import run_migrations
+from app.db.models import Medicine, Prescription
+from app.db.unit_of_work import request_scope
+from app.observability.metrics import node_timer
+
+
+def _rx_cart():
+    """A customer with at least one valid prescription, and every Rx medicine"""
+    db = SessionLocal()
+    try:
+        customer_id = db.query(Prescription.customer_id).first()[0]
+        rx_ids = [m.id for m in db.query(Medicine).filter(Medicine.prescription_required.is_(True))]
+        return customer_id, rx_ids
+    finally:
+        db.close()
+
+
+def test_whole_cart_checked_in_one_query():
+    customer_id, rx_ids = _rx_cart()
+    assert len(rx_ids) > 1
+
+    with request_scope() as scope:
+        with node_timer("test_rx_batch") as metrics:
+            found = scope.valid_prescriptions(customer_id, rx_ids)
+            again = scope.valid_prescriptions(customer_id, rx_ids)
+
+    assert metrics["db_queries"] == 1
+    assert found == again
+    assert set(found) == set(rx_ids)
+
+    # Same answers as asking one medicine at a time
+    with request_scope() as scope:
+        for medicine_id in rx_ids:
+            single = scope.valid_prescriptions(customer_id, [medicine_id])[medicine_id]
+            assert (single is None) == (found[medicine_id] is None)
+
+
+def test_lookup_uses_composite_index():
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM prescriptions "
+            "WHERE customer_id = 1 AND medicine_id IN (1, 2, 3) AND valid_until >= '2026-01-01'"
+        )).all()
+    assert any("ix_prescriptions_customer_medicine_valid" in str(row) for row in plan)
+
+
+def test_migration_adds_index_to_existing_table(tmp_path):
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.execute(text("CREATE TABLE decision_traces (id INTEGER PRIMARY KEY, request_id VARCHAR)"))
+        conn.execute(text(
+            "CREATE TABLE prescriptions (id INTEGER PRIMARY KEY, customer_id INTEGER, "
+            "medicine_id INTEGER, valid_until DATETIME)"
+        ))
+
+    run_migrations(old)
+
+    indexes = {index["name"] for index in inspect(old).get_indexes("prescriptions")}
+    assert "ix_prescriptions_customer_medicine_valid" in indexes
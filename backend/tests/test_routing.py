@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import event
+
+from app.graph.pharmacy_workflow import run_workflow
+from app.db.database import SessionLocal, engine
+from app.db.models import Customer
+
+
+def _first_customer_id():
+    db = SessionLocal()
+    try:
+        return db.query(Customer).first().id
+    finally:
+        db.close()
+
+
+def test_small_talk_skips_downstream_agents():
+    """No extraction → safety, action and refill prediction never run"""
+    final_state = run_workflow(customer_id=_first_customer_id(), message="hello there")
+
+    agents = [step["agent"] for step in final_state["decision_trace"]]
+    assert agents == ["memory_agent", "conversation_agent", "router"]
+
+    router = final_state["decision_trace"][-1]
+    assert router["output"]["skipped"] == [
+        "safety_agent", "action_agent", "predictive_refill_agent"
+    ]
+
+    # Same verdict a full safety_agent run produced before routing existed
+    safety = final_state["safety"]
+    assert safety["approved"] is False
+    assert safety["error_type"] == "VALIDATION"
+    assert safety["violations"] == ["No medicines requested"]
+
+
+def test_blocked_turn_skips_action_and_refill():
+    """Blocked by safety → no order, no refill prediction"""
+    final_state = run_workflow(
+        customer_id=_first_customer_id(),
+        message="I need 999 pills of paracetamol 500mg"
+    )
+
+    agents = [step["agent"] for step in final_state["decision_trace"]]
+    assert agents == ["memory_agent", "conversation_agent", "safety_agent", "router"]
+    assert final_state["decision_trace"][-1]["output"]["skipped"] == [
+        "action_agent", "predictive_refill_agent"
+    ]
+    assert final_state["execution"] == {}
+
+
+@pytest.fixture
+def prescription_queries():
+    """Rx validity lookups (RequestScope.valid_prescriptions) issued while the test runs"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM prescriptions" in statement and "prescriptions.medicine_id IN" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_small_talk_never_checks_prescriptions(prescription_queries):
+    run_workflow(customer_id=_first_customer_id(), message="hello there")
+    assert prescription_queries == []
+
+
+def test_otc_order_never_checks_prescriptions(prescription_queries):
+    """Rx status comes from the catalog index; an OTC-only cart needs no lookup"""
+    final_state = run_workflow(customer_id=_first_customer_id(), message="I need paracetamol 500mg")
+
+    assert final_state["safety"]["approved"] is True
+    assert prescription_queries == []
+
+
+def test_rx_order_checks_prescriptions_in_one_query(prescription_queries):
+    final_state = run_workflow(customer_id=_first_customer_id(), message="I need amoxicillin 500mg")
+
+    assert final_state["safety"]["decision"] is not None
+    assert len(prescription_queries) == 1
@@ -0,0 +1,65 @@
+from app.db.catalog import CatalogEntry, CatalogIndex
+from app.rules import engine
+from app.rules.engine import CompiledRules, compiled_rules, rules_for_name
+
+
+def _catalog(version=1):
+    return CatalogIndex([
+        CatalogEntry(1, "Paracetamol 500mg", False),
+        CatalogEntry(2, "Cetirizine 10mg", False),
+        CatalogEntry(3, "Azithromycin 250mg", False),
+        CatalogEntry(4, "Amoxicillin 500mg", True),
+    ], version)
+
+
+def test_rule_set_compiles_to_per_medicine_tables():
+    rules = CompiledRules(_catalog())
+
+    assert rules.by_id[1].max_qty_per_order == 20
+    assert rules.by_id[1].max_daily_mg == 4000
+    assert rules.by_id[2].max_qty_per_order == 100
+    assert rules.by_id[2].max_daily_mg == float("inf")
+    # policy makes it Rx even though the catalog row says OTC
+    assert rules.by_id[3].prescription_required is True
+
+
+def test_compiled_once_per_catalog_version():
+    first = compiled_rules(_catalog(version=7))
+    assert compiled_rules(_catalog(version=7)) is first
+    assert compiled_rules(_catalog(version=8)) is not first
+
+
+def test_findings_keep_report_order():
+    catalog = _catalog()
+    entry = catalog.get(4)
+    findings = CompiledRules(catalog).check_line(entry, 150, "5000mg", 10, None)
+
+    assert [f.violation for f in findings if f.violation] == [
+        "Quantity 150 exceeds allowed limit (100)",
+        "Insufficient stock for Amoxicillin 500mg (available: 10, requested: 150)",
+        "Dosage 5000mg exceeds safe daily limit (3000mg)",
+        "Valid prescription required for Amoxicillin 500mg",
+    ]
+    assert [f.error_type for f in findings if f.violation] == ["SAFETY", "VALIDATION", "SAFETY", "SAFETY"]
+
+
+def test_missing_dosage_asks_instead_of_blocking():
+    catalog = _catalog()
+    findings = CompiledRules(catalog).check_line(catalog.get(2), 1, "", 10, None)
+
+    assert not any(f.violation for f in findings)
+    assert [f.question for f in findings if f.question] == ["How many mg per dose of Cetirizine 10mg? (e.g., 500mg)"]
+
+
+def test_blocked_medicines_and_longest_pattern_wins(monkeypatch):
+    monkeypatch.setattr(engine, "_PATTERNS", sorted({
+        "cetirizine": {"max_qty_per_order": 5},
+        "cetirizine 10mg": {"blocked": True, "max_qty_per_order": 2},
+    }.items(), key=lambda item: len(item[0])))
+
+    rules = rules_for_name("Cetirizine 10mg")
+    assert rules.blocked and rules.max_qty_per_order == 2
+
+    catalog = _catalog()
+    findings = CompiledRules(catalog).check_line(catalog.get(2), 1, "10mg", 10, None)
+    assert findings[0].violation == "Cetirizine 10mg is not available for online orders"
@@ -0,0 +1,203 @@
+import threading
+
+import pytest
+
+from app.agents.action_agent import action_agent
+from app.db.database import SessionLocal
+from app.db.models import Customer, Medicine, Order
+from app.db.unit_of_work import request_scope
+from app.db.versions import INVENTORY, get_version
+from app.services.inventory_service import InsufficientStock, reserve_stock
+
+
+def _medicine(db, name):
+    return db.query(Medicine).filter(Medicine.name == name).first()
+
+
+@pytest.fixture
+def stock():
+    """Set stock for a few medicines; restored afterwards"""
+    db = SessionLocal()
+    originals = {}
+
+    def set_stock(name, quantity):
+        medicine = _medicine(db, name)
+        originals.setdefault(medicine.id, medicine.stock_quantity)
+        medicine.stock_quantity = quantity
+        db.commit()
+        return medicine.id
+
+    try:
+        yield set_stock
+    finally:
+        for medicine_id, quantity in originals.items():
+            db.get(Medicine, medicine_id).stock_quantity = quantity
+        db.commit()
+        db.close()
+
+
+def _stock_of(medicine_id):
+    db = SessionLocal()
+    try:
+        return db.get(Medicine, medicine_id).stock_quantity
+    finally:
+        db.close()
+
+
+def test_reservation_decrements_and_bumps_inventory(stock):
+    medicine_id = stock("Cetirizine 10mg", 10)
+
+    db = SessionLocal()
+    try:
+        before = get_version(db, INVENTORY)
+        reserve_stock(db, {medicine_id: 4})
+        db.commit()
+        assert get_version(db, INVENTORY) == before + 1
+    finally:
+        db.close()
+
+    assert _stock_of(medicine_id) == 6
+
+
+def test_inventory_version_is_shared_and_bumped_once_per_transaction(stock):
+    """Other workers see the bump (data_versions row); a rollback undoes it"""
+    medicine_id = stock("Cetirizine 10mg", 10)
+
+    def shared_version():
+        other = SessionLocal()  # another connection, like another worker
+        try:
+            return get_version(other, INVENTORY)
+        finally:
+            other.close()
+
+    db = SessionLocal()
+    try:
+        before = shared_version()
+        reserve_stock(db, {medicine_id: 1})
+        db.rollback()
+        assert shared_version() == before
+
+        reserve_stock(db, {medicine_id: 1})
+        reserve_stock(db, {medicine_id: 1})
+        db.commit()
+        assert shared_version() == before + 1
+    finally:
+        db.close()
+
+
+def test_cart_is_reserved_all_or_nothing(stock):
+    plenty = stock("Cetirizine 10mg", 10)
+    scarce = stock("Vitamin C 500mg", 1)
+
+    db = SessionLocal()
+    try:
+        with pytest.raises(InsufficientStock) as exc:
+            reserve_stock(db, {plenty: 3, scarce: 2})
+        db.commit()
+    finally:
+        db.close()
+
+    assert exc.value.shortfalls == [{"medicine_id": scarce, "requested": 2, "available": 1}]
+    assert _stock_of(plenty) == 10
+    assert _stock_of(scarce) == 1
+
+
+def test_reservation_is_undone_by_the_callers_rollback(stock):
+    """The savepoint must not become the outer transaction (pysqlite): release != commit"""
+    medicine_id = stock("Cetirizine 10mg", 10)
+
+    db = SessionLocal()
+    try:
+        reserve_stock(db, {medicine_id: 4})
+        db.rollback()
+    finally:
+        db.close()
+
+    assert _stock_of(medicine_id) == 10
+
+
+def test_concurrent_orders_never_oversell(stock):
+    medicine_id = stock("Cetirizine 10mg", 5)
+    results = []
+
+    def buy():
+        db = SessionLocal()
+        try:
+            reserve_stock(db, {medicine_id: 1})
+            db.commit()
+            results.append(True)
+        except InsufficientStock:
+            db.rollback()
+            results.append(False)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=buy) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 5
+    assert _stock_of(medicine_id) == 0
+
+
+def test_action_agent_blocks_when_stock_ran_out(stock):
+    stock("Cetirizine 10mg", 1)
+    db = SessionLocal()
+    try:
+        customer_id = db.query(Customer).first().id
+        orders_before = db.query(Order).count()
+    finally:
+        db.close()
+
+    state = {
+        "customer": {"id": customer_id},
+        "extraction": {"medicines": [{"name": "Cetirizine 10mg", "quantity": 3, "dosage": "10mg"}]},
+        "safety": {"approved": True, "decision": "approved"},
+    }
+    with request_scope():
+        update = action_agent(state)
+
+    assert update["safety"]["decision"] == "blocked"
+    assert update["safety"]["error_type"] == "STOCK_CONFLICT"
+    assert update["safety"]["violations"] == [
+        "Insufficient stock for Cetirizine 10mg (available: 1, requested: 3)"
+    ]
+    assert "execution" not in update
+
+    db = SessionLocal()
+    try:
+        assert db.query(Order).count() == orders_before
+    finally:
+        db.close()
+
+
+def test_stock_conflict_skips_refill_prediction(stock, monkeypatch):
+    """Approved, then sold out before the reservation: no order, no refill prediction"""
+    from app.agents import action_agent as action_module
+    from app.graph.pharmacy_workflow import run_workflow
+
+    medicine_id = stock("Cetirizine 10mg", 5)
+
+    original = action_module.reserve_stock
+
+    def sold_out_meanwhile(db, quantities):
+        db.query(Medicine).filter(Medicine.id == medicine_id).update({"stock_quantity": 0})
+        return original(db, quantities)
+
+    monkeypatch.setattr(action_module, "reserve_stock", sold_out_meanwhile)
+
+    db = SessionLocal()
+    try:
+        customer_id = db.query(Customer).first().id
+    finally:
+        db.close()
+
+    final_state = run_workflow(customer_id=customer_id, message="I need cetirizine 10mg")
+
+    assert final_state["safety"]["error_type"] == "STOCK_CONFLICT"
+    assert final_state["execution"] == {}
+    agents = [step["agent"] for step in final_state["decision_trace"]]
+    assert agents[-2:] == ["action_agent", "router"]
+    assert final_state["decision_trace"][-1]["output"]["skipped"] == ["predictive_refill_agent"]
@@ -0,0 +1,91 @@
+import threading
+import uuid
+
+from app.audit.trace_writer import TraceWriter, trace_writer
+from app.db.database import SessionLocal
+from app.db.models import DecisionTrace
+from app.graph.pharmacy_workflow import run_workflow
+
+
+def _rows(request_id, count):
+    return [
+        {
+            "request_id": request_id,
+            "agent_name": f"agent_{i}",
+            "input": None,
+            "reasoning": None,
+            "decision": None,
+            "output": None,
+            "duration_ms": None,
+        }
+        for i in range(count)
+    ]
+
+
+def _count(request_id):
+    db = SessionLocal()
+    try:
+        return db.query(DecisionTrace).filter(DecisionTrace.request_id == request_id).count()
+    finally:
+        db.close()
+
+
+def test_rows_from_many_requests_are_flushed_in_batches():
+    writer = TraceWriter(max_rows=100, batch_rows=4, flush_interval_ms=50)
+    writer.start()
+    try:
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+        for request_id in ids:
+            writer.enqueue(_rows(request_id, 5))
+        writer.flush()
+
+        assert [_count(request_id) for request_id in ids] == [5, 5, 5]
+    finally:
+        writer.stop()
+
+
+def test_stop_drains_pending_rows():
+    writer = TraceWriter(max_rows=100, batch_rows=1000, flush_interval_ms=60_000)
+    writer.start()
+
+    request_id = str(uuid.uuid4())
+    writer.enqueue(_rows(request_id, 3))
+    writer.stop()
+
+    assert not writer.running
+    assert _count(request_id) == 3
+
+
+def test_enqueue_blocks_when_queue_is_full():
+    writer = TraceWriter(max_rows=2, batch_rows=10, flush_interval_ms=10)
+    request_id = str(uuid.uuid4())
+
+    producer = threading.Thread(target=writer.enqueue, args=(_rows(request_id, 5),))
+    producer.start()
+    producer.join(timeout=0.2)
+    assert producer.is_alive(), "enqueue should wait for the flusher"
+
+    writer.start()
+    try:
+        producer.join(timeout=5)
+        assert not producer.is_alive()
+        writer.flush()
+        assert _count(request_id) == 5
+    finally:
+        writer.stop()
+
+
+def test_workflow_hands_traces_to_running_writer():
+    trace_writer.start()
+    try:
+        final_state = run_workflow(customer_id=1, message="I need paracetamol 500mg")
+        trace_writer.flush()
+    finally:
+        trace_writer.stop()
+
+    db = SessionLocal()
+    try:
+        latest = db.query(DecisionTrace).order_by(DecisionTrace.id.desc()).first()
+        assert latest.agent_name == final_state["decision_trace"][-1]["agent"]
+    finally:
+        db.close()
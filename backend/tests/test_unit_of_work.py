@@ -0,0 +1,114 @@
+from app.db import unit_of_work
+from app.db.unit_of_work import request_scope, current_scope
+from app.db.models import Customer
+from app.graph.pharmacy_workflow import run_workflow
+
+
+def test_nested_scopes_share_one_session():
+    """Inner request_scope() calls must join the outer unit of work"""
+    with request_scope() as outer:
+        with request_scope() as inner:
+            assert inner is outer
+            assert current_scope() is outer
+
+    assert current_scope() is None, "Scope must be cleared after the request"
+
+
+def test_workflow_opens_single_session(monkeypatch):
+    """A whole chat turn (all agents + trace persist) uses ONE session"""
+    opened = []
+    original = unit_of_work.SessionLocal
+
+    def counting_session():
+        session = original()
+        opened.append(session)
+        return session
+
+    monkeypatch.setattr(unit_of_work, "SessionLocal", counting_session)
+
+    with request_scope() as scope:
+        customer = scope.db.query(Customer).first()
+        assert customer is not None
+
+        run_workflow(customer_id=customer.id, message="I need paracetamol 500mg")
+
+    assert len(opened) == 1, f"Expected 1 session per request, got {len(opened)}"
+
+
+def test_order_is_committed_before_the_webhook(monkeypatch):
+    """Side effects run after the order commit, so no write lock is held through them"""
+    from app.agents import action_agent
+    from app.db.database import SessionLocal
+    from app.db.models import Order
+
+    seen = []
+
+    async def webhook(order_id, medicines, customer_id):
+        db = SessionLocal()  # another connection: sees committed rows only
+        try:
+            seen.append(db.get(Order, order_id) is not None)
+        finally:
+            db.close()
+        return {"status": 200}
+
+    monkeypatch.setattr(action_agent, "trigger_warehouse_webhook", webhook)
+
+    with request_scope() as scope:
+        customer = scope.db.query(Customer).first()
+        final_state = run_workflow(customer_id=customer.id, message="I need paracetamol 500mg")
+
+    assert final_state["execution"]["order_id"] is not None
+    assert seen == [True]
+
+
+def test_order_bumps_each_version_once():
+    """One order = one bump per dataset it wrote, however many flushes it took"""
+    from app.db.database import SessionLocal
+    from app.db.versions import INVENTORY, ORDERS, get_versions
+
+    def versions():
+        db = SessionLocal()  # another connection: what other workers see
+        try:
+            return get_versions(db, [INVENTORY, ORDERS])
+        finally:
+            db.close()
+
+    before = versions()
+    with request_scope() as scope:
+        customer = scope.db.query(Customer).first()
+        final_state = run_workflow(customer_id=customer.id, message="I need paracetamol 500mg")
+    after = versions()
+
+    assert final_state["execution"]["order_id"] is not None
+    assert after == {INVENTORY: before[INVENTORY] + 1, ORDERS: before[ORDERS] + 1}
+
+
+def test_orders_written_elsewhere_invalidate_this_process():
+    """An order written by another process (own engine) moves the version this process reads"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.database import DATABASE_URL, SessionLocal
+    from app.db.models import Order
+    from app.db.versions import ORDERS, get_version
+
+    def orders_version():
+        db = SessionLocal()
+        try:
+            return get_version(db, ORDERS)
+        finally:
+            db.close()
+
+    before = orders_version()
+
+    other_engine = create_engine(DATABASE_URL)
+    other = sessionmaker(bind=other_engine)()
+    try:
+        customer_id = other.query(Customer).first().id
+        other.add(Order(customer_id=customer_id))
+        other.commit()
+    finally:
+        other.close()
+        other_engine.dispose()
+
+    assert orders_version() == before + 1
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+from app.agents.safety_agent import safety_agent
+from app.db.database import SessionLocal
+from app.db.models import Customer, Medicine, Prescription
+from app.observability.metrics import node_timer
+from app.rules.verdict_cache import VerdictCache, cart_hash, verdict_cache
+
+
+def _safety(customer_id, medicines):
+    return safety_agent({"customer": {"id": customer_id}, "extraction": {"medicines": medicines}})
+
+
+def _reused(update):
+    return any(step.startswith("♻️") for step in update["decision_trace"][0]["reasoning"])
+
+
+def test_blocked_verdict_is_reused(customer_id):
+    verdict_cache.clear()
+    cart = [{"name": "Paracetamol 500mg", "quantity": 999, "dosage": "500mg"}]
+
+    first = _safety(customer_id, cart)
+    with node_timer("test_verdict") as metrics:
+        second = _safety(customer_id, cart)
+
+    assert first["safety"]["decision"] == "blocked"
+    assert second["safety"] == first["safety"]
+    assert _reused(second) and not _reused(first)
+    assert metrics["db_queries"] == 1  # the version check only
+
+
+def test_approvals_are_never_cached(customer_id):
+    verdict_cache.clear()
+    cart = [{"name": "Paracetamol 500mg", "quantity": 2, "dosage": "500mg"}]
+
+    assert _safety(customer_id, cart)["safety"]["approved"] is True
+    assert not _reused(_safety(customer_id, cart))
+    assert verdict_cache.stats()["size"] == 0
+
+
+def test_restock_invalidates_stock_block(customer_id):
+    verdict_cache.clear()
+    cart = [{"name": "Cetirizine 10mg", "quantity": 5, "dosage": "10mg"}]
+
+    db = SessionLocal()
+    try:
+        medicine = db.query(Medicine).filter(Medicine.name == "Cetirizine 10mg").first()
+        original = medicine.stock_quantity
+        medicine.stock_quantity = 1
+        db.commit()
+
+        assert _safety(customer_id, cart)["safety"]["decision"] == "blocked"
+        assert _reused(_safety(customer_id, cart))
+
+        medicine.stock_quantity = original
+        db.commit()
+
+        assert _safety(customer_id, cart)["safety"]["approved"] is True
+    finally:
+        medicine.stock_quantity = original
+        db.commit()
+        db.close()
+
+
+def test_new_prescription_invalidates_rx_block():
+    verdict_cache.clear()
+    db = SessionLocal()
+    try:
+        # Any (customer, Rx medicine) pair without a prescription
+        held = set(db.query(Prescription.customer_id, Prescription.medicine_id).all())
+        medicine, customer = next(
+            (m, c)
+            for m in db.query(Medicine).filter(Medicine.prescription_required.is_(True))
+            for c in db.query(Customer)
+            if (c.id, m.id) not in held
+        )
+        cart = [{"name": medicine.name, "quantity": 1, "dosage": "10mg"}]
+
+        assert _safety(customer.id, cart)["safety"]["decision"] == "blocked"
+        assert _reused(_safety(customer.id, cart))
+
+        prescription = Prescription(
+            customer_id=customer.id, medicine_id=medicine.id,
+            valid_until=datetime.utcnow() + timedelta(days=30),
+        )
+        db.add(prescription)
+        db.commit()
+        try:
+            update = _safety(customer.id, cart)
+            assert not _reused(update)
+            assert not any("prescription" in v for v in update["safety"]["violations"])
+        finally:
+            db.delete(prescription)
+            db.commit()
+    finally:
+        db.close()
+
+
+def test_ttl_and_canonical_cart():
+    cache = VerdictCache(maxsize=4, ttl_seconds=0)
+    cache.put("k", {"safety": {"approved": False}})
+    assert cache.get("k") is None
+
+    a = [{"name": "A", "quantity": 1, "dosage": "1mg"}, {"name": "B", "quantity": 2, "dosage": None}]
+    assert cart_hash(a) == cart_hash(list(reversed(a)))
+    assert cart_hash(a) != cart_hash([dict(a[0], quantity=3), a[1]])
@@ -46,20 +46,38 @@ export default function ChatPage() {
     setLoading(true)
     setError(null)
 
-    try {
-      const { data } = await api.chat(selectedCustomer.id, inputMessage)
+    // Placeholder bot message, updated as each agent reports in
+    const botId = Date.now() + 1
+    const updateBot = (fields) =>
+      setMessages(prev => prev.map(msg => (msg.id === botId ? { ...msg, ...fields } : msg)))
+
+    setMessages(prev => [...prev, {
+      id: botId,
+      sender: 'bot',
+      text: 'Checking your request...',
+      timestamp: new Date().toLocaleTimeString()
+    }])
 
-      const botMessage = {
-        id: Date.now() + 1,
-        sender: 'bot',
+    try {
+      const data = await api.chatStream(selectedCustomer.id, inputMessage, (event, payload) => {
+        if (event === 'safety') {
+          updateBot({
+            text: payload.approved ? 'Safety checks passed, placing your order...' : payload.reason,
+            approved: payload.approved
+          })
+        } else if (event === 'order') {
+          updateBot({ orderId: payload.order_id })
+        }
+      })
+
+      updateBot({
         text: data.reply,
         timestamp: new Date().toLocaleTimeString(),
         approved: data.approved,
         orderId: data.order_id
-      }
-
-      setMessages(prev => [...prev, botMessage])
+      })
     } catch (err) {
+      setMessages(prev => prev.filter(msg => msg.id !== botId))
       const errorMessage = {
         id: Date.now() + 1,
         sender: 'error',
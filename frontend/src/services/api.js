@@ -40,6 +40,53 @@ apiClient.interceptors.response.use(
   }
 )
 
+const parseSseBlock = (block) => {
+  let event = 'message'
+  const dataLines = []
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim()
+    else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim())
+  }
+  return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : null }
+}
+
+const streamChat = async (customerId, message, onEvent) => {
+  const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify({ customer_id: customerId, message })
+  })
+
+  if (!response.ok) {
+    const body = await response.json().catch(() => ({}))
+    throw new Error(body.detail || `Request failed (${response.status})`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  let result = null
+
+  while (true) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const { event, data } = parseSseBlock(buffer.slice(0, boundary))
+      buffer = buffer.slice(boundary + 2)
+
+      if (event === 'error') throw new Error(data?.detail || 'Workflow error')
+      if (event === 'done') result = data
+      onEvent(event, data)
+    }
+  }
+
+  if (!result) throw new Error('Stream ended before a reply was received')
+  return result
+}
+
 export const api = {
   // Health check
   health: () => apiClient.get('/health'),
@@ -51,6 +98,11 @@ export const api = {
       message: message
     }),
 
+  // Streaming chat (SSE over fetch): onEvent(eventName, data) is called as
+  // each agent finishes; resolves with the final `done` payload
+  chatStream: (customerId, message, onEvent = () => {}) =>
+    streamChat(customerId, message, onEvent),
+
   // Admin - Customers
   getCustomers: () => apiClient.get('/admin/customers/'),
   getCustomer: (customerId) => apiClient.get(`/admin/customers/${customerId}`),